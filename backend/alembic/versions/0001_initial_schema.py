@@ -0,0 +1,131 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+Databases created before migrations existed (the app used to run
+``create_all()`` at import) already have some of these tables but no
+``alembic_version``. Tables that exist are kept and only get the columns and
+indexes they lack, so ``alembic upgrade head`` adopts such a database.
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *elements):
+    """Create table ``name``, or add the columns it lacks if it exists"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(name):
+        op.create_table(name, *elements)
+        return
+    existing = {column["name"] for column in inspector.get_columns(name)}
+    for element in elements:
+        if isinstance(element, sa.Column) and element.name not in existing:
+            op.add_column(name, element)
+
+
+def _create_index(name, table, columns, unique):
+    if name not in {
+        index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)
+    }:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade() -> None:
+    _create_table(
+        "users",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    _create_index("ix_users_email", "users", ["email"], unique=True)
+
+    _create_table(
+        "my_products",
+        sa.Column("asin", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("bullet_points", sa.JSON(), nullable=True),
+        sa.Column("sales_amount", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("asin"),
+    )
+
+    _create_table(
+        "workflows",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("flow_data", sa.JSON(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    _create_table(
+        "workflow_runs",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("workflow_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("results", sa.JSON(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["workflow_id"], ["workflows.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    _create_table(
+        "result_payloads",
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+
+    _create_table(
+        "workflow_run_payloads",
+        sa.Column("run_id", sa.Uuid(), nullable=False),
+        sa.Column("node_id", sa.String(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("payload_hash", sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(["payload_hash"], ["result_payloads.hash"]),
+        sa.ForeignKeyConstraint(["run_id"], ["workflow_runs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("run_id", "node_id"),
+    )
+    _create_index(
+        "ix_workflow_run_payloads_payload_hash",
+        "workflow_run_payloads",
+        ["payload_hash"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_workflow_run_payloads_payload_hash"),
+        table_name="workflow_run_payloads",
+    )
+    op.drop_table("workflow_run_payloads")
+    op.drop_table("result_payloads")
+    op.drop_table("workflow_runs")
+    op.drop_table("workflows")
+    op.drop_table("my_products")
+    op.drop_index(op.f("ix_users_email"), table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,39 @@
+"""Product full-text search index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') "
+    "|| ' ' || coalesce(CAST(bullet_points AS TEXT), ''))"
+)
+
+
+def upgrade() -> None:
+    # Other databases search with the in-process index (app/search.py)
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_my_products_search",
+        "my_products",
+        [sa.text(SEARCH_VECTOR)],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_my_products_search", table_name="my_products")
@@ -0,0 +1,61 @@
+"""Run retention policies and archived run index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "workflows", sa.Column("retention_keep_runs", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "workflows", sa.Column("retention_keep_days", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "workflow_runs", sa.Column("retain_until", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        "ix_workflow_runs_workflow_started",
+        "workflow_runs",
+        ["workflow_id", "started_at"],
+    )
+
+    op.create_table(
+        "archived_runs",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("workflow_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("archive_month", sa.String(length=7), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["workflow_id"], ["workflows.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_archived_runs_workflow_id"), "archived_runs", ["workflow_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_archived_runs_workflow_id"), table_name="archived_runs")
+    op.drop_table("archived_runs")
+    op.drop_index("ix_workflow_runs_workflow_started", table_name="workflow_runs")
+    with op.batch_alter_table("workflow_runs") as batch_op:
+        batch_op.drop_column("retain_until")
+    with op.batch_alter_table("workflows") as batch_op:
+        batch_op.drop_column("retention_keep_days")
+        batch_op.drop_column("retention_keep_runs")
@@ -0,0 +1,64 @@
+"""Workflow node/edge counts and listing index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+workflows = sa.table(
+    "workflows",
+    sa.column("id", sa.Uuid()),
+    sa.column("flow_data", sa.JSON()),
+    sa.column("node_count", sa.Integer()),
+    sa.column("edge_count", sa.Integer()),
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "workflows",
+        sa.Column("node_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "workflows",
+        sa.Column("edge_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_workflows_user_updated", "workflows", ["user_id", "updated_at", "id"]
+    )
+
+    # Backfill from the stored graphs
+    connection = op.get_bind()
+    for workflow_id, flow_data in connection.execute(
+        sa.select(workflows.c.id, workflows.c.flow_data)
+    ):
+        flow_data = flow_data or {}
+        connection.execute(
+            workflows.update()
+            .where(workflows.c.id == workflow_id)
+            .values(
+                node_count=len(flow_data.get("nodes") or []),
+                edge_count=len(flow_data.get("edges") or []),
+            )
+        )
+
+    with op.batch_alter_table("workflows") as batch_op:
+        batch_op.alter_column("node_count", server_default=None)
+        batch_op.alter_column("edge_count", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_workflows_user_updated", table_name="workflows")
+    with op.batch_alter_table("workflows") as batch_op:
+        batch_op.drop_column("edge_count")
+        batch_op.drop_column("node_count")
@@ -0,0 +1,54 @@
+"""Sales events and daily/weekly sales rollups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sales_events",
+        sa.Column(
+            "id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            autoincrement=True,
+            nullable=False,
+        ),
+        sa.Column("asin", sa.String(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["asin"], ["my_products.asin"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_sales_events_asin_occurred", "sales_events", ["asin", "occurred_at"]
+    )
+
+    op.create_table(
+        "sales_rollups",
+        sa.Column("granularity", sa.String(length=4), nullable=False),
+        sa.Column("bucket_start", sa.Date(), nullable=False),
+        sa.Column("asin", sa.String(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["asin"], ["my_products.asin"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("granularity", "bucket_start", "asin"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_rollups")
+    op.drop_index("ix_sales_events_asin_occurred", table_name="sales_events")
+    op.drop_table("sales_events")
@@ -0,0 +1,87 @@
+"""Per-owner product catalogs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 14:00:00.000000
+
+Existing products are assigned to the earliest user.
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+users = sa.table(
+    "users", sa.column("id", sa.Uuid()), sa.column("created_at", sa.DateTime())
+)
+my_products = sa.table(
+    "my_products", sa.column("asin", sa.String()), sa.column("owner_id", sa.Uuid())
+)
+sales_rollups = sa.table(
+    "sales_rollups", sa.column("asin", sa.String()), sa.column("owner_id", sa.Uuid())
+)
+
+
+def upgrade() -> None:
+    op.add_column("my_products", sa.Column("owner_id", sa.Uuid(), nullable=True))
+    op.add_column("sales_rollups", sa.Column("owner_id", sa.Uuid(), nullable=True))
+
+    connection = op.get_bind()
+    has_products = (
+        connection.execute(sa.select(my_products.c.asin).limit(1)).first() is not None
+    )
+    if has_products:
+        owner = connection.execute(
+            sa.select(users.c.id).order_by(users.c.created_at, users.c.id).limit(1)
+        ).scalar()
+        if owner is None:
+            raise RuntimeError(
+                "my_products has rows but there is no user to own them; create a user "
+                "first"
+            )
+        connection.execute(my_products.update().values(owner_id=owner))
+        connection.execute(
+            sales_rollups.update().values(
+                owner_id=sa.select(my_products.c.owner_id)
+                .where(my_products.c.asin == sales_rollups.c.asin)
+                .scalar_subquery()
+            )
+        )
+
+    with op.batch_alter_table("my_products") as batch_op:
+        batch_op.alter_column("owner_id", existing_type=sa.Uuid(), nullable=False)
+        batch_op.create_foreign_key(
+            "my_products_owner_id_fkey", "users", ["owner_id"], ["id"]
+        )
+    op.create_index(
+        "ix_my_products_owner_sales",
+        "my_products",
+        ["owner_id", sa.text("sales_amount DESC")],
+    )
+
+    with op.batch_alter_table("sales_rollups") as batch_op:
+        batch_op.alter_column("owner_id", existing_type=sa.Uuid(), nullable=False)
+        batch_op.create_foreign_key(
+            "sales_rollups_owner_id_fkey", "users", ["owner_id"], ["id"]
+        )
+    op.create_index(
+        "ix_sales_rollups_owner_bucket",
+        "sales_rollups",
+        ["owner_id", "granularity", "bucket_start"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sales_rollups_owner_bucket", table_name="sales_rollups")
+    with op.batch_alter_table("sales_rollups") as batch_op:
+        batch_op.drop_constraint("sales_rollups_owner_id_fkey", type_="foreignkey")
+        batch_op.drop_column("owner_id")
+    op.drop_index("ix_my_products_owner_sales", table_name="my_products")
+    with op.batch_alter_table("my_products") as batch_op:
+        batch_op.drop_constraint("my_products_owner_id_fkey", type_="foreignkey")
+        batch_op.drop_column("owner_id")
@@ -0,0 +1,32 @@
+"""Run deadlines and cancel requests
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "workflows", sa.Column("run_timeout_seconds", sa.Float(), nullable=True)
+    )
+    op.add_column(
+        "workflow_runs", sa.Column("cancel_requested_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("workflow_runs") as batch_op:
+        batch_op.drop_column("cancel_requested_at")
+    with op.batch_alter_table("workflows") as batch_op:
+        batch_op.drop_column("run_timeout_seconds")
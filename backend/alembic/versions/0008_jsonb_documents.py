@@ -0,0 +1,58 @@
+"""JSONB flow_data and run results with GIN indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-20 10:00:00.000000
+
+Rewrites the three tables; on large installs run it in a maintenance window.
+"""
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ("workflows", "flow_data"),
+    ("workflow_runs", "results"),
+    ("result_payloads", "payload"),
+]
+
+
+def upgrade() -> None:
+    # Other databases keep JSON and search by scanning (app/json_search.py)
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, column in COLUMNS:
+        op.alter_column(
+            table, column, type_=postgresql.JSONB(), postgresql_using=f"{column}::jsonb"
+        )
+    op.create_index(
+        "ix_workflows_flow_data",
+        "workflows",
+        ["flow_data"],
+        postgresql_using="gin",
+        postgresql_ops={"flow_data": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "ix_result_payloads_payload",
+        "result_payloads",
+        ["payload"],
+        postgresql_using="gin",
+        postgresql_ops={"payload": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_result_payloads_payload", table_name="result_payloads")
+    op.drop_index("ix_workflows_flow_data", table_name="workflows")
+    for table, column in COLUMNS:
+        op.alter_column(
+            table, column, type_=postgresql.JSON(), postgresql_using=f"{column}::json"
+        )
@@ -0,0 +1,114 @@
+"""Key products by owner and ASIN
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-20 11:00:00.000000
+
+Sellers may list the same ASIN. ``my_products`` is keyed by
+``(owner_id, asin)``, sales events gain the owner of the product they were
+recorded against, and sales and rollups reference the product by both.
+Downgrading fails while two sellers list the same ASIN.
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# PostgreSQL's names for the constraints the earlier revisions left unnamed,
+# so SQLite's batch mode reflects them under the same names
+naming_convention = {
+    "pk": "%(table_name)s_pkey",
+    "fk": "%(table_name)s_%(column_0_name)s_fkey",
+}
+
+my_products = sa.table(
+    "my_products", sa.column("asin", sa.String()), sa.column("owner_id", sa.Uuid())
+)
+sales_events = sa.table(
+    "sales_events", sa.column("asin", sa.String()), sa.column("owner_id", sa.Uuid())
+)
+
+
+def upgrade() -> None:
+    op.add_column("sales_events", sa.Column("owner_id", sa.Uuid(), nullable=True))
+    op.get_bind().execute(
+        sales_events.update().values(
+            owner_id=sa.select(my_products.c.owner_id)
+            .where(my_products.c.asin == sales_events.c.asin)
+            .scalar_subquery()
+        )
+    )
+    with op.batch_alter_table(
+        "sales_events", naming_convention=naming_convention
+    ) as batch_op:
+        batch_op.drop_constraint("sales_events_asin_fkey", type_="foreignkey")
+        batch_op.alter_column("owner_id", existing_type=sa.Uuid(), nullable=False)
+
+    with op.batch_alter_table(
+        "sales_rollups", naming_convention=naming_convention
+    ) as batch_op:
+        batch_op.drop_constraint("sales_rollups_asin_fkey", type_="foreignkey")
+        batch_op.drop_constraint("sales_rollups_pkey", type_="primary")
+        batch_op.create_primary_key(
+            "sales_rollups_pkey", ["granularity", "bucket_start", "owner_id", "asin"]
+        )
+
+    with op.batch_alter_table(
+        "my_products", naming_convention=naming_convention
+    ) as batch_op:
+        batch_op.drop_constraint("my_products_pkey", type_="primary")
+        batch_op.create_primary_key("my_products_pkey", ["owner_id", "asin"])
+
+    for table in ("sales_events", "sales_rollups"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_foreign_key(
+                f"{table}_owner_id_asin_fkey",
+                "my_products",
+                ["owner_id", "asin"],
+                ["owner_id", "asin"],
+                ondelete="CASCADE",
+            )
+
+
+def downgrade() -> None:
+    for table in ("sales_events", "sales_rollups"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f"{table}_owner_id_asin_fkey", type_="foreignkey")
+
+    with op.batch_alter_table(
+        "my_products", naming_convention=naming_convention
+    ) as batch_op:
+        batch_op.drop_constraint("my_products_pkey", type_="primary")
+        batch_op.create_primary_key("my_products_pkey", ["asin"])
+
+    with op.batch_alter_table(
+        "sales_rollups", naming_convention=naming_convention
+    ) as batch_op:
+        batch_op.drop_constraint("sales_rollups_pkey", type_="primary")
+        batch_op.create_primary_key(
+            "sales_rollups_pkey", ["granularity", "bucket_start", "asin"]
+        )
+        batch_op.create_foreign_key(
+            "sales_rollups_asin_fkey",
+            "my_products",
+            ["asin"],
+            ["asin"],
+            ondelete="CASCADE",
+        )
+
+    with op.batch_alter_table(
+        "sales_events", naming_convention=naming_convention
+    ) as batch_op:
+        batch_op.drop_column("owner_id")
+        batch_op.create_foreign_key(
+            "sales_events_asin_fkey",
+            "my_products",
+            ["asin"],
+            ["asin"],
+            ondelete="CASCADE",
+        )
@@ -0,0 +1,190 @@
+"""Admission control for workflow runs.
+
+Runs hold a gunicorn worker thread and a DB connection for their whole
+duration, so a single user firing many runs can starve everyone else. The
+controller caps concurrent runs per user and globally (tied to the DB pool
+size), queues a bounded number of waiters per user, and hands free slots to
+waiting users round-robin so one user's backlog can't monopolise them.
+Callers that can't be queued are rejected straight away with a retry hint.
+
+Queued callers block the threadpool thread their request runs in, so
+running and queued runs together are held to half of
+``settings.threadpool_threads``; the rest stay free for other requests.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Hashable, Iterator, Optional
+
+from app.config import settings
+from app.database import engine
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        global_limit: int,
+        per_user_limit: int,
+        per_user_queue: int,
+        total_queue: int,
+        queue_timeout: float,
+    ):
+        self.global_limit = global_limit
+        self.per_user_limit = per_user_limit
+        self.per_user_queue = per_user_queue
+        self.total_queue = total_queue
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._running = 0
+        self._running_by_user: Dict[Hashable, int] = {}
+        # Users with waiters, in round-robin order
+        self._queues: "OrderedDict[Hashable, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+
+    def _can_run(self, user_id: Hashable) -> bool:
+        return (
+            self._running < self.global_limit
+            and self._running_by_user.get(user_id, 0) < self.per_user_limit
+        )
+
+    def _start(self, user_id: Hashable):
+        self._running += 1
+        self._running_by_user[user_id] = self._running_by_user.get(user_id, 0) + 1
+
+    def _retry_after(self) -> int:
+        return max(1, int(self.queue_timeout / 2))
+
+    @contextmanager
+    def admit(
+        self, user_id: Hashable, on_queue: Optional[Callable[[], None]] = None
+    ) -> Iterator[None]:
+        """Hold a run slot for ``user_id`` for the duration of the block.
+
+        ``on_queue`` is called before the caller starts waiting, e.g. to hand
+        its DB connection back to the pool while it is parked.
+        """
+        self._acquire(user_id, on_queue)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def _acquire(self, user_id: Hashable, on_queue: Optional[Callable[[], None]]):
+        with self._lock:
+            if user_id not in self._queues and self._can_run(user_id):
+                self._start(user_id)
+                return
+
+            queue = self._queues.get(user_id)
+            if self._queued >= self.total_queue or (
+                queue is not None and len(queue) >= self.per_user_queue
+            ):
+                raise AdmissionRejected(
+                    "Too many workflow runs queued, try again later",
+                    self._retry_after(),
+                )
+
+            waiter = _Waiter()
+            if queue is None:
+                queue = self._queues[user_id] = deque()
+            queue.append(waiter)
+            self._queued += 1
+
+        if on_queue is not None:
+            on_queue()
+        deadline = time.monotonic() + self.queue_timeout
+        waiter.event.wait(max(0.0, deadline - time.monotonic()))
+
+        with self._lock:
+            if waiter.admitted:
+                return
+            # Timed out: withdraw from the queue
+            queue = self._queues.get(user_id)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                self._queued -= 1
+                if not queue:
+                    del self._queues[user_id]
+        raise AdmissionRejected(
+            "Timed out waiting for a workflow run slot", self._retry_after()
+        )
+
+    def _release(self, user_id: Hashable):
+        with self._lock:
+            self._running -= 1
+            remaining = self._running_by_user[user_id] - 1
+            if remaining:
+                self._running_by_user[user_id] = remaining
+            else:
+                del self._running_by_user[user_id]
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to queued users in round-robin order"""
+        for _ in range(len(self._queues)):
+            if self._running >= self.global_limit:
+                return
+            user_id, queue = next(iter(self._queues.items()))
+            if self._running_by_user.get(user_id, 0) < self.per_user_limit:
+                waiter = queue.popleft()
+                self._queued -= 1
+                self._start(user_id)
+                waiter.admitted = True
+                waiter.event.set()
+            # Move the user to the back so others get the next slot
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "users_waiting": len(self._queues),
+            }
+
+
+def _global_limit() -> int:
+    if settings.run_global_limit:
+        return settings.run_global_limit
+    # Leave one pooled connection for ordinary requests
+    pool_size = getattr(engine.pool, "size", lambda: 5)()
+    return max(1, pool_size - 1)
+
+
+def _total_queue(global_limit: int) -> int:
+    # Every running and queued run holds a threadpool thread
+    return max(
+        0,
+        min(settings.run_total_queue, settings.threadpool_threads // 2 - global_limit),
+    )
+
+
+def create_controller() -> AdmissionController:
+    global_limit = _global_limit()
+    return AdmissionController(
+        global_limit=global_limit,
+        per_user_limit=settings.run_per_user_limit,
+        per_user_queue=settings.run_per_user_queue,
+        total_queue=_total_queue(global_limit),
+        queue_timeout=settings.run_queue_timeout_seconds,
+    )
+
+
+run_admission = create_controller()
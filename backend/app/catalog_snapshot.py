@@ -0,0 +1,239 @@
+"""Columnar in-memory snapshot of ``my_products`` for analytical nodes.
+
+Holds the ASINs, their ``sales_amount`` as a float64 array and an
+ASIN -> row index, so filter, sort and aggregate nodes run as vectorized
+operations instead of a query or a Python loop over ORM objects. The
+snapshot refreshes incrementally from an ``updated_at`` watermark; a full
+reload only happens when rows disappear. Every refresh builds new columns
+and swaps them in, so runs reading the old columns are never disturbed.
+Each seller's catalog has its own snapshot, so a refresh or a whole-catalog
+node only costs as much as that seller's product count.
+
+NumPy is optional; without it the same operations run over plain lists.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+class CatalogColumns:
+    """One immutable version of the snapshot"""
+
+    def __init__(self, asins: List[str], sales, index: Dict[str, int]):
+        self.asins = asins
+        self.sales = sales
+        self.index = index
+
+    def __len__(self):
+        return len(self.asins)
+
+    def _rows(self, asins: Optional[Sequence[str]]):
+        """Row numbers of ``asins`` (the whole catalog when None), minus unknowns"""
+        if asins is None:
+            return (
+                np.arange(len(self.asins))
+                if np is not None
+                else list(range(len(self.asins)))
+            )
+        index = self.index
+        rows = [index[asin] for asin in asins if asin in index]
+        if np is not None:
+            return np.asarray(rows, dtype=np.int64)
+        return rows
+
+    def _asins_at(self, rows) -> List[str]:
+        asins = self.asins
+        return [asins[row] for row in rows]
+
+    def filter(
+        self,
+        asins: Optional[Sequence[str]],
+        min_sales: Optional[float] = None,
+        max_sales: Optional[float] = None,
+    ) -> List[str]:
+        """ASINs whose sales fall in ``[min_sales, max_sales]``, in input order"""
+        rows = self._rows(asins)
+        low = float("-inf") if min_sales is None else min_sales
+        high = float("inf") if max_sales is None else max_sales
+        if np is not None:
+            values = self.sales[rows]
+            return self._asins_at(rows[(values >= low) & (values <= high)])
+        sales = self.sales
+        return self._asins_at(row for row in rows if low <= sales[row] <= high)
+
+    def sort(
+        self,
+        asins: Optional[Sequence[str]],
+        descending: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """ASINs ordered by sales; ties keep their input order"""
+        rows = self._rows(asins)
+        if np is not None:
+            values = self.sales[rows]
+            order = np.argsort(-values if descending else values, kind="stable")
+            if limit is not None:
+                order = order[:limit]
+            return self._asins_at(rows[order])
+        sales = self.sales
+        ordered = sorted(
+            rows, key=lambda row: -sales[row] if descending else sales[row]
+        )
+        return self._asins_at(ordered[:limit] if limit is not None else ordered)
+
+    def aggregate(self, asins: Optional[Sequence[str]]) -> Dict[str, float]:
+        rows = self._rows(asins)
+        if not len(rows):
+            return {"count": 0, "total": 0.0, "mean": None, "min": None, "max": None}
+        if np is not None:
+            values = self.sales[rows]
+            return {
+                "count": int(values.size),
+                "total": float(values.sum()),
+                "mean": float(values.mean()),
+                "min": float(values.min()),
+                "max": float(values.max()),
+            }
+        values = [self.sales[row] for row in rows]
+        total = sum(values)
+        return {
+            "count": len(values),
+            "total": total,
+            "mean": total / len(values),
+            "min": min(values),
+            "max": max(values),
+        }
+
+
+def _to_array(values: List[float]):
+    if np is not None:
+        return np.asarray(values, dtype=np.float64)
+    return list(values)
+
+
+class CatalogSnapshot:
+    """Snapshot of one owner's catalog (every product when ``owner_id`` is None)"""
+
+    def __init__(self, owner_id=None):
+        self.owner_id = owner_id
+        self._lock = threading.Lock()
+        self._columns = CatalogColumns([], _to_array([]), {})
+        self._watermark: Optional[datetime] = None
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def refresh(self, db: Session) -> CatalogColumns:
+        """Bring the snapshot up to date and return the current columns"""
+        with self._lock:
+            count, watermark = self._scoped(
+                db.query(
+                    func.count(models.MyProduct.asin),
+                    func.max(models.MyProduct.updated_at),
+                )
+            ).one()
+            columns = self._columns
+            if count == len(columns) and watermark == self._watermark:
+                return columns
+
+            if self._watermark is None:
+                columns = self._load_all(db)
+            else:
+                columns = self._load_changes(db, columns)
+                if len(columns) != count:
+                    # Rows were deleted (or updated without touching updated_at)
+                    columns = self._load_all(db)
+            self._columns, self._watermark = columns, watermark
+            return columns
+
+    def _scoped(self, query):
+        if self.owner_id is None:
+            return query
+        return query.filter(models.MyProduct.owner_id == self.owner_id)
+
+    def _load_all(self, db: Session) -> CatalogColumns:
+        rows = self._scoped(
+            db.query(models.MyProduct.asin, models.MyProduct.sales_amount)
+        ).order_by(models.MyProduct.asin)
+        asins, sales = [], []
+        for asin, sales_amount in rows.yield_per(10000):
+            asins.append(asin)
+            sales.append(sales_amount or 0.0)
+        self.full_loads += 1
+        return CatalogColumns(
+            asins, _to_array(sales), {asin: row for row, asin in enumerate(asins)}
+        )
+
+    def _load_changes(self, db: Session, columns: CatalogColumns) -> CatalogColumns:
+        # >= so rows written in the same tick as the last refresh are not missed
+        changed: List[Tuple[str, float]] = (
+            self._scoped(db.query(models.MyProduct.asin, models.MyProduct.sales_amount))
+            .filter(models.MyProduct.updated_at >= self._watermark)
+            .all()
+        )
+
+        asins = list(columns.asins)
+        index = dict(columns.index)
+        appended = []
+        updates = []
+        for asin, sales_amount in changed:
+            sales_amount = sales_amount or 0.0
+            row = index.get(asin)
+            if row is None:
+                index[asin] = len(asins)
+                asins.append(asin)
+                appended.append(sales_amount)
+            else:
+                updates.append((row, sales_amount))
+
+        if np is not None:
+            sales = np.concatenate(
+                [columns.sales, np.asarray(appended, dtype=np.float64)]
+            )
+            if updates:
+                rows, values = zip(*updates)
+                sales[list(rows)] = values
+        else:
+            sales = list(columns.sales) + appended
+            for row, value in updates:
+                sales[row] = value
+        self.incremental_loads += 1
+        return CatalogColumns(asins, sales, index)
+
+
+class TenantCatalogs:
+    """Per-owner snapshots, keeping the most recently used ``max_tenants``"""
+
+    def __init__(self, max_tenants: int):
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[object, CatalogSnapshot]" = OrderedDict()
+
+    def snapshot(self, owner_id) -> CatalogSnapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(owner_id)
+            if snapshot is None:
+                snapshot = self._snapshots[owner_id] = CatalogSnapshot(owner_id)
+                while len(self._snapshots) > self.max_tenants:
+                    self._snapshots.popitem(last=False)
+            else:
+                self._snapshots.move_to_end(owner_id)
+            return snapshot
+
+    def refresh(self, db: Session, owner_id) -> CatalogColumns:
+        """Bring ``owner_id``'s snapshot up to date and return its columns"""
+        return self.snapshot(owner_id).refresh(db)
+
+
+catalog = TenantCatalogs(settings.catalog_snapshot_max_tenants)
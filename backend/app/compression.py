@@ -0,0 +1,174 @@
+"""Response compression negotiated from ``Accept-Encoding``.
+
+Prefers brotli when the optional ``brotli`` package is installed and the
+client accepts it, otherwise gzip. Streaming responses are compressed
+chunk by chunk with a sync flush so clients can start parsing early.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Formats that are compressed already
+INCOMPRESSIBLE_TYPES = ("application/vnd.apache.parquet",)
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick ``br`` or ``gzip`` from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            encoding = negotiate_encoding(
+                Headers(scope=scope).get("accept-encoding", "")
+            )
+            if encoding is not None:
+                responder = _CompressionResponder(self, encoding, send)
+                await self.app(scope, receive, responder.send)
+                return
+        await self.app(scope, receive, send)
+
+    def compressor(self, encoding: str):
+        if encoding == "br":
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Hold the start message until the first body chunk tells us the size
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or headers.get(
+                "content-type", ""
+            ).startswith(INCOMPRESSIBLE_TYPES)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self._flush_start()
+                await self._send(message)
+                return
+
+            self.compressor = self.middleware.compressor(self.encoding)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            if "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._flush_start()
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._flush_start()
+
+        if more_body:
+            await self._send(
+                {
+                    "type": "http.response.body",
+                    "body": self.compressor.compress(body),
+                    "more_body": True,
+                }
+            )
+        else:
+            await self._send(
+                {
+                    "type": "http.response.body",
+                    "body": self.compressor.compress(body) + self.compressor.finish(),
+                }
+            )
+
+    async def _flush_start(self):
+        if self.start_message is not None:
+            await self._send(self.start_message)
+            self.start_message = None
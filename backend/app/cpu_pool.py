@@ -0,0 +1,117 @@
+"""Bounded process pool for CPU-bound node work.
+
+Text features, scoring formulas and JSON reshaping hold the GIL for as long
+as they run, so running them on the request thread stalls every other
+request in the same worker. Nodes with process execution ship a compact,
+picklable payload to a small ``ProcessPoolExecutor`` and wait for the
+result with a timeout.
+
+Callers split large inputs into chunks that run in parallel. Concurrent
+calls are bounded (workers + ``cpu_pool_max_pending``). A task that
+times out can't be cancelled once it is running, so its pool's worker
+processes are terminated and a fresh pool is started; other tasks caught
+in that pool are resubmitted once. The pool is created on first use, so
+each gunicorn worker gets its own after forking. Workers are spawned
+rather than forked and only import the task's module.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+
+
+class CpuTaskTimeout(Exception):
+    pass
+
+
+class CpuPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max(1, workers + max_pending))
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Kill ``executor``'s processes; the next submission starts a new pool"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn: Callable[[Any], Any], payload: Any, timeout: float) -> Any:
+        """``fn(payload)`` in a worker process, within ``timeout`` seconds.
+
+        ``fn`` must be a module-level function. With no workers configured it
+        runs inline.
+        """
+        return self.run_many(fn, [payload], timeout)[0]
+
+    def run_many(
+        self, fn: Callable[[Any], Any], payloads: List[Any], timeout: float
+    ) -> List[Any]:
+        """``fn`` over each payload in parallel, results in payload order.
+
+        Large inputs should be split into several payloads: pickling one big
+        payload, or unpickling its result, holds the GIL in this process for
+        the whole time.
+        """
+        if self.workers <= 0:
+            return [fn(payload) for payload in payloads]
+
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise CpuTaskTimeout(f"No CPU worker became free within {timeout:g}s")
+        try:
+            results: Dict[int, Any] = {}
+            for attempt in range(2):
+                executor = self._get_executor()
+                futures = {
+                    executor.submit(fn, payload): index
+                    for index, payload in enumerate(payloads)
+                    if index not in results
+                }
+                try:
+                    for future in as_completed(
+                        futures, timeout=max(0.0, deadline - time.monotonic())
+                    ):
+                        results[futures[future]] = future.result()
+                    return [results[index] for index in range(len(payloads))]
+                except FutureTimeout:
+                    self._recycle(executor)
+                    raise CpuTaskTimeout(
+                        f"{fn.__name__} did not finish within {timeout:g}s"
+                    )
+                except BrokenProcessPool:
+                    # Another task's timeout took the pool down; retry the rest
+                    # once on a new pool
+                    self._recycle(executor)
+                    if attempt or time.monotonic() >= deadline:
+                        raise
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+cpu_pool = CpuPool(settings.cpu_pool_workers, settings.cpu_pool_max_pending)
@@ -1,12 +1,52 @@
-from sqlalchemy import create_engine
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.config import settings
 
-engine = create_engine(settings.database_url)
+
+def create_database_engine(url: str) -> Engine:
+    """An engine for ``url``; PostgreSQL in production, SQLite for tests and benchmarks.
+
+    SQLite connections may be used from any thread (requests run in a thread
+    pool) and enforce foreign keys like PostgreSQL does. An in-memory
+    database (``sqlite://``) exists once per connection, so every session
+    shares a single one.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(url)
+
+    options = {"connect_args": {"check_same_thread": False}}
+    if parsed.database in (None, "", ":memory:"):
+        options["poolclass"] = StaticPool
+    sqlite_engine = create_engine(url, **options)
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _enable_foreign_keys(connection, _):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    return sqlite_engine
+
+
+engine = create_database_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica; without one, reads use the primary
+replica_engine = (
+    create_database_engine(settings.database_replica_url)
+    if settings.database_replica_url
+    else None
+)
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if replica_engine
+    else None
+)
+
 Base = declarative_base()
 
 
@@ -15,4 +55,21 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db(primary: Session = Depends(get_db)):
+    """A session for routes that only read, on the replica when one is configured.
+
+    The replica may lag the primary, so anything that must see the request's
+    own writes (or a write that just happened elsewhere) uses ``get_db``.
+    Without a replica this is the request's primary session.
+    """
+    if ReadSessionLocal is None:
+        yield primary
+        return
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,50 @@
+"""ETag helpers for conditional GETs.
+
+Routes compute a tag from cheap version columns (ids, ``updated_at``,
+statuses) before loading full rows, and answer ``304 Not Modified`` when
+the client's ``If-None-Match`` still matches. Tags are weak: the
+compression middleware may send the same representation gzip- or
+brotli-encoded, which a strong tag would have to tell apart.
+"""
+import hashlib
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+VARY = "Accept-Encoding"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses weak comparison
+        if _opaque(candidate) == _opaque(etag):
+            return True
+    return False
+
+
+def headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=headers(etag))
+
+
+def set_etag(response: Response, etag: str):
+    response.headers.update(headers(etag))
@@ -0,0 +1,260 @@
+"""Containment search over stored JSON: workflows' flow_data and run results.
+
+On PostgreSQL, ``flow_data`` and result payloads are JSONB with GIN
+(``jsonb_path_ops``) indexes, and every criterion is an ``@>`` the database
+answers from the index. Other databases narrow the candidates with ``LIKE``
+on the stored JSON text (every string in a pattern must appear in it,
+JSON-encoded) and match what is left here with the same semantics
+(``contains``); still a scan, which is fine for tests and small installs.
+
+Run results live in deduplicated ``result_payloads`` (see
+``result_store``), so a run criterion first finds the matching payloads and
+then the runs that link to them. Runs whose results are still stored inline
+(from before content addressing) are not searched.
+"""
+import json
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import Text, and_, or_, select, true, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, load_only
+
+from app import models
+
+# A group of patterns matches a document containing any one of them
+PatternGroup = List[Dict[str, Any]]
+
+
+def contains(document: Any, pattern: Any) -> bool:
+    """PostgreSQL's jsonb ``@>``: objects match key by key, every element of a
+    pattern array must match some element of the document array, and scalars
+    must be equal"""
+    if isinstance(pattern, dict):
+        return isinstance(document, dict) and all(
+            key in document and contains(document[key], value)
+            for key, value in pattern.items()
+        )
+    if isinstance(pattern, list):
+        return isinstance(document, list) and all(
+            any(contains(item, element) for item in document) for element in pattern
+        )
+    # JSON true is not 1
+    return (
+        isinstance(document, bool) == isinstance(pattern, bool) and document == pattern
+    )
+
+
+def asin_patterns(asin: str) -> PatternGroup:
+    """The result payload shapes that mention ``asin``"""
+    return [
+        {"value": asin},  # single_asin
+        {"value": [asin]},  # asin_list
+        {"value": {asin: {}}},  # product_details and merged_data, keyed by ASIN
+        {"value": {"asin": asin}},  # product_details as stored before it was keyed
+        {"value": [{"asin": asin}]},  # product tables, feature tables, reshaped records
+    ]
+
+
+def parse_pattern(text: str) -> Dict[str, Any]:
+    """A ``contains`` query parameter: a JSON object"""
+    try:
+        pattern = json.loads(text)
+    except ValueError:
+        raise ValueError("contains must be a JSON object")
+    if not isinstance(pattern, dict):
+        raise ValueError("contains must be a JSON object")
+    return pattern
+
+
+def node_type_pattern(node_type: str) -> Dict[str, Any]:
+    """Matches a flow_data with a node of ``node_type``"""
+    return {"nodes": [{"type": node_type}]}
+
+
+def _on_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _strings(pattern: Any) -> Iterator[str]:
+    if isinstance(pattern, dict):
+        for key, value in pattern.items():
+            yield key
+            yield from _strings(value)
+    elif isinstance(pattern, list):
+        for element in pattern:
+            yield from _strings(element)
+    elif isinstance(pattern, str):
+        yield pattern
+
+
+def _text_prefilter(column, group: PatternGroup):
+    """A condition every document matching ``group`` meets, checked on the
+    JSON text; it may let through documents that don't match"""
+    text = type_coerce(column, Text)
+
+    def all_in_text(needles):
+        # Longest first: SQLite stops at the first needle that isn't there
+        return [
+            text.contains(needle, autoescape=True)
+            for needle in sorted(needles, key=len, reverse=True)
+        ]
+
+    # Stored with json.dumps' defaults, so strings are encoded the same way
+    needle_sets = [
+        {json.dumps(string) for string in _strings(pattern)} for pattern in group
+    ]
+    if not all(needle_sets):
+        return true()
+    shared = set.intersection(*needle_sets)
+    conditions = all_in_text(shared)
+    rest = [needles - shared for needles in needle_sets]
+    if all(rest):
+        conditions.append(or_(*(and_(*all_in_text(needles)) for needles in rest)))
+    return and_(*conditions)
+
+
+def _matches_any(document: Any, group: PatternGroup) -> bool:
+    return any(contains(document, pattern) for pattern in group)
+
+
+def _matches_all(document: Any, groups: List[PatternGroup]) -> bool:
+    return all(_matches_any(document, group) for group in groups)
+
+
+def _workflow_summaries(db: Session):
+    return db.query(models.Workflow).options(
+        load_only(
+            models.Workflow.id,
+            models.Workflow.name,
+            models.Workflow.description,
+            models.Workflow.node_count,
+            models.Workflow.edge_count,
+            models.Workflow.created_at,
+            models.Workflow.updated_at,
+        )
+    )
+
+
+def _in_order(rows, ids: List) -> List:
+    by_id = {row.id: row for row in rows}
+    return [by_id[row_id] for row_id in ids]
+
+
+def search_workflows(
+    db: Session, user_id, groups: List[PatternGroup], limit: int
+) -> List[models.Workflow]:
+    """The user's workflows whose flow_data matches every group, newest first"""
+    newest_first = (models.Workflow.updated_at.desc(), models.Workflow.id.desc())
+    owned = models.Workflow.user_id == user_id
+    if _on_postgres(db):
+        flow_data = type_coerce(models.Workflow.flow_data, JSONB)
+        query = _workflow_summaries(db).filter(owned)
+        for group in groups:
+            query = query.filter(
+                or_(*(flow_data.contains(pattern) for pattern in group))
+            )
+        return query.order_by(*newest_first).limit(limit).all()
+
+    # Newest first, stopping once there are enough matches
+    scan = (
+        db.query(models.Workflow.id, models.Workflow.flow_data)
+        .filter(
+            owned,
+            *(_text_prefilter(models.Workflow.flow_data, group) for group in groups)
+        )
+        .order_by(*newest_first)
+    )
+    found = list(
+        islice(
+            (
+                workflow_id
+                for workflow_id, flow_data in scan.yield_per(1000)
+                if _matches_all(flow_data, groups)
+            ),
+            limit,
+        )
+    )
+    return _in_order(
+        _workflow_summaries(db).filter(models.Workflow.id.in_(found)), found
+    )
+
+
+def _runs_linked_to(condition):
+    """Ids of the runs with a result payload meeting ``condition``"""
+    matching = select(models.ResultPayload.hash).where(condition)
+    return select(models.WorkflowRunPayload.run_id).where(
+        models.WorkflowRunPayload.payload_hash.in_(matching)
+    )
+
+
+def search_runs(
+    db: Session,
+    user_id,
+    groups: List[PatternGroup],
+    limit: int,
+    status: Optional[str] = None,
+    workflow_id=None,
+) -> List[models.WorkflowRun]:
+    """The user's runs with a node result matching each group, newest first.
+
+    Different groups may be matched by different nodes of the same run.
+    """
+    runs = db.query(models.WorkflowRun).options(
+        load_only(
+            models.WorkflowRun.id,
+            models.WorkflowRun.workflow_id,
+            models.WorkflowRun.status,
+            models.WorkflowRun.started_at,
+            models.WorkflowRun.completed_at,
+        )
+    )
+    filters = [models.WorkflowRun.user_id == user_id]
+    if status:
+        filters.append(models.WorkflowRun.status == status)
+    if workflow_id:
+        filters.append(models.WorkflowRun.workflow_id == workflow_id)
+    newest_first = (models.WorkflowRun.started_at.desc(), models.WorkflowRun.id.desc())
+
+    if _on_postgres(db):
+        payload = type_coerce(models.ResultPayload.payload, JSONB)
+        for group in groups:
+            filters.append(
+                models.WorkflowRun.id.in_(
+                    _runs_linked_to(or_(*(payload.contains(p) for p in group)))
+                )
+            )
+        return runs.filter(*filters).order_by(*newest_first).limit(limit).all()
+
+    # Runs with a candidate payload for the first group (callers put the most
+    # selective first), newest first, checked here until there are enough
+    filters.append(
+        models.WorkflowRun.id.in_(
+            _runs_linked_to(_text_prefilter(models.ResultPayload.payload, groups[0]))
+        )
+    )
+    candidates = (
+        db.query(models.WorkflowRunPayload.run_id, models.ResultPayload.payload)
+        .join(
+            models.ResultPayload,
+            models.ResultPayload.hash == models.WorkflowRunPayload.payload_hash,
+        )
+        .join(
+            models.WorkflowRun,
+            models.WorkflowRun.id == models.WorkflowRunPayload.run_id,
+        )
+        .filter(*filters)
+        .order_by(*newest_first)
+    )
+    found = []
+    for run_id, rows in groupby(candidates.yield_per(1000), key=itemgetter(0)):
+        payloads = [payload for _, payload in rows]
+        if all(
+            any(_matches_any(payload, group) for payload in payloads)
+            for group in groups
+        ):
+            found.append(run_id)
+            if len(found) == limit:
+                break
+    return _in_order(runs.filter(models.WorkflowRun.id.in_(found)), found)
@@ -1,18 +1,55 @@
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from app import models, query_counter, retention, shared_catalog
+from app.compression import CompressionMiddleware
 from app.config import settings
-from app.database import engine
-from app import models
-from app.routers import auth, workflows, products
+from app.cpu_pool import cpu_pool
+from app.database import engine, replica_engine
+from app.routers import auth, products, runs, workflows
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Admission control sizes the run queue from this
+    anyio.to_thread.current_default_thread_limiter().total_tokens = (
+        settings.threadpool_threads
+    )
+    # Importing the app never touches the database; migrations own the schema
+    if settings.create_schema_on_startup:
+        models.Base.metadata.create_all(bind=engine)
+    worker = None
+    if settings.run_retention_interval_seconds > 0:
+        worker = retention.RetentionWorker(settings.run_retention_interval_seconds)
+        worker.start()
+    refresher = None
+    if settings.shared_catalog_path:
+        refresher = shared_catalog.SharedCatalogRefresher(
+            settings.shared_catalog_refresh_seconds / 10
+        )
+        refresher.start()
+    yield
+    if worker is not None:
+        worker.stop()
+    if refresher is not None:
+        refresher.stop()
+    cpu_pool.shutdown()
+    engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
 
-models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Workflow Builder API",
     description="A simple workflow builder API for take-home interviews",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -22,10 +59,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware, minimum_size=settings.compression_minimum_size
+)
+
+
+@app.middleware("http")
+async def count_queries(request: Request, call_next):
+    with query_counter.track(f"{request.method} {request.url.path}") as stats:
+        response = await call_next(request)
+    response.headers["X-Query-Count"] = str(stats.count)
+    return response
+
 
 app.include_router(auth.router)
 app.include_router(workflows.router)
 app.include_router(products.router)
+app.include_router(runs.router)
 
 
 @app.get("/")
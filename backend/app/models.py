@@ -1,61 +1,275 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Float
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
 import uuid
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    Text,
+    Uuid,
+    cast,
+    func,
+    literal_column,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import relationship, validates
 
 from app.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    
+
     workflows = relationship("Workflow", back_populates="user")
     workflow_runs = relationship("WorkflowRun", back_populates="user")
 
 
+# Documents searched by containment (app/json_search.py): JSONB on PostgreSQL
+JSONDocument = JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+
+# Rendered inline so the query expression matches the index expression
+TEXT_SEARCH_CONFIG = literal_column("'english'")
+
+
+def _search_vector(title, description, bullet_points):
+    document = (
+        func.coalesce(title, "")
+        + " "
+        + func.coalesce(description, "")
+        + " "
+        + func.coalesce(cast(bullet_points, Text), "")
+    )
+    return func.to_tsvector(TEXT_SEARCH_CONFIG, document)
+
+
 class MyProduct(Base):
     __tablename__ = "my_products"
-    
-    asin = Column(String, primary_key=True)
+
+    asin = Column(String, nullable=False)
     title = Column(String, nullable=False)
     description = Column(Text)
     bullet_points = Column(JSON)
     sales_amount = Column(Float, nullable=False, default=0.0)
+    # The seller whose catalog this is; every product query is scoped to one owner
+    owner_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Sellers may list the same ASIN, so a product is identified within its catalog
+        PrimaryKeyConstraint("owner_id", "asin"),
+        # Per-tenant top-N and listings read one owner's slice in sales order
+        Index("ix_my_products_owner_sales", "owner_id", sales_amount.desc()),
+        # Full-text search; PostgreSQL only, other databases use the in-process index
+        Index(
+            "ix_my_products_search",
+            _search_vector(title, description, bullet_points),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+def search_vector():
+    """Product title, description and bullet points as a tsvector (see app/search.py)"""
+    return _search_vector(
+        MyProduct.title, MyProduct.description, MyProduct.bullet_points
+    )
+
+
+class SalesEvent(Base):
+    """One sale of a product; ``sales_rollups`` holds the same history pre-aggregated"""
+
+    __tablename__ = "sales_events"
+
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    owner_id = Column(Uuid, nullable=False)
+    asin = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    units = Column(Integer, nullable=False, default=1)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["owner_id", "asin"],
+            ["my_products.owner_id", "my_products.asin"],
+            ondelete="CASCADE",
+        ),
+        Index("ix_sales_events_asin_occurred", "asin", "occurred_at"),
+    )
+
+
+class SalesRollup(Base):
+    """Sales per ASIN per day or week (from Monday), maintained as events arrive"""
+
+    __tablename__ = "sales_rollups"
+
+    granularity = Column(String(4), primary_key=True)  # day, week
+    bucket_start = Column(Date, primary_key=True)
+    owner_id = Column(Uuid, ForeignKey("users.id"), primary_key=True)
+    asin = Column(String, primary_key=True)
+    amount = Column(Float, nullable=False, default=0.0)
+    units = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["owner_id", "asin"],
+            ["my_products.owner_id", "my_products.asin"],
+            ondelete="CASCADE",
+        ),
+        Index(
+            "ix_sales_rollups_owner_bucket", "owner_id", "granularity", "bucket_start"
+        ),
+    )
 
 
 class Workflow(Base):
     __tablename__ = "workflows"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     description = Column(Text)
-    flow_data = Column(JSON, nullable=False)  # ReactFlow nodes and edges
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    flow_data = Column(JSONDocument, nullable=False)  # ReactFlow nodes and edges
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    # Run retention; a run is archived once outside every limit set
+    # (null = settings default)
+    retention_keep_runs = Column(Integer)
+    retention_keep_days = Column(Integer)
+    # Run deadline in seconds (null = settings default)
+    run_timeout_seconds = Column(Float)
+    # Graph size, kept in step with flow_data so listings needn't load it
+    node_count = Column(Integer, nullable=False, default=0)
+    edge_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
+
     user = relationship("User", back_populates="workflows")
     workflow_runs = relationship("WorkflowRun", back_populates="workflow")
 
+    __table_args__ = (
+        # Keyset pagination of a user's workflows, newest first
+        Index("ix_workflows_user_updated", "user_id", "updated_at", "id"),
+        # Containment search; PostgreSQL only, other databases scan
+        Index(
+            "ix_workflows_flow_data",
+            "flow_data",
+            postgresql_using="gin",
+            postgresql_ops={"flow_data": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    @validates("flow_data")
+    def _count_graph(self, key, flow_data):
+        self.node_count = len((flow_data or {}).get("nodes") or [])
+        self.edge_count = len((flow_data or {}).get("edges") or [])
+        return flow_data
+
 
 class WorkflowRun(Base):
     __tablename__ = "workflow_runs"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.id"), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    status = Column(String, nullable=False, default="running")  # running, completed, failed
-    results = Column(JSON)  # Store execution results
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    workflow_id = Column(Uuid, ForeignKey("workflows.id"), nullable=False)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    status = Column(
+        String, nullable=False, default="running"
+    )  # running, completed, failed, cancelled, timed_out
+    results = Column(
+        JSONDocument
+    )  # Inline results; new runs store them in result_payloads instead
     error_message = Column(Text)
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
-    
+    retain_until = Column(
+        DateTime
+    )  # restored runs are exempt from retention until then
+    cancel_requested_at = Column(
+        DateTime
+    )  # set by POST /runs/{id}/cancel; the run stops at its next check
+
     workflow = relationship("Workflow", back_populates="workflow_runs")
-    user = relationship("User", back_populates="workflow_runs")
\ No newline at end of file
+    user = relationship("User", back_populates="workflow_runs")
+    payload_refs = relationship(
+        "WorkflowRunPayload",
+        back_populates="run",
+        cascade="all, delete-orphan",
+        order_by="WorkflowRunPayload.position",
+    )
+
+    __table_args__ = (
+        Index("ix_workflow_runs_workflow_started", "workflow_id", "started_at"),
+    )
+
+
+class ResultPayload(Base):
+    """A node output stored once, addressed by the SHA-256 of its canonical JSON"""
+
+    __tablename__ = "result_payloads"
+
+    hash = Column(String(64), primary_key=True)
+    payload = Column(JSONDocument, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Containment search over run results; PostgreSQL only, other databases scan
+        Index(
+            "ix_result_payloads_payload",
+            "payload",
+            postgresql_using="gin",
+            postgresql_ops={"payload": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+class WorkflowRunPayload(Base):
+    """Links a run's node result to its deduplicated payload"""
+
+    __tablename__ = "workflow_run_payloads"
+
+    run_id = Column(
+        Uuid, ForeignKey("workflow_runs.id", ondelete="CASCADE"), primary_key=True
+    )
+    node_id = Column(String, primary_key=True)
+    position = Column(
+        Integer, nullable=False, default=0
+    )  # keeps the original results key order
+    payload_hash = Column(
+        String(64), ForeignKey("result_payloads.hash"), nullable=False, index=True
+    )
+
+    run = relationship("WorkflowRun", back_populates="payload_refs")
+
+
+class ArchivedRun(Base):
+    """Locates a run moved out of ``workflow_runs`` into a monthly archive file"""
+
+    __tablename__ = "archived_runs"
+
+    id = Column(Uuid, primary_key=True)  # the original run id
+    workflow_id = Column(
+        Uuid, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False)
+    started_at = Column(DateTime)
+    archive_month = Column(String(7), nullable=False)  # YYYY-MM, names the archive file
+    archived_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,365 @@
+"""Node type registry and workflow graph compilation.
+
+Every node type declares the result types its input port accepts, how many
+incoming edges it takes, the type it outputs and its handler. ``compile_graph``
+checks a graph against those declarations once, before anything runs, and
+turns it into a list of steps whose inputs are bound to numbered result
+slots. The engine then runs the steps without looking at edges or checking
+result types again.
+
+Loops are compiled into a ``LoopStep`` holding the steps of their body. The
+loop's slot carries the current item while the body runs, and its merge node
+receives the merged per-item results once the loop finishes.
+"""
+import heapq
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+# Accepts or produces any result type
+ANY = "*"
+
+# Item type a loop yields for each element of its input list
+ELEMENT_TYPES = {"asin_list": "single_asin", "product_details_table": "product_details"}
+
+# How a node's work runs: on the request thread, or in the CPU process pool
+INLINE = "inline"
+PROCESS = "process"
+
+LOOP = "loop"
+MERGE = "merge"
+LOOP_MERGE_OUTPUT = "product_details_table"
+
+
+class NodeSpec:
+    """Declares a node type.
+
+    ``handler(engine, node, inputs)`` receives the results bound to the
+    node's incoming edges, in edge order, and returns the node's result as
+    an ``app.values.Value``.
+    Handlers of ``PROCESS`` nodes gather a compact payload and hand the
+    CPU-bound part to the process pool.
+    """
+
+    def __init__(
+        self,
+        type: str,
+        handler: Optional[Callable],
+        output: str,
+        accepts: Iterable[str] = (),
+        min_inputs: int = 0,
+        max_inputs: Optional[int] = 0,
+        execution: str = INLINE,
+    ):
+        self.type = type
+        self.handler = handler
+        self.output = output
+        self.accepts: FrozenSet[str] = frozenset(accepts)
+        self.min_inputs = min_inputs
+        self.max_inputs = max_inputs
+        self.execution = execution
+
+    def accepts_type(self, result_type: str) -> bool:
+        return ANY in self.accepts or result_type == ANY or result_type in self.accepts
+
+
+_registry: Dict[str, NodeSpec] = {}
+
+
+def register(spec: NodeSpec) -> NodeSpec:
+    _registry[spec.type] = spec
+    return spec
+
+
+def node_spec(node_type: Optional[str]) -> NodeSpec:
+    spec = _registry.get(node_type)
+    if spec is None:
+        raise ValueError(f"Unknown node type: {node_type}")
+    return spec
+
+
+def registered_types() -> List[str]:
+    return sorted(_registry)
+
+
+class Step:
+    __slots__ = ("node_id", "node", "handler", "slot", "input_slots")
+
+    def __init__(
+        self,
+        node_id: str,
+        node: Dict,
+        handler: Callable,
+        slot: int,
+        input_slots: List[int],
+    ):
+        self.node_id = node_id
+        self.node = node
+        self.handler = handler
+        self.slot = slot
+        self.input_slots = input_slots
+
+
+class LoopStep:
+    __slots__ = (
+        "node_id",
+        "slot",
+        "input_slot",
+        "element_type",
+        "body",
+        "merge_slot",
+        "merge_input_slots",
+    )
+
+    def __init__(
+        self,
+        node_id: str,
+        slot: int,
+        input_slot: int,
+        element_type: str,
+        body: List,
+        merge_slot: int,
+        merge_input_slots: List[int],
+    ):
+        self.node_id = node_id
+        self.slot = slot
+        self.input_slot = input_slot
+        self.element_type = element_type
+        self.body = body
+        self.merge_slot = merge_slot
+        self.merge_input_slots = merge_input_slots
+
+
+class CompiledGraph:
+    def __init__(
+        self,
+        node_ids: List[str],
+        slots: Dict[str, int],
+        steps: List,
+        result_ids: List[str],
+    ):
+        self.node_ids = node_ids
+        self.slots = slots
+        self.steps = steps
+        # Nodes whose results are reported, in execution order
+        self.result_ids = result_ids
+
+
+def execution_order(nodes: List[Dict], edges: List[Dict]) -> List[str]:
+    """Validate loop/merge pairings and topologically sort the graph"""
+    loop_nodes = {node["id"]: node for node in nodes if node.get("type") == LOOP}
+    merge_nodes = {node["id"]: node for node in nodes if node.get("type") == MERGE}
+
+    for loop_id, loop_node in loop_nodes.items():
+        merge_id = loop_node.get("data", {}).get("mergeId")
+        if not merge_id:
+            raise ValueError(f"Loop node {loop_id} is missing a mergeId.")
+        if merge_id not in merge_nodes:
+            raise ValueError(
+                f"Loop node {loop_id} points to a non-existent or non-merge node "
+                f"{merge_id}."
+            )
+
+        merge_node = merge_nodes[merge_id]
+        if merge_node.get("data", {}).get("loopId") != loop_id:
+            raise ValueError(
+                f"Merge node {merge_id} does not point back to loop node {loop_id}."
+            )
+
+    for merge_id, merge_node in merge_nodes.items():
+        loop_id = merge_node.get("data", {}).get("loopId")
+        if not loop_id:
+            raise ValueError(f"Merge node {merge_id} is missing a loopId.")
+        if loop_id not in loop_nodes:
+            raise ValueError(
+                f"Merge node {merge_id} points to a non-existent or non-loop node "
+                f"{loop_id}."
+            )
+
+    in_degree = {node["id"]: 0 for node in nodes}
+    downstream: Dict[str, List[str]] = {node_id: [] for node_id in in_degree}
+    for edge in edges:
+        if edge["source"] not in in_degree or edge["target"] not in in_degree:
+            raise ValueError(
+                f"Edge {edge.get('id')} connects a node that does not exist."
+            )
+        in_degree[edge["target"]] += 1
+        downstream[edge["source"]].append(edge["target"])
+
+    queue = [node_id for node_id, degree in in_degree.items() if degree == 0]
+    order = []
+    position = 0
+    while position < len(queue):
+        node_id = queue[position]
+        position += 1
+        order.append(node_id)
+        for target in downstream[node_id]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                queue.append(target)
+
+    if len(order) != len(in_degree):
+        raise ValueError("Workflow graph contains a cycle.")
+    return order
+
+
+def compile_graph(nodes: List[Dict], edges: List[Dict]) -> CompiledGraph:
+    """Type-check a graph and bind every node's inputs to result slots"""
+    order = execution_order(nodes, edges)
+    nodes_by_id = {node["id"]: node for node in nodes}
+    slots = {node_id: slot for slot, node_id in enumerate(order)}
+    rank = slots
+
+    upstream: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    downstream: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    for edge in edges:
+        upstream[edge["target"]].append(edge["source"])
+        downstream[edge["source"]].append(edge["target"])
+
+    merge_of = {
+        node_id: nodes_by_id[node_id]["data"]["mergeId"]
+        for node_id in order
+        if nodes_by_id[node_id].get("type") == LOOP
+    }
+    loop_merges = set(merge_of.values())
+
+    # Infer output types in execution order, checking each node's input port
+    output_types: Dict[str, str] = {}
+    for node_id in order:
+        node_type = nodes_by_id[node_id].get("type")
+        spec = node_spec(node_type)
+        sources = upstream[node_id]
+        if node_id in loop_merges:
+            output_types[node_id] = LOOP_MERGE_OUTPUT
+            continue
+        if len(sources) < spec.min_inputs:
+            raise ValueError(f"Node {node_id} ({node_type}) requires an input.")
+        if spec.max_inputs is not None and len(sources) > spec.max_inputs:
+            if spec.max_inputs == 0:
+                raise ValueError(f"Node {node_id} ({node_type}) does not take inputs.")
+            raise ValueError(
+                f"Node {node_id} ({node_type}) takes at most {spec.max_inputs} "
+                "input(s)."
+            )
+        for source in sources:
+            source_type = output_types[source]
+            if not spec.accepts_type(source_type):
+                expected = " or ".join(sorted(spec.accepts))
+                raise ValueError(
+                    f"Node {node_id} ({node_type}) expects {expected} input, "
+                    f"but {source} produces {source_type}."
+                )
+        if node_type == LOOP:
+            # Without a known item type the body's port checks would be skipped
+            if output_types[sources[0]] not in ELEMENT_TYPES:
+                raise ValueError(
+                    f"Loop {node_id} cannot iterate over {output_types[sources[0]]}."
+                )
+            output_types[node_id] = ELEMENT_TYPES[output_types[sources[0]]]
+        else:
+            output_types[node_id] = spec.output
+
+    # Loop bodies: everything reachable from the loop before its merge node
+    bodies: Dict[str, Set[str]] = {}
+    for loop_id, merge_id in merge_of.items():
+        body: Set[str] = set()
+        stack = list(downstream[loop_id])
+        while stack:
+            current = stack.pop()
+            if current == merge_id or current in body:
+                continue
+            body.add(current)
+            stack.extend(downstream[current])
+        bodies[loop_id] = body
+
+    def build(members: Set[str], available: Set[str]) -> List:
+        # Outermost loops at this level run as one unit with their body and merge
+        inner = set()
+        for loop_id in merge_of:
+            if loop_id in members:
+                inner |= bodies[loop_id] & members
+        group_of = {node_id: node_id for node_id in members}
+        for loop_id, merge_id in merge_of.items():
+            if loop_id in members and loop_id not in inner:
+                for node_id in bodies[loop_id] | {merge_id}:
+                    if group_of.get(node_id, node_id) != node_id:
+                        raise ValueError(
+                            f"Node {node_id} is inside both loop {group_of[node_id]} "
+                            f"and loop {loop_id}."
+                        )
+                    group_of[node_id] = loop_id
+
+        # Topologically sort the groups, breaking ties by execution order
+        group_in_degree = {group: 0 for group in set(group_of.values())}
+        group_edges: Dict[str, Set[str]] = {group: set() for group in group_in_degree}
+        for node_id in members:
+            for target in downstream[node_id]:
+                if target in group_of and group_of[target] != group_of[node_id]:
+                    if group_of[target] not in group_edges[group_of[node_id]]:
+                        group_edges[group_of[node_id]].add(group_of[target])
+                        group_in_degree[group_of[target]] += 1
+        ready = [
+            (rank[group], group)
+            for group, degree in group_in_degree.items()
+            if degree == 0
+        ]
+        heapq.heapify(ready)
+
+        steps = []
+        while ready:
+            _, group = heapq.heappop(ready)
+            if group in merge_of and group_of[group] == group:
+                steps.append(build_loop(group, members, available))
+            else:
+                steps.append(build_node(group, available))
+            for target in group_edges[group]:
+                group_in_degree[target] -= 1
+                if group_in_degree[target] == 0:
+                    heapq.heappush(ready, (rank[target], target))
+        if len(steps) != len(group_in_degree):
+            raise ValueError(
+                "Workflow graph feeds a loop's merge result back into the loop."
+            )
+        return steps
+
+    def check_available(node_id: str, available: Set[str]):
+        for source in upstream[node_id]:
+            if source not in available:
+                raise ValueError(
+                    f"Node {node_id} depends on {source}, which has not run yet at "
+                    "that point."
+                )
+
+    def build_node(node_id: str, available: Set[str]) -> Step:
+        check_available(node_id, available)
+        available.add(node_id)
+        node = nodes_by_id[node_id]
+        return Step(
+            node_id,
+            node,
+            node_spec(node.get("type")).handler,
+            slots[node_id],
+            [slots[source] for source in upstream[node_id]],
+        )
+
+    def build_loop(loop_id: str, members: Set[str], available: Set[str]) -> LoopStep:
+        check_available(loop_id, available)
+        merge_id = merge_of[loop_id]
+        body_available = available | {loop_id}
+        body = build(bodies[loop_id] & members, body_available)
+        available |= body_available
+        available.add(merge_id)
+        source = upstream[loop_id][0]
+        return LoopStep(
+            loop_id,
+            slots[loop_id],
+            slots[source],
+            output_types[loop_id],
+            body,
+            slots[merge_id],
+            [slots[source] for source in upstream[merge_id]],
+        )
+
+    steps = build(set(order), set())
+    result_ids = [
+        node_id for node_id in order if nodes_by_id[node_id].get("type") != LOOP
+    ]
+    return CompiledGraph(order, slots, steps, result_ids)
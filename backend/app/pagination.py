@@ -0,0 +1,29 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row on a page; the next page
+starts strictly after it, so paging stays cheap at any depth and is not
+disturbed by rows inserted in between.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: datetime, row_id: uuid.UUID) -> str:
+    raw = json.dumps([timestamp.isoformat(), str(row_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
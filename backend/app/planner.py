@@ -0,0 +1,298 @@
+"""Dry-run cost estimation for workflows.
+
+Walks the graph in execution order without running anything and, using
+catalog statistics, estimates for every node how often it executes (loop
+fan-out), how many SQL queries and rows it touches and how large its output
+is. The totals can be compared with a budget before a run is admitted.
+"""
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import String, cast, func
+from sqlalchemy.orm import Session
+
+from app import workflow_engine  # noqa: F401 - registers the built-in node types
+from app import models
+from app.config import settings
+from app.node_registry import compile_graph
+from app.product_repository import bestseller_counts, sales_window, top_count
+
+# Rough JSON overheads used for output size estimates
+ASIN_BYTES = 13
+RESULT_ENVELOPE_BYTES = 40
+SALES_SUMMARY_BYTES = 80
+FEATURE_ROW_BYTES = 200
+
+# Nodes whose ASINs join the run's identity map with their full rows
+ROW_LOADING_TYPES = ("get_bestselling_asins", "search_asins")
+# Nodes that output a subset of their input's ASINs
+ASIN_SUBSET_TYPES = (
+    "loop",
+    "get_asin_by_index",
+    "filter_asins",
+    "sort_asins",
+    "score_asins",
+)
+
+
+class WorkflowPlanner:
+    def __init__(self, db: Session, owner_id):
+        self.db = db
+        # Runs only read the owner's catalog, so estimates use its statistics
+        self.owner_id = owner_id
+
+    def catalog_stats(self) -> Dict[str, float]:
+        product_count, avg_row_bytes = (
+            self.db.query(
+                func.count(models.MyProduct.asin),
+                func.avg(
+                    func.length(models.MyProduct.title)
+                    + func.coalesce(func.length(models.MyProduct.description), 0)
+                    + func.coalesce(
+                        func.length(cast(models.MyProduct.bullet_points, String)), 0
+                    )
+                ),
+            )
+            .filter(models.MyProduct.owner_id == self.owner_id)
+            .one()
+        )
+        return {
+            "product_count": product_count or 0,
+            "avg_row_bytes": float(avg_row_bytes or 0),
+        }
+
+    def plan(self, flow_data: Dict[str, Any]) -> Dict[str, Any]:
+        nodes = flow_data.get("nodes", [])
+        edges = flow_data.get("edges", [])
+        # Rejects the graphs the engine would reject, unknown node types included
+        execution_order = compile_graph(nodes, edges).node_ids
+        nodes_by_id = {node["id"]: node for node in nodes}
+
+        upstream: Dict[str, List[str]] = {node_id: [] for node_id in nodes_by_id}
+        downstream: Dict[str, List[str]] = {node_id: [] for node_id in nodes_by_id}
+        for edge in edges:
+            upstream[edge["target"]].append(edge["source"])
+            downstream[edge["source"]].append(edge["target"])
+
+        stats = self.catalog_stats()
+        loop_bodies = self._loop_bodies(nodes_by_id, downstream)
+
+        # Mirrors ProductRepository.prefetch_for: the largest bestseller list per
+        # sales window is loaded up front
+        top_counts = bestseller_counts(nodes)
+        self._prefetch_pending = {
+            window: min(count, stats["product_count"])
+            for window, count in top_counts.items()
+        }
+        self._snapshot_probed = False
+        # Nodes whose output ASINs have their rows in the identity map, so
+        # details for them cost no query
+        self._rows_loaded: Set[str] = set()
+
+        estimates: Dict[str, Dict[str, Any]] = {}
+        fan_out: Dict[str, int] = {}
+        for node_id in execution_order:
+            node = nodes_by_id[node_id]
+            inputs = [
+                estimates[source] for source in upstream[node_id] if source in estimates
+            ]
+            input_items = inputs[0]["output_items"] if inputs else 0
+
+            executions = 1
+            for loop_id, body in loop_bodies.items():
+                if node_id in body:
+                    executions *= fan_out.get(loop_id, 0)
+
+            estimate = self._estimate_node(
+                node, input_items, inputs, stats, fan_out, upstream[node_id]
+            )
+            if node.get("type") == "loop":
+                fan_out[node_id] = input_items
+
+            estimate["executions"] = executions
+            estimate["queries"] *= executions
+            estimate["rows"] *= executions
+            estimates[node_id] = estimate
+
+        return self._summarize(execution_order, estimates, fan_out, stats)
+
+    def _loop_bodies(self, nodes_by_id, downstream) -> Dict[str, Set[str]]:
+        """Nodes reachable from each loop before its merge node"""
+        bodies = {}
+        for node_id, node in nodes_by_id.items():
+            if node.get("type") != "loop":
+                continue
+            merge_id = node.get("data", {}).get("mergeId")
+            body: Set[str] = set()
+            stack = list(downstream[node_id])
+            while stack:
+                current = stack.pop()
+                if current == merge_id or current in body:
+                    continue
+                body.add(current)
+                stack.extend(downstream[current])
+            bodies[node_id] = body
+        return bodies
+
+    def _estimate_node(
+        self, node, input_items, inputs, stats, fan_out, sources
+    ) -> Dict[str, Any]:
+        node_type = node.get("type")
+        data = node.get("data", {})
+        rows_loaded = bool(sources) and self._rows_loaded.issuperset(sources)
+        if node_type in ROW_LOADING_TYPES or (
+            node_type in ASIN_SUBSET_TYPES and rows_loaded
+        ):
+            self._rows_loaded.add(node["id"])
+        estimate = {
+            "node_id": node["id"],
+            "type": node_type,
+            "queries": 0,
+            "rows": 0,
+            "output_items": 0,
+            "output_bytes": RESULT_ENVELOPE_BYTES,
+        }
+
+        if node_type == "get_bestselling_asins":
+            count = min(top_count(data.get("topCount")), stats["product_count"])
+            estimate.update(
+                output_items=count,
+                output_bytes=RESULT_ENVELOPE_BYTES + count * ASIN_BYTES,
+            )
+            window = sales_window(data.get("window"))
+            if window in self._prefetch_pending:
+                rows = self._prefetch_pending.pop(window)
+                # Windowed rankings read the rollups, then load the ranked rows
+                estimate.update(queries=1 if window is None else 2, rows=rows)
+        elif node_type == "search_asins":
+            # Index lookup plus loading the matched rows
+            count = min(int(data.get("limit", 20)), stats["product_count"])
+            estimate.update(
+                queries=2,
+                rows=count,
+                output_items=count,
+                output_bytes=RESULT_ENVELOPE_BYTES + count * ASIN_BYTES,
+            )
+        elif node_type in ("filter_asins", "sort_asins", "aggregate_sales"):
+            # Served from the catalog snapshot: one freshness probe per run
+            items = input_items if inputs else stats["product_count"]
+            if node_type == "sort_asins" and data.get("limit") is not None:
+                items = min(items, int(data["limit"]))
+            if node_type == "aggregate_sales":
+                estimate.update(
+                    output_items=1,
+                    output_bytes=RESULT_ENVELOPE_BYTES + SALES_SUMMARY_BYTES,
+                )
+            else:
+                estimate.update(
+                    output_items=items,
+                    output_bytes=RESULT_ENVELOPE_BYTES + items * ASIN_BYTES,
+                )
+            if not self._snapshot_probed:
+                estimate["queries"] = 1
+                self._snapshot_probed = True
+        elif node_type in ("text_features", "score_asins"):
+            # One batched product lookup, then CPU work in the process pool
+            items = input_items
+            if node_type == "score_asins" and data.get("limit") is not None:
+                items = min(items, int(data["limit"]))
+            per_item = (
+                FEATURE_ROW_BYTES if node_type == "text_features" else ASIN_BYTES * 2
+            )
+            estimate.update(
+                queries=1,
+                rows=input_items,
+                output_items=items,
+                output_bytes=RESULT_ENVELOPE_BYTES + items * per_item,
+            )
+        elif node_type == "reshape_json":
+            source = inputs[0] if inputs else {"output_items": 0, "output_bytes": 0}
+            estimate.update(
+                output_items=source["output_items"], output_bytes=source["output_bytes"]
+            )
+        elif node_type == "get_asin_by_index":
+            estimate.update(
+                output_items=1, output_bytes=RESULT_ENVELOPE_BYTES + ASIN_BYTES
+            )
+        elif node_type == "get_asin_details":
+            estimate.update(
+                output_items=1,
+                output_bytes=RESULT_ENVELOPE_BYTES
+                + int(stats["avg_row_bytes"])
+                + ASIN_BYTES,
+            )
+            if not rows_loaded:
+                estimate.update(queries=1, rows=1)
+        elif node_type == "loop":
+            estimate.update(output_items=input_items)
+        elif node_type == "merge":
+            loop_id = data.get("loopId")
+            if loop_id in fan_out:
+                # Loop merge: one table row per iteration
+                per_item = max((item["output_bytes"] for item in inputs), default=0)
+                items = fan_out[loop_id]
+                estimate.update(
+                    output_items=items,
+                    output_bytes=RESULT_ENVELOPE_BYTES + items * per_item,
+                )
+            else:
+                estimate.update(
+                    output_items=sum(item["output_items"] for item in inputs),
+                    output_bytes=RESULT_ENVELOPE_BYTES
+                    + sum(item["output_bytes"] for item in inputs),
+                )
+        return estimate
+
+    def _summarize(self, execution_order, estimates, fan_out, stats) -> Dict[str, Any]:
+        warnings = []
+        for node_id in execution_order:
+            estimate = estimates[node_id]
+            if (
+                estimate["queries"] >= settings.plan_hot_spot_queries
+                and estimate["executions"] > 1
+            ):
+                warnings.append(
+                    f"Node {node_id} ({estimate['type']}) runs about "
+                    f"{estimate['queries']} queries, "
+                    f"one per loop iteration"
+                )
+            if estimate["output_bytes"] >= settings.plan_hot_spot_output_bytes:
+                warnings.append(
+                    f"Node {node_id} ({estimate['type']}) produces about "
+                    f"{estimate['output_bytes'] // 1024} KiB of output"
+                )
+        for loop_id, items in fan_out.items():
+            if items >= settings.plan_hot_spot_fan_out:
+                warnings.append(f"Loop {loop_id} fans out over about {items} items")
+
+        node_estimates = [estimates[node_id] for node_id in execution_order]
+        return {
+            "nodes": node_estimates,
+            "total_queries": sum(item["queries"] for item in node_estimates),
+            "total_rows": sum(item["rows"] for item in node_estimates),
+            "total_output_bytes": sum(item["output_bytes"] for item in node_estimates),
+            "catalog_size": stats["product_count"],
+            "warnings": warnings,
+        }
+
+
+def budget_violations(plan: Dict[str, Any]) -> List[str]:
+    """Configured run budgets the estimate exceeds (empty when within budget)"""
+    violations = []
+    if (
+        settings.run_max_estimated_queries
+        and plan["total_queries"] > settings.run_max_estimated_queries
+    ):
+        violations.append(
+            f"estimated {plan['total_queries']} queries exceeds the budget of "
+            f"{settings.run_max_estimated_queries}"
+        )
+    if (
+        settings.run_max_estimated_output_bytes
+        and plan["total_output_bytes"] > settings.run_max_estimated_output_bytes
+    ):
+        violations.append(
+            f"estimated {plan['total_output_bytes']} output bytes exceeds the budget "
+            "of "
+            f"{settings.run_max_estimated_output_bytes}"
+        )
+    return violations
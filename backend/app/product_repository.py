@@ -0,0 +1,190 @@
+"""Run-scoped product reads.
+
+A ``ProductRepository`` lives for one workflow run and only sees the run
+owner's catalog; other sellers' ASINs read as missing. Every product it loads
+is kept in an identity map keyed by ASIN, so the same ASIN is never fetched
+twice within a run, and ``prefetch_for`` looks ahead in the graph to load
+everything the run will need in a single query before execution starts.
+Products are loaded as plain column rows into ``ProductRecord``s rather than
+ORM instances; node results share those records. When the shared catalog
+file is enabled, lifetime bestsellers and lookups by ASIN are read from it
+first and only what it lacks is queried.
+
+``get_fields`` serves request-level batch lookups, reading only the columns
+a caller asks for.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models, sales_history, search
+from app.shared_catalog import shared_catalog
+from app.values import ProductRecord
+
+_COLUMNS = (
+    models.MyProduct.asin,
+    models.MyProduct.title,
+    models.MyProduct.description,
+    models.MyProduct.bullet_points,
+    models.MyProduct.sales_amount,
+)
+
+# Columns a batch lookup may project, in response order
+PRODUCT_FIELDS = (
+    "asin",
+    "title",
+    "description",
+    "bullet_points",
+    "sales_amount",
+    "created_at",
+)
+
+
+class ProductRepository:
+    def __init__(self, db: Session, owner_id):
+        self.db = db
+        self.owner_id = owner_id
+        self._by_asin: Dict[str, Optional[ProductRecord]] = {}
+        # ASINs in sales order per window (None = lifetime), a prefix of the ranking
+        self._top: Dict[Optional[int], List[str]] = {}
+        self._top_complete: Set[Optional[int]] = set()
+
+    def _owned_rows(self):
+        return self.db.query(*_COLUMNS).filter(
+            models.MyProduct.owner_id == self.owner_id
+        )
+
+    def _remember(self, rows) -> List[ProductRecord]:
+        products = [
+            row if isinstance(row, ProductRecord) else ProductRecord(*row)
+            for row in rows
+        ]
+        for product in products:
+            self._by_asin[product.asin] = product
+        return products
+
+    def top_selling(
+        self, count: int, window: Optional[int] = None
+    ) -> List[ProductRecord]:
+        """Best sellers by lifetime sales, or by sales over the last ``window`` days"""
+        top = self._top.get(window, [])
+        if count > len(top) and window not in self._top_complete:
+            if window is None:
+                products = shared_catalog.top_selling(self.owner_id, count)
+                if products is None:
+                    products = (
+                        self._owned_rows()
+                        .order_by(models.MyProduct.sales_amount.desc())
+                        .limit(count)
+                    )
+                top = [product.asin for product in self._remember(products)]
+            else:
+                ranked = sales_history.top_selling(
+                    self.db, self.owner_id, window, count
+                )
+                top = [asin for asin, _ in ranked]
+                self.get_many(top)
+            self._top[window] = top
+            if len(top) < count:
+                self._top_complete.add(window)
+        return [
+            self._by_asin[asin]
+            for asin in top[:count]
+            if self._by_asin[asin] is not None
+        ]
+
+    def get(self, asin: str) -> Optional[ProductRecord]:
+        if asin not in self._by_asin:
+            self.get_many([asin])
+        return self._by_asin[asin]
+
+    def get_many(self, asins: Iterable[str]) -> Dict[str, Optional[ProductRecord]]:
+        asins = list(dict.fromkeys(asins))
+        missing = [asin for asin in asins if asin not in self._by_asin]
+        if missing and shared_catalog.enabled:
+            self._remember(
+                filter(
+                    None, (shared_catalog.get(asin, self.owner_id) for asin in missing)
+                )
+            )
+            missing = [asin for asin in missing if asin not in self._by_asin]
+        if missing:
+            self._remember(
+                self._owned_rows().filter(models.MyProduct.asin.in_(missing))
+            )
+            for asin in missing:
+                # Remember misses too so they aren't queried again
+                self._by_asin.setdefault(asin, None)
+        return {asin: self._by_asin[asin] for asin in asins}
+
+    def search(self, query: str, limit: int) -> List[ProductRecord]:
+        """Full-text matches, best first; the matched rows join the identity map"""
+        asins = search.search_asins(self.db, self.owner_id, query, limit)
+        found = self.get_many(asins)
+        return [found[asin] for asin in asins if found[asin] is not None]
+
+    def prefetch_for(self, nodes: List[Dict]):
+        """Load every product the graph will read with one query.
+
+        All ``get_bestselling_asins`` nodes with the same ``window`` are served
+        from the largest ``topCount`` among them, and loading full rows there
+        means later ``get_asin_details`` lookups on those ASINs hit the
+        identity map.
+        """
+        for window, count in bestseller_counts(nodes).items():
+            self.top_selling(count, window)
+
+
+def bestseller_counts(nodes: List[Dict]) -> Dict[Optional[int], int]:
+    """The largest ``topCount`` of the graph's bestseller nodes, per sales window"""
+    counts: Dict[Optional[int], int] = {}
+    for node in nodes:
+        if node.get("type") == "get_bestselling_asins":
+            data = node.get("data", {})
+            window = sales_window(data.get("window"))
+            counts[window] = max(counts.get(window, 0), top_count(data.get("topCount")))
+    return counts
+
+
+def sales_window(value) -> Optional[int]:
+    """A node's ``window`` setting as a number of days (None = lifetime)"""
+    if value in (None, "", "lifetime"):
+        return None
+    if isinstance(value, str) and value.endswith("d"):
+        value = value[:-1]
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid sales window: {value!r}")
+    if days < 1:
+        raise ValueError(f"Sales window must be at least one day, got {days}")
+    return days
+
+
+def top_count(value) -> int:
+    """A bestseller node's ``topCount`` setting as a number of products"""
+    if value in (None, ""):
+        return 10
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid topCount: {value!r}")
+    if count < 1:
+        raise ValueError(f"topCount must be at least 1, got {count}")
+    return count
+
+
+def get_fields(
+    db: Session, owner_id, asins: Iterable[str], fields: Sequence[str] = PRODUCT_FIELDS
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """``fields`` of the owner's products among ``asins``, in request order,
+    and the ASINs that aren't among them; one query on the primary key"""
+    asins = list(dict.fromkeys(asins))
+    columns = [getattr(models.MyProduct, field) for field in fields]
+    rows = db.query(models.MyProduct.asin, *columns).filter(
+        models.MyProduct.owner_id == owner_id, models.MyProduct.asin.in_(asins)
+    )
+    found = {row[0]: dict(zip(fields, row[1:])) for row in rows}
+    return [found[asin] for asin in asins if asin in found], [
+        asin for asin in asins if asin not in found
+    ]
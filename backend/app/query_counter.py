@@ -0,0 +1,174 @@
+"""SQL query instrumentation.
+
+Every statement sent through a SQLAlchemy engine is counted against the
+innermost active ``QueryStats`` (a request, a workflow run, ...) and its
+parents. Statements are normalised to their "shape" so repeated identical
+shapes can be reported as N+1 patterns.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"IN \((?:[^()]*?,\s*)+[^()]*?\)", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a SQL statement to its shape (whitespace and IN-list size removed)"""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (?)", statement)
+
+
+class QueryStats:
+    """Statement counts for one unit of work"""
+
+    def __init__(self, label: str = "", parent: Optional["QueryStats"] = None):
+        self.label = label
+        self.parent = parent
+        self.count = 0
+        self.statements: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str):
+        shape = normalize_statement(statement)
+        with self._lock:
+            self.count += 1
+            self.statements[shape] += 1
+        if self.parent is not None:
+            self.parent.record(statement)
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times (N+1 candidates)"""
+        if threshold is None:
+            threshold = settings.query_n_plus_one_threshold
+        return [
+            (shape, count)
+            for shape, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def report(self):
+        """Log the statement count and warn about N+1 patterns"""
+        logger.debug("%s issued %d SQL statements", self.label, self.count)
+        for shape, count in self.repeated():
+            logger.warning(
+                "Possible N+1 in %s: statement repeated %d times: %s",
+                self.label,
+                count,
+                shape,
+            )
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Process-wide captures see statements from every thread, which is what tests
+# need since TestClient runs the app on its own event loop thread.
+_captures: List[QueryStats] = []
+_captures_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement)
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.record(statement)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track(label: str) -> Iterator[QueryStats]:
+    """Count statements issued in the current context, nested under any outer tracker"""
+    stats = QueryStats(label, parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        stats.report()
+
+
+@contextmanager
+def capture_queries(label: str = "capture") -> Iterator[QueryStats]:
+    """Count every statement issued by any thread while the block runs"""
+    stats = QueryStats(label)
+    with _captures_lock:
+        _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.remove(stats)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget:
+    """Assert a block or function stays within a SQL statement budget.
+
+    Usable as a context manager (``with query_budget(3): ...``) or as a
+    decorator (``@query_budget(3)``). ``max_repeats`` caps how often a single
+    statement shape may run, which catches N+1 loops even when the total
+    budget is generous.
+    """
+
+    def __init__(self, max_queries: int, max_repeats: Optional[int] = None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self._capture = None
+        self.stats: Optional[QueryStats] = None
+
+    def __enter__(self) -> QueryStats:
+        self._capture = capture_queries(f"budget({self.max_queries})")
+        self.stats = self._capture.__enter__()
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb):
+        self._capture.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+        stats = self.stats
+        if stats.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"Expected at most {self.max_queries} SQL statements, got "
+                f"{stats.count}:\n"
+                + "\n".join(
+                    f"  {count}x {shape}" for shape, count in stats.statements.items()
+                )
+            )
+        if self.max_repeats is not None:
+            repeated = stats.repeated(self.max_repeats + 1)
+            if repeated:
+                raise QueryBudgetExceeded(
+                    f"Statement repeated more than {self.max_repeats} times (N+1):\n"
+                    + "\n".join(f"  {count}x {shape}" for shape, count in repeated)
+                )
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(self.max_queries, self.max_repeats):
+                return func(*args, **kwargs)
+
+        return wrapper
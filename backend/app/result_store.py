@@ -0,0 +1,169 @@
+"""Content-addressed storage for workflow run results.
+
+Each node output is serialised to canonical JSON and stored once in
+``result_payloads`` keyed by its SHA-256. Runs only keep
+``(node_id, payload_hash)`` links, so identical outputs produced by
+repeated runs share a single row.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import models
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+
+
+def payload_hash(value: Any) -> str:
+    return hashlib.sha256(canonical_json(value).encode("utf-8")).hexdigest()
+
+
+def store_results(
+    db: Session, run: models.WorkflowRun, results: Optional[Dict[str, Any]]
+):
+    """Attach ``results`` to ``run`` as links to deduplicated payloads.
+
+    The caller commits. ``run.results`` is left empty; use ``hydrate_results``
+    to read the original shape back.
+    """
+    run.results = None
+    if not results:
+        return
+
+    encoded = {}
+    for node_id, value in results.items():
+        data = canonical_json(value).encode("utf-8")
+        encoded[node_id] = (hashlib.sha256(data).hexdigest(), len(data), value)
+
+    hashes = {digest for digest, _, _ in encoded.values()}
+    existing = {
+        row.hash
+        for row in db.query(models.ResultPayload.hash).filter(
+            models.ResultPayload.hash.in_(hashes)
+        )
+    }
+
+    new_payloads = {}
+    for digest, size, value in encoded.values():
+        if digest not in existing and digest not in new_payloads:
+            new_payloads[digest] = (size, value)
+
+    if new_payloads:
+        try:
+            with db.begin_nested():
+                db.add_all(_payload_rows(new_payloads))
+        except IntegrityError:
+            # A concurrent run stored some of the same payloads first; insert
+            # one at a time and skip the ones that already exist
+            for digest, item in new_payloads.items():
+                try:
+                    with db.begin_nested():
+                        db.add_all(_payload_rows({digest: item}))
+                except IntegrityError:
+                    pass
+
+    db.add_all(
+        models.WorkflowRunPayload(
+            run_id=run.id, node_id=node_id, position=position, payload_hash=digest
+        )
+        for position, (node_id, (digest, _, _)) in enumerate(encoded.items())
+    )
+
+
+def _payload_rows(payloads):
+    return [
+        models.ResultPayload(hash=digest, payload=value, size_bytes=size)
+        for digest, (size, value) in payloads.items()
+    ]
+
+
+def hydrate_results(db: Session, runs: Iterable[models.WorkflowRun]):
+    """Reassemble ``results`` for runs stored by reference, in one query"""
+    pending = {run.id: run for run in runs if run.results is None}
+    if not pending:
+        return
+
+    rows = (
+        db.query(
+            models.WorkflowRunPayload.run_id,
+            models.WorkflowRunPayload.node_id,
+            models.ResultPayload.payload,
+        )
+        .join(
+            models.ResultPayload,
+            models.ResultPayload.hash == models.WorkflowRunPayload.payload_hash,
+        )
+        .filter(models.WorkflowRunPayload.run_id.in_(list(pending)))
+        .order_by(models.WorkflowRunPayload.run_id, models.WorkflowRunPayload.position)
+        .all()
+    )
+
+    assembled: Dict[Any, Dict[str, Any]] = {}
+    for run_id, node_id, payload in rows:
+        assembled.setdefault(run_id, {})[node_id] = payload
+
+    for run_id, run in pending.items():
+        if run_id in assembled:
+            # Set without marking the run dirty so nothing is written back
+            set_committed_value(run, "results", assembled[run_id])
+
+
+def collect_garbage(db: Session) -> int:
+    """Delete payloads no run references any more. Returns the number removed"""
+    referenced = db.query(models.WorkflowRunPayload.payload_hash)
+    return (
+        db.query(models.ResultPayload)
+        .filter(~models.ResultPayload.hash.in_(referenced))
+        .delete(synchronize_session=False)
+    )
+
+
+def storage_stats(db: Session, user_id) -> Dict[str, Any]:
+    """Compare the bytes ``user_id``'s runs reference with the bytes their
+    distinct payloads take.
+
+    Only the user's own runs are counted; a payload other users' runs share
+    is counted once like any other, so nothing about them shows.
+    """
+    links = (
+        db.query(
+            models.WorkflowRunPayload.payload_hash, models.ResultPayload.size_bytes
+        )
+        .join(
+            models.ResultPayload,
+            models.ResultPayload.hash == models.WorkflowRunPayload.payload_hash,
+        )
+        .join(
+            models.WorkflowRun,
+            models.WorkflowRun.id == models.WorkflowRunPayload.run_id,
+        )
+        .filter(models.WorkflowRun.user_id == user_id)
+    )
+    references, logical_bytes = links.with_entities(
+        func.count(models.WorkflowRunPayload.run_id),
+        func.coalesce(func.sum(models.ResultPayload.size_bytes), 0),
+    ).one()
+    payloads = links.distinct().subquery()
+    unique_payloads, stored_bytes = db.query(
+        func.count(payloads.c.payload_hash),
+        func.coalesce(func.sum(payloads.c.size_bytes), 0),
+    ).one()
+
+    saved_bytes = logical_bytes - stored_bytes
+    return {
+        "references": references,
+        "unique_payloads": unique_payloads,
+        "logical_bytes": logical_bytes,
+        "stored_bytes": stored_bytes,
+        "saved_bytes": saved_bytes,
+        "dedup_ratio": (logical_bytes / stored_bytes) if stored_bytes else 1.0,
+    }
@@ -0,0 +1,295 @@
+"""Retention and archival of workflow run history.
+
+Each workflow may keep its last N runs and/or its runs from the last D
+days (``retention_keep_runs`` / ``retention_keep_days``, falling back to the
+settings defaults). A run outside every limit that is set has expired.
+``compact`` moves expired runs, with their hydrated results, into gzip JSONL
+files partitioned by the month the run started
+(``<run_archive_dir>/YYYY-MM.jsonl.gz``) and deletes them from the database
+in batches, leaving a small ``archived_runs`` row to find them again.
+Archived runs can be read back on demand or restored into ``workflow_runs``.
+
+Archive files are written before the rows are deleted, so a crash can at
+worst archive a run twice; readers keep the last copy.
+"""
+import fcntl
+import gzip
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app import models, result_store
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def policy_for(keep_runs: Optional[int], keep_days: Optional[int]) -> Dict[str, int]:
+    return {
+        "keep_runs": settings.run_retention_keep_runs
+        if keep_runs is None
+        else keep_runs,
+        "keep_days": settings.run_retention_keep_days
+        if keep_days is None
+        else keep_days,
+    }
+
+
+def _archive_path(month: str) -> str:
+    return os.path.join(settings.run_archive_dir, f"{month}.jsonl.gz")
+
+
+def _month(started_at: Optional[datetime]) -> str:
+    return (started_at or datetime.utcnow()).strftime("%Y-%m")
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _record(run: models.WorkflowRun) -> Dict[str, Any]:
+    return {
+        "id": str(run.id),
+        "workflow_id": str(run.workflow_id),
+        "user_id": str(run.user_id),
+        "status": run.status,
+        "results": run.results,
+        "error_message": run.error_message,
+        "started_at": _isoformat(run.started_at),
+        "completed_at": _isoformat(run.completed_at),
+    }
+
+
+@contextmanager
+def _compaction_lock() -> Iterator[bool]:
+    """Yields False when another process on this host is already compacting"""
+    os.makedirs(settings.run_archive_dir, exist_ok=True)
+    with open(os.path.join(settings.run_archive_dir, ".lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _expired_runs(
+    db: Session, workflow_id, keep_runs: int, keep_days: int, now: datetime
+):
+    """Query for a workflow's expired run ids, oldest last"""
+    candidates = db.query(models.WorkflowRun.id).filter(
+        models.WorkflowRun.workflow_id == workflow_id,
+        models.WorkflowRun.status != "running",
+        or_(
+            models.WorkflowRun.retain_until.is_(None),
+            models.WorkflowRun.retain_until < now,
+        ),
+    )
+    # Both limits keep a prefix of the newest runs; the longer prefix wins
+    skip = keep_runs
+    if keep_days:
+        recent = candidates.filter(
+            models.WorkflowRun.started_at >= now - timedelta(days=keep_days)
+        ).count()
+        skip = max(skip, recent)
+    return candidates.order_by(
+        models.WorkflowRun.started_at.desc(), models.WorkflowRun.id
+    ).offset(skip)
+
+
+def _archive_batch(db: Session, run_ids: List) -> int:
+    runs = db.query(models.WorkflowRun).filter(models.WorkflowRun.id.in_(run_ids)).all()
+    result_store.hydrate_results(db, runs)
+
+    by_month: Dict[str, List[models.WorkflowRun]] = {}
+    for run in runs:
+        by_month.setdefault(_month(run.started_at), []).append(run)
+
+    for month, month_runs in by_month.items():
+        lines = "".join(
+            json.dumps(_record(run), ensure_ascii=False, default=str) + "\n"
+            for run in month_runs
+        )
+        # Each batch appends a complete gzip member; readers see one continuous stream
+        with open(_archive_path(month), "ab") as archive:
+            archive.write(gzip.compress(lines.encode("utf-8")))
+            archive.flush()
+            os.fsync(archive.fileno())
+
+    db.add_all(
+        models.ArchivedRun(
+            id=run.id,
+            workflow_id=run.workflow_id,
+            user_id=run.user_id,
+            status=run.status,
+            started_at=run.started_at,
+            archive_month=_month(run.started_at),
+        )
+        for run in runs
+    )
+    db.query(models.WorkflowRunPayload).filter(
+        models.WorkflowRunPayload.run_id.in_(run_ids)
+    ).delete(synchronize_session=False)
+    db.query(models.WorkflowRun).filter(models.WorkflowRun.id.in_(run_ids)).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    for run in runs:
+        db.expunge(run)
+    return len(runs)
+
+
+def compact(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Archive every expired run in batches. Returns counts of what was removed"""
+    now = now or datetime.utcnow()
+    archived = 0
+    with _compaction_lock() as acquired:
+        if not acquired:
+            return {"archived": 0, "payloads_removed": 0}
+
+        workflows = db.query(
+            models.Workflow.id,
+            models.Workflow.retention_keep_runs,
+            models.Workflow.retention_keep_days,
+        ).all()
+        for workflow_id, keep_runs, keep_days in workflows:
+            policy = policy_for(keep_runs, keep_days)
+            if not policy["keep_runs"] and not policy["keep_days"]:
+                continue
+            while True:
+                batch = [
+                    run_id
+                    for run_id, in _expired_runs(
+                        db, workflow_id, policy["keep_runs"], policy["keep_days"], now
+                    ).limit(settings.run_retention_batch_size)
+                ]
+                if not batch:
+                    break
+                archived += _archive_batch(db, batch)
+
+        payloads_removed = result_store.collect_garbage(db) if archived else 0
+        db.commit()
+    return {"archived": archived, "payloads_removed": payloads_removed}
+
+
+def _read_archive(month: str, run_ids) -> Dict[str, Dict[str, Any]]:
+    wanted = {str(run_id) for run_id in run_ids}
+    found = {}
+    path = _archive_path(month)
+    if not os.path.exists(path):
+        return found
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            record = json.loads(line)
+            if record["id"] in wanted:
+                # A run archived twice: keep the last copy
+                found[record["id"]] = record
+    return found
+
+
+def read_archived_runs(db: Session, workflow_id, user_id) -> List[Dict[str, Any]]:
+    """A workflow's archived runs, newest first"""
+    rows = (
+        db.query(models.ArchivedRun.id, models.ArchivedRun.archive_month)
+        .filter(
+            models.ArchivedRun.workflow_id == workflow_id,
+            models.ArchivedRun.user_id == user_id,
+        )
+        .all()
+    )
+    by_month: Dict[str, List] = {}
+    for run_id, month in rows:
+        by_month.setdefault(month, []).append(run_id)
+
+    records = []
+    for month, run_ids in by_month.items():
+        records.extend(_read_archive(month, run_ids).values())
+    return sorted(records, key=lambda record: record["started_at"] or "", reverse=True)
+
+
+def restore_run(db: Session, run_id, user_id) -> Optional[models.WorkflowRun]:
+    """Move an archived run back into ``workflow_runs``; None if it isn't archived"""
+    entry = (
+        db.query(models.ArchivedRun)
+        .filter(
+            models.ArchivedRun.id == run_id,
+            models.ArchivedRun.user_id == user_id,
+        )
+        .first()
+    )
+    if entry is None:
+        return None
+    record = _read_archive(entry.archive_month, [entry.id]).get(str(entry.id))
+    if record is None:
+        raise LookupError(f"Run {run_id} is missing from archive {entry.archive_month}")
+
+    run = models.WorkflowRun(
+        id=entry.id,
+        workflow_id=entry.workflow_id,
+        user_id=entry.user_id,
+        status=record["status"],
+        error_message=record["error_message"],
+        started_at=datetime.fromisoformat(record["started_at"])
+        if record["started_at"]
+        else None,
+        completed_at=datetime.fromisoformat(record["completed_at"])
+        if record["completed_at"]
+        else None,
+        retain_until=datetime.utcnow()
+        + timedelta(days=settings.run_restore_retention_days),
+    )
+    db.add(run)
+    result_store.store_results(db, run, record["results"])
+    db.delete(entry)
+    db.commit()
+    db.refresh(run)
+    result_store.hydrate_results(db, [run])
+    return run
+
+
+class RetentionWorker:
+    """Runs ``compact`` every ``interval`` seconds on a daemon thread"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="run-retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                stats = compact(db)
+                if stats["archived"]:
+                    logger.info(
+                        "Archived %(archived)d runs, removed %(payloads_removed)d "
+                        "payloads",
+                        stats,
+                    )
+            except Exception:
+                logger.exception("Run retention compaction failed")
+                db.rollback()
+            finally:
+                db.close()
@@ -1,33 +1,128 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app import models, schemas, auth
+from app import (
+    auth,
+    etags,
+    models,
+    product_repository,
+    sales_history,
+    schemas,
+    search,
+    serialization,
+)
+from app.database import get_db, get_read_db
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
 @router.get("/", response_model=List[schemas.MyProduct])
 def get_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
+):
+    """Get the current user's products"""
+    owned = models.MyProduct.owner_id == current_user.id
+    versions = (
+        db.query(models.MyProduct.asin, models.MyProduct.updated_at)
+        .filter(owned)
+        .order_by(models.MyProduct.asin)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    etag = etags.make_etag(skip, limit, *versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+
+    products = (
+        db.query(models.MyProduct)
+        .filter(owned)
+        .order_by(models.MyProduct.asin)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return serialization.json_list_response(
+        serialization.products_adapter, products, headers=etags.headers(etag)
+    )
+
+
+@router.get("/search", response_model=List[schemas.MyProduct])
+def search_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Full-text search over product title, description and bullet points"""
+    products = search.search_products(db, current_user.id, q, limit)
+    return serialization.json_list_response(serialization.products_adapter, products)
+
+
+@router.post("/batch", response_model=schemas.ProductBatch)
+def get_products_batch(
+    batch: schemas.ProductBatchRequest,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return; asin is always included"
+    ),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
 ):
-    """Get all products"""
-    products = db.query(models.MyProduct).offset(skip).limit(limit).all()
-    return products
+    """Get many products by ASIN in one request, with only the fields asked for.
+
+    ASINs that aren't in the current user's catalog are listed in ``missing``.
+    """
+    projection = product_repository.PRODUCT_FIELDS
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = sorted(requested - set(projection))
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        projection = [
+            field for field in projection if field in requested or field == "asin"
+        ]
+
+    products, missing = product_repository.get_fields(
+        db, current_user.id, batch.asins, projection
+    )
+    return serialization.json_response(
+        serialization.product_batch_adapter, {"products": products, "missing": missing}
+    )
 
 
 @router.get("/{asin}", response_model=schemas.MyProduct)
 def get_product(
     asin: str,
+    request: Request,
+    response: Response,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
 ):
     """Get a specific product by ASIN"""
-    product = db.query(models.MyProduct).filter(models.MyProduct.asin == asin).first()
+    owned = models.MyProduct.owner_id == current_user.id
+    version = (
+        db.query(models.MyProduct.updated_at)
+        .filter(models.MyProduct.asin == asin, owned)
+        .first()
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    etag = etags.make_etag(asin, version.updated_at)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    etags.set_etag(response, etag)
+
+    product = (
+        db.query(models.MyProduct).filter(models.MyProduct.asin == asin, owned).first()
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
@@ -36,14 +131,75 @@ def get_product(
 @router.get("/bestselling/{count}")
 def get_bestselling_products(
     count: int = 10,
+    window: Optional[int] = Query(
+        None, ge=1, description="Rank by sales over the last N days instead of lifetime"
+    ),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
 ):
     """Get top selling products"""
-    products = (
-        db.query(models.MyProduct)
-        .order_by(models.MyProduct.sales_amount.desc())
-        .limit(count)
+    if window is None:
+        products = (
+            db.query(models.MyProduct)
+            .filter(models.MyProduct.owner_id == current_user.id)
+            .order_by(models.MyProduct.sales_amount.desc())
+            .limit(count)
+            .all()
+        )
+        return [
+            {"asin": p.asin, "title": p.title, "sales_amount": p.sales_amount}
+            for p in products
+        ]
+
+    ranked = sales_history.top_selling(db, current_user.id, window, count)
+    titles = dict(
+        db.query(models.MyProduct.asin, models.MyProduct.title)
+        .filter(
+            models.MyProduct.owner_id == current_user.id,
+            models.MyProduct.asin.in_([asin for asin, _ in ranked]),
+        )
         .all()
     )
-    return [{"asin": p.asin, "title": p.title, "sales_amount": p.sales_amount} for p in products]
\ No newline at end of file
+    return [
+        {
+            "asin": asin,
+            "title": titles[asin],
+            "sales_amount": amount,
+            "window_days": window,
+        }
+        for asin, amount in ranked
+        if asin in titles
+    ]
+
+
+@router.post("/sales", response_model=schemas.SalesRecorded, status_code=201)
+def record_sales(
+    events: List[schemas.SalesEventCreate],
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Record sales events, updating daily/weekly rollups and lifetime sales"""
+    asins = {event.asin for event in events}
+    known = {
+        asin
+        for asin, in db.query(models.MyProduct.asin).filter(
+            models.MyProduct.asin.in_(asins),
+            models.MyProduct.owner_id == current_user.id,
+        )
+    }
+    missing = sorted(asins - known)
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown products: {', '.join(missing)}"
+        )
+
+    recorded = sales_history.record_sales(
+        db,
+        current_user.id,
+        (
+            (event.asin, event.amount, event.units, event.occurred_at)
+            for event in events
+        ),
+    )
+    db.commit()
+    return {"recorded": recorded}
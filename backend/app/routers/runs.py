@@ -0,0 +1,123 @@
+import uuid
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app import auth, json_search, models, run_control, run_export, schemas
+from app.database import get_db, get_read_db
+
+router = APIRouter(prefix="/runs", tags=["runs"])
+
+
+@router.get("/search", response_model=List[schemas.RunSearchResult])
+def search_runs(
+    asin: Optional[str] = Query(
+        None, description="Only runs with a result mentioning this ASIN"
+    ),
+    result_type: Optional[str] = Query(
+        None, description="Only runs with a result of this type"
+    ),
+    contains: Optional[str] = Query(
+        None, description="A JSON object one of the run's results must contain"
+    ),
+    run_status: Optional[str] = Query(None, alias="status"),
+    workflow_id: Optional[uuid.UUID] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Find runs by what their node results contain, newest first.
+
+    Each criterion may be met by a different node of the run. ``contains``
+    matches a single node result like PostgreSQL's ``@>``, for example
+    ``{"type": "asin_list", "value": ["B08N5WRWNW"]}``.
+    """
+    groups = []
+    if asin:
+        groups.append(json_search.asin_patterns(asin))
+    if result_type:
+        groups.append([{"type": result_type}])
+    try:
+        if contains:
+            groups.append([json_search.parse_pattern(contains)])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not groups:
+        raise HTTPException(
+            status_code=400, detail="Give asin, result_type or contains"
+        )
+    return json_search.search_runs(
+        db, current_user.id, groups, limit, run_status, workflow_id
+    )
+
+
+@router.get("/{run_id}/export")
+def export_run(
+    run_id: uuid.UUID,
+    export_format: run_export.ExportFormat = Query("csv", alias="format"),
+    node: Optional[str] = Query(
+        None, description="Node whose table to export; the run's last table by default"
+    ),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Stream a table result of the run as CSV, NDJSON or Parquet"""
+    if export_format == "parquet" and not run_export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export needs pyarrow",
+        )
+    run = (
+        db.query(models.WorkflowRun)
+        .filter(
+            models.WorkflowRun.id == run_id,
+            models.WorkflowRun.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    try:
+        node_id, rows = run_export.find_table(db, run, node)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return run_export.export_response(rows, export_format, f"run-{run.id}-{node_id}")
+
+
+@router.post(
+    "/{run_id}/cancel",
+    response_model=schemas.RunCancelRequested,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def cancel_run(
+    run_id: uuid.UUID,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Ask a running workflow run to stop.
+
+    The run stops at its next node or loop iteration and is recorded as
+    ``cancelled`` with the results that finished.
+    """
+    run = (
+        db.query(models.WorkflowRun)
+        .filter(
+            models.WorkflowRun.id == run_id,
+            models.WorkflowRun.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run.status != "running":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Run already {run.status}"
+        )
+
+    run_control.request_cancel(db, run)
+    return run
@@ -1,11 +1,30 @@
-from typing import List
-from datetime import datetime
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+from functools import partial
+from typing import List, Optional
 
-from app.database import get_db
-from app import models, schemas, auth
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, load_only
+
+from app import (
+    admission,
+    auth,
+    etags,
+    json_search,
+    models,
+    pagination,
+    result_store,
+    retention,
+    run_control,
+    run_export,
+    schemas,
+    serialization,
+    single_flight,
+)
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.planner import WorkflowPlanner, budget_violations
 from app.workflow_engine import WorkflowEngine
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
@@ -13,11 +32,27 @@ router = APIRouter(prefix="/workflows", tags=["workflows"])
 
 @router.get("/", response_model=List[schemas.Workflow])
 def get_workflows(
+    request: Request,
+    response: Response,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
 ):
     """Get all workflows for current user"""
-    workflows = db.query(models.Workflow).filter(models.Workflow.user_id == current_user.id).all()
+    versions = (
+        db.query(models.Workflow.id, models.Workflow.updated_at)
+        .filter(models.Workflow.user_id == current_user.id)
+        .all()
+    )
+    etag = etags.make_etag(*versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    etags.set_etag(response, etag)
+
+    workflows = (
+        db.query(models.Workflow)
+        .filter(models.Workflow.user_id == current_user.id)
+        .all()
+    )
     return workflows
 
 
@@ -25,7 +60,7 @@ def get_workflows(
 def create_workflow(
     workflow: schemas.WorkflowCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
 ):
     """Create a new workflow"""
     db_workflow = models.Workflow(**workflow.dict(), user_id=current_user.id)
@@ -35,21 +70,132 @@ def create_workflow(
     return db_workflow
 
 
+@router.get("/summary", response_model=schemas.WorkflowSummaryPage)
+def get_workflow_summaries(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    name: Optional[str] = None,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """List workflows without their flow_data, newest first.
+
+    Pass ``next_cursor`` from a page as ``cursor`` to get the next one.
+    """
+    query = (
+        db.query(models.Workflow)
+        .options(
+            load_only(
+                models.Workflow.id,
+                models.Workflow.name,
+                models.Workflow.description,
+                models.Workflow.node_count,
+                models.Workflow.edge_count,
+                models.Workflow.created_at,
+                models.Workflow.updated_at,
+            )
+        )
+        .filter(models.Workflow.user_id == current_user.id)
+    )
+    if name:
+        query = query.filter(models.Workflow.name.icontains(name, autoescape=True))
+    if cursor:
+        try:
+            updated_at, workflow_id = pagination.decode_cursor(cursor)
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(
+            or_(
+                models.Workflow.updated_at < updated_at,
+                and_(
+                    models.Workflow.updated_at == updated_at,
+                    models.Workflow.id < workflow_id,
+                ),
+            )
+        )
+
+    workflows = (
+        query.order_by(models.Workflow.updated_at.desc(), models.Workflow.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(workflows) > limit:
+        workflows = workflows[:limit]
+        last = workflows[-1]
+        next_cursor = pagination.encode_cursor(last.updated_at, last.id)
+    return {"items": workflows, "next_cursor": next_cursor}
+
+
+@router.get("/search", response_model=List[schemas.WorkflowSummary])
+def search_workflows(
+    node_type: Optional[str] = Query(
+        None, description="Only workflows with a node of this type"
+    ),
+    contains: Optional[str] = Query(
+        None, description="A JSON object flow_data must contain"
+    ),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Find workflows by what their graph contains, newest first.
+
+    ``contains`` matches like PostgreSQL's ``@>``; for example
+    ``{"nodes": [{"data": {"window": "7d"}}]}`` finds graphs with a node
+    ranking over a 7-day window.
+    """
+    groups = []
+    if node_type:
+        groups.append([json_search.node_type_pattern(node_type)])
+    try:
+        if contains:
+            groups.append([json_search.parse_pattern(contains)])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not groups:
+        raise HTTPException(status_code=400, detail="Give node_type or contains")
+    return json_search.search_workflows(db, current_user.id, groups, limit)
+
+
 @router.get("/{workflow_id}", response_model=schemas.Workflow)
 def get_workflow(
     workflow_id: uuid.UUID,
+    request: Request,
+    response: Response,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
 ):
     """Get a specific workflow"""
-    workflow = db.query(models.Workflow).filter(
-        models.Workflow.id == workflow_id,
-        models.Workflow.user_id == current_user.id
-    ).first()
-    
+    version = (
+        db.query(models.Workflow.updated_at)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if version is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    etag = etags.make_etag(workflow_id, version.updated_at)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    etags.set_etag(response, etag)
+
+    workflow = (
+        db.query(models.Workflow)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    
+
     return workflow
 
 
@@ -58,21 +204,25 @@ def update_workflow(
     workflow_id: uuid.UUID,
     workflow_update: schemas.WorkflowUpdate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
 ):
     """Update a workflow"""
-    workflow = db.query(models.Workflow).filter(
-        models.Workflow.id == workflow_id,
-        models.Workflow.user_id == current_user.id
-    ).first()
-    
+    workflow = (
+        db.query(models.Workflow)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    
+
     update_data = workflow_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(workflow, key, value)
-    
+
     workflow.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(workflow)
@@ -83,77 +233,306 @@ def update_workflow(
 def delete_workflow(
     workflow_id: uuid.UUID,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
 ):
     """Delete a workflow"""
-    workflow = db.query(models.Workflow).filter(
-        models.Workflow.id == workflow_id,
-        models.Workflow.user_id == current_user.id
-    ).first()
-    
+    workflow = (
+        db.query(models.Workflow)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    
+
     db.delete(workflow)
     db.commit()
     return {"message": "Workflow deleted successfully"}
 
 
+@router.post("/{workflow_id}/plan", response_model=schemas.WorkflowPlan)
+def plan_workflow(
+    workflow_id: uuid.UUID,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Estimate what running a workflow will cost, without running it"""
+    workflow = (
+        db.query(models.Workflow)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    try:
+        return WorkflowPlanner(db, current_user.id).plan(workflow.flow_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/{workflow_id}/run", response_model=schemas.WorkflowRun)
 def run_workflow(
     workflow_id: uuid.UUID,
+    coalesce: bool = False,
+    timeout_seconds: Optional[float] = Query(
+        None, gt=0, description="Deadline for this run; overrides the workflow's"
+    ),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Execute a workflow"""
-    workflow = db.query(models.Workflow).filter(
-        models.Workflow.id == workflow_id,
-        models.Workflow.user_id == current_user.id
-    ).first()
-    
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+):
+    """Execute a workflow.
+
+    With ``coalesce=true``, identical runs (same workflow and flow_data) that
+    arrive together share one engine execution; each still gets its own run.
+    A run that passes its deadline or is cancelled stops at the next node or
+    loop iteration and is recorded as ``timed_out`` or ``cancelled`` with the
+    results that finished.
+    """
+    workflow = (
+        db.query(models.Workflow)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    
+
+    if settings.run_max_estimated_queries or settings.run_max_estimated_output_bytes:
+        try:
+            violations = budget_violations(
+                WorkflowPlanner(read_db, current_user.id).plan(workflow.flow_data)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if violations:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Run rejected: {'; '.join(violations)}",
+            )
+
+    def release_connections():
+        db.commit()
+        read_db.rollback()
+
+    try:
+        # Waiting callers end their transactions so they don't pin pooled connections
+        with admission.run_admission.admit(
+            current_user.id, on_queue=release_connections
+        ):
+            return _execute_run(
+                workflow, coalesce, timeout_seconds, current_user, db, read_db
+            )
+    except admission.AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+# Engine result status -> run status
+_RUN_STATUSES = {
+    "success": "completed",
+    "cancelled": "cancelled",
+    "timed_out": "timed_out",
+}
+
+
+def _execute_coalesced(
+    engine: WorkflowEngine,
+    workflow: models.Workflow,
+    current_user: models.User,
+    control: run_control.RunControl,
+):
+    """Execute the workflow, sharing an identical execution already in flight.
+
+    The run's own deadline and cancel still apply while it waits for the
+    shared execution, and a shared result the other run's deadline or cancel
+    cut short is not taken over.
+    """
+    key = (workflow.id, result_store.payload_hash(workflow.flow_data))
+    try:
+        result, shared = single_flight.workflow_runs.do(
+            key,
+            lambda: engine.execute_workflow(workflow, current_user),
+            wait=control.wait,
+        )
+    except run_control.RunStopped as stopped:
+        return {"status": stopped.status, "error": str(stopped), "results": {}}
+    if shared and result["status"] in (
+        run_control.RunCancelled.status,
+        run_control.RunTimedOut.status,
+    ):
+        return engine.execute_workflow(workflow, current_user)
+    return result
+
+
+def _execute_run(
+    workflow: models.Workflow,
+    coalesce: bool,
+    timeout_seconds: Optional[float],
+    current_user: models.User,
+    db: Session,
+    read_db: Session,
+):
+    timeout = run_control.run_timeout(workflow, timeout_seconds)
+
     # Create workflow run record
     workflow_run = models.WorkflowRun(
-        workflow_id=workflow.id,
-        user_id=current_user.id,
-        status="running"
+        workflow_id=workflow.id, user_id=current_user.id, status="running"
     )
     db.add(workflow_run)
     db.commit()
     db.refresh(workflow_run)
-    
-    # Execute workflow
-    engine = WorkflowEngine(db)
+
+    # Execute workflow; the engine only reads products, so it can use the replica
     try:
-        result = engine.execute_workflow(workflow, current_user)
-        
-        workflow_run.status = "completed" if result["status"] == "success" else "failed"
-        workflow_run.results = result.get("results")
+        with run_control.active_runs.register(workflow_run.id, timeout) as control:
+            engine = WorkflowEngine(read_db, control)
+            if coalesce:
+                result = _execute_coalesced(engine, workflow, current_user, control)
+            else:
+                result = engine.execute_workflow(workflow, current_user)
+
+        workflow_run.status = _RUN_STATUSES.get(result["status"], "failed")
+        result_store.store_results(db, workflow_run, result.get("results"))
         workflow_run.error_message = result.get("error")
         workflow_run.completed_at = datetime.utcnow()
-        
+
     except Exception as e:
         workflow_run.status = "failed"
         workflow_run.error_message = str(e)
         workflow_run.completed_at = datetime.utcnow()
-    
+
     db.commit()
     db.refresh(workflow_run)
-    return workflow_run
+    result_store.hydrate_results(db, [workflow_run])
+    return serialization.json_response(serialization.workflow_run_adapter, workflow_run)
 
 
 @router.get("/{workflow_id}/runs", response_model=List[schemas.WorkflowRun])
 def get_workflow_runs(
     workflow_id: uuid.UUID,
+    request: Request,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
 ):
     """Get all runs for a specific workflow"""
-    runs = db.query(models.WorkflowRun).filter(
-        models.WorkflowRun.workflow_id == workflow_id,
-        models.WorkflowRun.user_id == current_user.id
-    ).order_by(models.WorkflowRun.started_at.desc()).all()
-    
-    return runs
\ No newline at end of file
+    versions = (
+        db.query(
+            models.WorkflowRun.id,
+            models.WorkflowRun.status,
+            models.WorkflowRun.completed_at,
+        )
+        .filter(
+            models.WorkflowRun.workflow_id == workflow_id,
+            models.WorkflowRun.user_id == current_user.id,
+        )
+        .order_by(models.WorkflowRun.started_at.desc())
+        .all()
+    )
+    etag = etags.make_etag(workflow_id, *versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+
+    runs = (
+        db.query(models.WorkflowRun)
+        .filter(
+            models.WorkflowRun.workflow_id == workflow_id,
+            models.WorkflowRun.user_id == current_user.id,
+        )
+        .order_by(models.WorkflowRun.started_at.desc())
+        .all()
+    )
+
+    result_store.hydrate_results(db, runs)
+    return serialization.json_list_response(
+        serialization.workflow_runs_adapter, runs, headers=etags.headers(etag)
+    )
+
+
+@router.get("/{workflow_id}/runs/export")
+def export_workflow_runs(
+    workflow_id: uuid.UUID,
+    export_format: run_export.ExportFormat = Query("csv", alias="format"),
+    node: Optional[str] = Query(
+        None, description="Node whose table to export; each run's last table by default"
+    ),
+    run_status: Optional[str] = Query(None, alias="status"),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Stream the table results of all the workflow's runs as one file, oldest first.
+
+    Rows start with ``run_id`` and ``run_started_at`` columns. Runs without
+    a matching table are left out.
+    """
+    if export_format == "parquet" and not run_export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export needs pyarrow",
+        )
+    workflow = (
+        db.query(models.Workflow.id)
+        .filter(
+            models.Workflow.id == workflow_id,
+            models.Workflow.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    rows = partial(
+        run_export.workflow_table_rows, workflow_id, current_user.id, node, run_status
+    )
+    return run_export.export_response(
+        rows, export_format, f"workflow-{workflow_id}-runs", run_export.RUN_COLUMNS
+    )
+
+
+@router.get("/runs/storage", response_model=schemas.ResultStorageStats)
+def get_result_storage_stats(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Report how much storage result deduplication saves on the user's runs"""
+    return result_store.storage_stats(db, current_user.id)
+
+
+@router.get("/{workflow_id}/runs/archived", response_model=List[schemas.WorkflowRun])
+def get_archived_workflow_runs(
+    workflow_id: uuid.UUID,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Read runs that retention moved to the archive, without restoring them"""
+    return retention.read_archived_runs(db, workflow_id, current_user.id)
+
+
+@router.post("/runs/{run_id}/restore", response_model=schemas.WorkflowRun)
+def restore_archived_run(
+    run_id: uuid.UUID,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Move an archived run back into the run history"""
+    try:
+        run = retention.restore_run(db, run_id, current_user.id)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    if run is None:
+        raise HTTPException(status_code=404, detail="Archived run not found")
+    return serialization.json_response(serialization.workflow_run_adapter, run)
@@ -0,0 +1,157 @@
+"""Run deadlines and cooperative cancellation.
+
+Each executing run has a ``RunControl``. The engine calls ``check()`` before
+every step and every loop iteration, and it raises ``RunCancelled`` or
+``RunTimedOut`` once the run should stop; the engine then returns what
+finished so far.
+
+``POST /runs/{id}/cancel`` records the request on the run row and sets the
+control's event when the run executes in this process. A run executing in
+another worker sees the row instead: its ``check()`` polls the database at
+most every ``run_cancel_poll_seconds``.
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+
+class RunStopped(Exception):
+    """A run stopped before finishing; ``results`` has the nodes that did finish"""
+
+    status = ""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.results: Dict = {}
+
+
+class RunCancelled(RunStopped):
+    status = "cancelled"
+
+
+class RunTimedOut(RunStopped):
+    status = "timed_out"
+
+
+class RunControl:
+    """The deadline and cancel flag of one run"""
+
+    def __init__(
+        self, timeout: Optional[float] = None, poll: Optional[Callable[[], bool]] = None
+    ):
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._cancelled = threading.Event()
+        self._poll = poll
+        self._next_poll = time.monotonic() + settings.run_cancel_poll_seconds
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one"""
+        return (
+            None
+            if self.deadline is None
+            else max(0.0, self.deadline - time.monotonic())
+        )
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise RunCancelled("Run was cancelled")
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            raise RunTimedOut(f"Run exceeded its {self.timeout:g} s deadline")
+        if self._poll is not None and now >= self._next_poll:
+            self._next_poll = now + settings.run_cancel_poll_seconds
+            if self._poll():
+                self.cancel()
+                raise RunCancelled("Run was cancelled")
+
+    def wait(self, event: threading.Event):
+        """Block until ``event`` is set, raising as ``check()`` does if the run
+        is cancelled or passes its deadline first"""
+        while True:
+            self.check()
+            timeout = settings.run_cancel_poll_seconds
+            remaining = self.remaining()
+            if remaining is not None:
+                timeout = min(timeout, remaining)
+            if event.wait(max(timeout, 0.01)):
+                return
+
+
+def run_timeout(
+    workflow: models.Workflow, requested: Optional[float]
+) -> Optional[float]:
+    """A run's deadline in seconds: the request's, else the workflow's, else the
+    settings default (None = no deadline)"""
+    for timeout in (
+        requested,
+        workflow.run_timeout_seconds,
+        settings.run_timeout_seconds,
+    ):
+        if timeout:
+            return float(timeout)
+    return None
+
+
+def cancel_requested(run_id: uuid.UUID) -> bool:
+    """Whether the run's row records a cancel request; reads the primary"""
+    db = SessionLocal()
+    try:
+        requested_at = (
+            db.query(models.WorkflowRun.cancel_requested_at)
+            .filter(models.WorkflowRun.id == run_id)
+            .scalar()
+        )
+    finally:
+        db.close()
+    return requested_at is not None
+
+
+class RunRegistry:
+    """Controls of the runs executing in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._controls: Dict[uuid.UUID, RunControl] = {}
+
+    @contextmanager
+    def register(
+        self, run_id: uuid.UUID, timeout: Optional[float]
+    ) -> Iterator[RunControl]:
+        control = RunControl(timeout, poll=lambda: cancel_requested(run_id))
+        with self._lock:
+            self._controls[run_id] = control
+        try:
+            yield control
+        finally:
+            with self._lock:
+                self._controls.pop(run_id, None)
+
+    def cancel(self, run_id: uuid.UUID) -> bool:
+        """Stop the run at its next check if it executes here; False otherwise"""
+        with self._lock:
+            control = self._controls.get(run_id)
+        if control is None:
+            return False
+        control.cancel()
+        return True
+
+
+def request_cancel(db, run: models.WorkflowRun):
+    """Record a cancel request on ``run`` and signal it if it executes here"""
+    run.cancel_requested_at = datetime.utcnow()
+    db.commit()
+    active_runs.cancel(run.id)
+
+
+active_runs = RunRegistry()
@@ -0,0 +1,387 @@
+"""Streaming export of tabular run results as CSV, NDJSON or Parquet.
+
+Table results (``product_details_table``, ``feature_table``, ``records``)
+are lists of objects. An export reads a stored payload as JSON text and
+decodes its rows one at a time, writing them out ``export_chunk_rows`` at a
+time, so a table is never held as Python objects all at once.
+
+CSV and Parquet read the rows twice: a first pass settles the columns (every
+key of every row, in the order they first appear) and, for Parquet, their
+types, so the header and schema hold for the whole export. A Parquet column
+is a double when all its values are numbers, a boolean when all are
+booleans, and text otherwise; nested values are written as JSON text. The
+header and schema are written even when there are no rows. Each pass of a
+bulk export is one query, fetching only the exported table of each run.
+Parquet needs the optional ``pyarrow`` package.
+"""
+import csv
+import io
+import json
+import re
+import uuid
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app import database, models
+from app.config import settings
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pyarrow = None
+
+TABLE_TYPES = ("product_details_table", "feature_table", "records")
+
+ExportFormat = Literal["csv", "ndjson", "parquet"]
+# Returns the rows to export; called once per pass over them
+RowSource = Callable[[], Iterable[Dict[str, Any]]]
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Leading columns of a bulk export, there even when no run has rows
+RUN_COLUMNS = ("run_id", "run_started_at")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+def _skip(text: str, index: int) -> int:
+    return _WHITESPACE.match(text, index).end()
+
+
+def _members(text: str) -> Iterator[Tuple[str, int]]:
+    """Keys of the top-level JSON object in ``text`` with the index where each
+    value starts; values are decoded only to step over them"""
+    index = _skip(text, 0)
+    if not text.startswith("{", index):
+        return
+    index = _skip(text, index + 1)
+    while not text.startswith("}", index):
+        key, index = _decoder.raw_decode(text, index)
+        index = _skip(text, _skip(text, index) + 1)  # past the colon
+        yield key, index
+        _, index = _decoder.raw_decode(text, index)
+        index = _skip(text, index)
+        if text.startswith(",", index):
+            index = _skip(text, index + 1)
+
+
+def _elements(text: str, index: int) -> Iterator[Any]:
+    """Elements of the JSON array starting at ``index``, decoded one at a time"""
+    if not text.startswith("[", index):
+        return
+    index = _skip(text, index + 1)
+    while not text.startswith("]", index):
+        element, index = _decoder.raw_decode(text, index)
+        yield element
+        index = _skip(text, index)
+        if text.startswith(",", index):
+            index = _skip(text, index + 1)
+
+
+# The ``type`` of a stored result, read by the database so only the
+# exported table's text is fetched
+_PAYLOAD_TYPE = models.ResultPayload.payload["type"].as_string()
+
+
+def table_rows(text: str) -> Iterator[Dict[str, Any]]:
+    """The rows of a stored table result"""
+    for key, index in _members(text):
+        if key == "value":
+            yield from _elements(text, index)
+            return
+
+
+def _inline_table(
+    results: Dict[str, Any], node_id: Optional[str]
+) -> Tuple[str, RowSource]:
+    """``find_table`` over results stored inline, from before content addressing"""
+    for found_id, result in reversed(list(results.items())):
+        if node_id not in (None, found_id) or not isinstance(result, dict):
+            continue
+        if result.get("type") in TABLE_TYPES:
+            return found_id, lambda rows=result.get("value") or []: rows
+        if node_id is not None:
+            raise ValueError(
+                f"Node '{node_id}' produced {result.get('type')}, not a table"
+            )
+    raise LookupError(
+        f"Node '{node_id}' has no result"
+        if node_id is not None
+        else "Run has no table result"
+    )
+
+
+def _table_payload(run_id, node_id: Optional[str]):
+    """Condition on ``workflow_run_payloads`` picking the run's table to
+    export: ``node_id``'s result, or the last table result"""
+    payload = models.WorkflowRunPayload
+    if node_id is not None:
+        return (payload.run_id == run_id) & (payload.node_id == node_id)
+    tables = aliased(models.WorkflowRunPayload)
+    last_table = (
+        select(func.max(tables.position))
+        .join(models.ResultPayload, models.ResultPayload.hash == tables.payload_hash)
+        .where(tables.run_id == run_id, _PAYLOAD_TYPE.in_(TABLE_TYPES))
+        .scalar_subquery()
+    )
+    return (payload.run_id == run_id) & (payload.position == last_table)
+
+
+def find_table(
+    db: Session, run: models.WorkflowRun, node_id: Optional[str] = None
+) -> Tuple[str, RowSource]:
+    """The node id and rows of ``node_id``'s result, or of the last table the
+    run produced.
+
+    Raises ``LookupError`` when there is no such result and ``ValueError``
+    when ``node_id``'s result is not a table.
+    """
+    if run.results is not None:
+        return _inline_table(run.results, node_id)
+    found = (
+        db.query(
+            models.WorkflowRunPayload.node_id,
+            _PAYLOAD_TYPE,
+            cast(models.ResultPayload.payload, Text),
+        )
+        .join(
+            models.ResultPayload,
+            models.ResultPayload.hash == models.WorkflowRunPayload.payload_hash,
+        )
+        .filter(_table_payload(run.id, node_id))
+        .first()
+    )
+    if found is None:
+        raise LookupError(
+            f"Node '{node_id}' has no result"
+            if node_id is not None
+            else "Run has no table result"
+        )
+    found_id, found_type, text = found
+    if found_type not in TABLE_TYPES:
+        raise ValueError(f"Node '{node_id}' produced {found_type}, not a table")
+    return found_id, lambda: table_rows(text)
+
+
+def workflow_table_rows(
+    workflow_id: uuid.UUID,
+    user_id: uuid.UUID,
+    node_id: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Table rows of each of the user's runs of a workflow, oldest run first.
+
+    Each row starts with ``run_id`` and ``run_started_at``; runs without a
+    matching table are skipped. One query reads every run with only its
+    table's payload. Reads through a session of its own, since the rows are
+    produced while the response streams.
+    """
+    run = models.WorkflowRun
+    db = (database.ReadSessionLocal or database.SessionLocal)()
+    try:
+        runs = (
+            db.query(
+                run.id,
+                run.started_at,
+                run.results,
+                cast(models.ResultPayload.payload, Text),
+            )
+            .select_from(run)
+            .outerjoin(models.WorkflowRunPayload, _table_payload(run.id, node_id))
+            .outerjoin(
+                models.ResultPayload,
+                (models.ResultPayload.hash == models.WorkflowRunPayload.payload_hash)
+                & _PAYLOAD_TYPE.in_(TABLE_TYPES),
+            )
+            .filter(run.workflow_id == workflow_id, run.user_id == user_id)
+        )
+        if status:
+            runs = runs.filter(run.status == status)
+        # Few runs per batch: each carries a whole table
+        for run_id, started_at, inline, text in runs.order_by(
+            run.started_at, run.id
+        ).yield_per(20):
+            if inline is not None:
+                try:
+                    _, rows = _inline_table(inline, node_id)
+                except (LookupError, ValueError):
+                    continue
+                table = rows()
+            elif text is not None:
+                table = table_rows(text)
+            else:
+                continue
+            prefix = {
+                "run_id": str(run_id),
+                "run_started_at": started_at.isoformat() if started_at else None,
+            }
+            for row in table:
+                yield {**prefix, **row}
+    finally:
+        db.close()
+
+
+def _chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, settings.export_chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _layout(
+    rows: Iterable[Dict[str, Any]], columns: Sequence[str]
+) -> Dict[str, Set[type]]:
+    """``columns`` and then every other column of ``rows`` in the order they
+    first appear, with the kinds of value (``bool``, ``float`` or ``str``)
+    the column holds besides null"""
+    layout: Dict[str, Set[type]] = {column: set() for column in columns}
+    for row in rows:
+        for column, value in row.items():
+            kinds = layout.setdefault(column, set())
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                kinds.add(bool)
+            elif isinstance(value, (int, float)):
+                kinds.add(float)
+            else:
+                kinds.add(str)
+    return layout
+
+
+def _cell(value: Any) -> Any:
+    # Nested values as JSON text
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+def ndjson_chunks(rows: RowSource, columns: Sequence[str] = ()) -> Iterator[bytes]:
+    # Every line names its own columns
+    for chunk in _chunks(rows()):
+        yield b"".join(orjson.dumps(row) + b"\n" for row in chunk)
+
+
+def csv_chunks(rows: RowSource, columns: Sequence[str] = ()) -> Iterator[bytes]:
+    """CSV with a header row, written even when there are no rows"""
+    columns = list(_layout(rows(), columns))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in _chunks(rows()):
+        writer.writerows(
+            [_cell(row.get(column)) for column in columns] for row in chunk
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class _Sink:
+    """A write-only file for ``ParquetWriter``; ``take`` hands over what was
+    written since the last call"""
+
+    closed = False
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_type(kinds: Set[type]):
+    # JSON doesn't tell 1 from 1.0, so every number is a double
+    if kinds == {float}:
+        return pyarrow.float64()
+    if kinds == {bool}:
+        return pyarrow.bool_()
+    return pyarrow.string()
+
+
+def _text(value: Any) -> Optional[str]:
+    value = _cell(value)
+    return value if value is None or isinstance(value, str) else json.dumps(value)
+
+
+def parquet_chunks(rows: RowSource, columns: Sequence[str] = ()) -> Iterator[bytes]:
+    """A Parquet file with one row group per chunk of rows"""
+    layout = _layout(rows(), columns)
+    schema = pyarrow.schema(
+        [(column, _arrow_type(kinds)) for column, kinds in layout.items()]
+    )
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for chunk in _chunks(rows()):
+        columns = {}
+        for field in schema:
+            cell = _text if pyarrow.types.is_string(field.type) else _cell
+            columns[field.name] = [cell(row.get(field.name)) for row in chunk]
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+_WRITERS = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+
+
+def export_response(
+    rows: RowSource, export_format: ExportFormat, name: str, columns: Sequence[str] = ()
+) -> StreamingResponse:
+    """Stream ``rows()`` as a ``name.<format>`` download; ``columns`` lead the
+    header and schema even when there are no rows"""
+    return StreamingResponse(
+        _WRITERS[export_format](rows, columns),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{export_format}"'
+        },
+    )
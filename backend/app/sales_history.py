@@ -0,0 +1,174 @@
+"""Sales history with pre-aggregated daily and weekly buckets.
+
+Every sale is stored in ``sales_events`` and, in the same transaction,
+added to its product's day and week buckets in ``sales_rollups`` and to the
+lifetime ``MyProduct.sales_amount``. Windowed bestseller queries ("top N
+over the last 30 days") read only the rollups: whole weeks inside the window
+come from weekly buckets and the partial weeks at either end from daily
+ones, so a year-long window reads about 60 buckets per product rather than
+every event. Rollups are keyed by owner as well, so a ranking only reads
+the requesting seller's buckets.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+
+DAY = "day"
+WEEK = "week"
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, like every other timestamp in the schema"""
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+# Rows per multi-row upsert, well under the bind parameter limits
+UPSERT_BATCH_SIZE = 1000
+
+
+def _upsert_rollups(db: Session, rows: List[Dict]):
+    insert = (
+        postgresql.insert
+        if db.get_bind().dialect.name == "postgresql"
+        else sqlite.insert
+    )
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = insert(models.SalesRollup).values(
+            rows[start : start + UPSERT_BATCH_SIZE]
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["granularity", "bucket_start", "owner_id", "asin"],
+                set_={
+                    "amount": models.SalesRollup.amount + statement.excluded.amount,
+                    "units": models.SalesRollup.units + statement.excluded.units,
+                },
+            )
+        )
+
+
+def record_sales(
+    db: Session, owner_id, events: Iterable[Tuple[str, float, int, Optional[datetime]]]
+) -> int:
+    """Store ``(asin, amount, units, occurred_at)`` events for products of
+    ``owner_id``'s catalog and fold them into the rollups.
+
+    ``occurred_at`` defaults to now. The caller commits.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "owner_id": owner_id,
+            "asin": asin,
+            "amount": float(amount),
+            "units": int(units),
+            "occurred_at": _utc(occurred_at) or now,
+        }
+        for asin, amount, units, occurred_at in events
+    ]
+    if not rows:
+        return 0
+    db.execute(models.SalesEvent.__table__.insert(), rows)
+
+    buckets: Dict[Tuple[str, date, str], List[float]] = {}
+    lifetime: Dict[str, float] = {}
+    for row in rows:
+        day = row["occurred_at"].date()
+        for key in ((DAY, day, row["asin"]), (WEEK, week_start(day), row["asin"])):
+            bucket = buckets.setdefault(key, [0.0, 0])
+            bucket[0] += row["amount"]
+            bucket[1] += row["units"]
+        lifetime[row["asin"]] = lifetime.get(row["asin"], 0.0) + row["amount"]
+
+    _upsert_rollups(
+        db,
+        [
+            {
+                "granularity": granularity,
+                "bucket_start": bucket_start,
+                "owner_id": owner_id,
+                "asin": asin,
+                "amount": amount,
+                "units": units,
+            }
+            for (granularity, bucket_start, asin), (amount, units) in buckets.items()
+        ],
+    )
+    product = models.MyProduct.__table__
+    db.execute(
+        update(product)
+        .where(product.c.owner_id == owner_id, product.c.asin == bindparam("sold_asin"))
+        .values(
+            sales_amount=product.c.sales_amount + bindparam("sold_amount"),
+            updated_at=now,
+        ),
+        [
+            {"sold_asin": asin, "sold_amount": amount}
+            for asin, amount in lifetime.items()
+        ],
+    )
+    return len(rows)
+
+
+def window_buckets(days: int, today: date):
+    """Rollup filter covering the ``days`` days ending with ``today``"""
+    start = today - timedelta(days=days - 1)
+    end = today + timedelta(days=1)
+    # Whole weeks inside the window: [first_week, last_week)
+    first_week = week_start(start + timedelta(days=6))
+    last_week = week_start(end)
+    rollup = models.SalesRollup
+    if first_week >= last_week:
+        return and_(
+            rollup.granularity == DAY,
+            rollup.bucket_start >= start,
+            rollup.bucket_start < end,
+        )
+    return or_(
+        and_(
+            rollup.granularity == WEEK,
+            rollup.bucket_start >= first_week,
+            rollup.bucket_start < last_week,
+        ),
+        and_(
+            rollup.granularity == DAY,
+            rollup.bucket_start >= start,
+            rollup.bucket_start < first_week,
+        ),
+        and_(
+            rollup.granularity == DAY,
+            rollup.bucket_start >= last_week,
+            rollup.bucket_start < end,
+        ),
+    )
+
+
+def top_selling(
+    db: Session, owner_id, days: int, count: int, today: Optional[date] = None
+) -> List[Tuple[str, float]]:
+    """``(asin, amount)`` of an owner's best sellers over the last ``days`` days.
+
+    Best first; products without sales in the window are not listed.
+    """
+    total = func.sum(models.SalesRollup.amount).label("total")
+    rows = (
+        db.query(models.SalesRollup.asin, total)
+        .filter(models.SalesRollup.owner_id == owner_id)
+        .filter(window_buckets(days, today or datetime.utcnow().date()))
+        .group_by(models.SalesRollup.asin)
+        .order_by(total.desc(), models.SalesRollup.asin)
+        .limit(count)
+        .all()
+    )
+    return [(asin, float(amount)) for asin, amount in rows]
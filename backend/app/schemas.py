@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import Optional, Any, List
-from pydantic import BaseModel, EmailStr
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
+from pydantic import BaseModel, EmailStr, Field
+
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -16,7 +17,7 @@ class UserCreate(UserBase):
 class User(UserBase):
     id: UUID
     created_at: datetime
-    
+
     class Config:
         from_attributes = True
 
@@ -35,15 +36,41 @@ class MyProductCreate(MyProductBase):
 
 class MyProduct(MyProductBase):
     created_at: datetime
-    
+
     class Config:
         from_attributes = True
 
 
+class ProductBatchRequest(BaseModel):
+    # One IN query; well under either database's bound parameter limit
+    asins: List[str] = Field(..., min_length=1, max_length=5000)
+
+
+class ProductBatch(BaseModel):
+    products: List[
+        Dict[str, Any]
+    ]  # the requested fields of each product found, in request order
+    missing: List[str]
+
+
+class SalesEventCreate(BaseModel):
+    asin: str
+    amount: float
+    units: int = Field(1, ge=1)
+    occurred_at: Optional[datetime] = None  # defaults to now
+
+
+class SalesRecorded(BaseModel):
+    recorded: int
+
+
 class WorkflowBase(BaseModel):
     name: str
     description: Optional[str] = None
     flow_data: dict
+    retention_keep_runs: Optional[int] = Field(None, ge=0)
+    retention_keep_days: Optional[int] = Field(None, ge=0)
+    run_timeout_seconds: Optional[float] = Field(None, gt=0)
 
 
 class WorkflowCreate(WorkflowBase):
@@ -54,6 +81,9 @@ class WorkflowUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     flow_data: Optional[dict] = None
+    retention_keep_runs: Optional[int] = Field(None, ge=0)
+    retention_keep_days: Optional[int] = Field(None, ge=0)
+    run_timeout_seconds: Optional[float] = Field(None, gt=0)
 
 
 class Workflow(WorkflowBase):
@@ -61,11 +91,29 @@ class Workflow(WorkflowBase):
     user_id: UUID
     created_at: datetime
     updated_at: datetime
-    
+
+    class Config:
+        from_attributes = True
+
+
+class WorkflowSummary(BaseModel):
+    id: UUID
+    name: str
+    description: Optional[str] = None
+    node_count: int
+    edge_count: int
+    created_at: datetime
+    updated_at: datetime
+
     class Config:
         from_attributes = True
 
 
+class WorkflowSummaryPage(BaseModel):
+    items: List[WorkflowSummary]
+    next_cursor: Optional[str] = None
+
+
 class WorkflowRunBase(BaseModel):
     workflow_id: UUID
 
@@ -82,11 +130,59 @@ class WorkflowRun(WorkflowRunBase):
     error_message: Optional[str] = None
     started_at: datetime
     completed_at: Optional[datetime] = None
-    
+
+    class Config:
+        from_attributes = True
+
+
+class RunSearchResult(BaseModel):
+    id: UUID
+    workflow_id: UUID
+    status: str
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+
     class Config:
         from_attributes = True
 
 
+class RunCancelRequested(BaseModel):
+    id: UUID
+    status: str  # still "running" until the run reaches its next check
+    cancel_requested_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class NodeCostEstimate(BaseModel):
+    node_id: str
+    type: Optional[str] = None
+    executions: int
+    queries: int
+    rows: int
+    output_items: int
+    output_bytes: int
+
+
+class WorkflowPlan(BaseModel):
+    nodes: List[NodeCostEstimate]
+    total_queries: int
+    total_rows: int
+    total_output_bytes: int
+    catalog_size: int
+    warnings: List[str]
+
+
+class ResultStorageStats(BaseModel):
+    references: int
+    unique_payloads: int
+    logical_bytes: int
+    stored_bytes: int
+    saved_bytes: int
+    dedup_ratio: float
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -98,4 +194,4 @@ class TokenData(BaseModel):
 
 class LoginRequest(BaseModel):
     email: EmailStr
-    password: str
\ No newline at end of file
+    password: str
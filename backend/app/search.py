@@ -0,0 +1,140 @@
+"""Full-text product search.
+
+On PostgreSQL, searches use ``to_tsvector`` over title, description and
+bullet points, backed by the ``ix_my_products_search`` GIN expression
+index. Other databases (SQLite in tests) fall back to an in-process
+inverted index per owner, rebuilt whenever that owner's catalog changes;
+only the ``search_index_max_tenants`` most recently searched are kept.
+Searches only ever see the requesting owner's products.
+"""
+import heapq
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.text import tokenize
+
+
+class InvertedIndex:
+    """Token -> {asin: term frequency} postings for an AND-of-terms search"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.sales: Dict[str, float] = {}
+
+    def add(self, asin: str, sales_amount: float, texts: Iterable[Optional[str]]):
+        self.sales[asin] = sales_amount
+        for text in texts:
+            for token in tokenize(text):
+                postings = self.postings[token]
+                postings[asin] = postings.get(asin, 0) + 1
+
+    def search(self, query: str, limit: int) -> List[str]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Intersect starting from the rarest term
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return []
+        sales = self.sales
+        return heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda asin: (-sum(p[asin] for p in postings), -sales[asin], asin),
+        )
+
+
+class _FallbackIndex:
+    """One inverted index per owner's catalog, for the ``max_tenants`` most recent"""
+
+    def __init__(self, max_tenants: int):
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Any, Tuple[Tuple, InvertedIndex]]" = OrderedDict()
+
+    def get(self, db: Session, owner_id) -> InvertedIndex:
+        owned = models.MyProduct.owner_id == owner_id
+        signature = tuple(
+            db.query(
+                func.count(models.MyProduct.asin), func.max(models.MyProduct.updated_at)
+            )
+            .filter(owned)
+            .one()
+        )
+        with self._lock:
+            cached = self._indexes.get(owner_id)
+            if cached is not None and cached[0] == signature:
+                self._indexes.move_to_end(owner_id)
+                return cached[1]
+            index = InvertedIndex()
+            rows = (
+                db.query(
+                    models.MyProduct.asin,
+                    models.MyProduct.sales_amount,
+                    models.MyProduct.title,
+                    models.MyProduct.description,
+                    models.MyProduct.bullet_points,
+                )
+                .filter(owned)
+                .yield_per(5000)
+            )
+            for asin, sales_amount, title, description, bullet_points in rows:
+                add_product(
+                    index, asin, sales_amount, title, description, bullet_points
+                )
+            self._indexes[owner_id] = (signature, index)
+            self._indexes.move_to_end(owner_id)
+            while len(self._indexes) > self.max_tenants:
+                self._indexes.popitem(last=False)
+            return index
+
+
+def add_product(
+    index: InvertedIndex, asin, sales_amount, title, description, bullet_points
+):
+    index.add(asin, sales_amount or 0.0, [title, description, *(bullet_points or [])])
+
+
+_fallback = _FallbackIndex(settings.search_index_max_tenants)
+
+
+def search_asins(db: Session, owner_id, query: str, limit: int = 20) -> List[str]:
+    """An owner's ASINs matching every term of ``query``, best matches first"""
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = func.plainto_tsquery(models.TEXT_SEARCH_CONFIG, query)
+        vector = models.search_vector()
+        rows = (
+            db.query(models.MyProduct.asin)
+            .filter(models.MyProduct.owner_id == owner_id, vector.op("@@")(tsquery))
+            .order_by(
+                func.ts_rank(vector, tsquery).desc(),
+                models.MyProduct.sales_amount.desc(),
+            )
+            .limit(limit)
+        )
+        return [asin for asin, in rows]
+    return _fallback.get(db, owner_id).search(query, limit)
+
+
+def search_products(
+    db: Session, owner_id, query: str, limit: int = 20
+) -> List[models.MyProduct]:
+    asins = search_asins(db, owner_id, query, limit)
+    if not asins:
+        return []
+    products = {
+        product.asin: product
+        for product in db.query(models.MyProduct).filter(
+            models.MyProduct.owner_id == owner_id, models.MyProduct.asin.in_(asins)
+        )
+    }
+    return [products[asin] for asin in asins if asin in products]
@@ -0,0 +1,64 @@
+"""Fast JSON responses for large payloads.
+
+Routes that return many rows (run histories, product listings) validate
+ORM objects through precompiled ``TypeAdapter``s and let pydantic-core
+write JSON bytes directly, skipping ``jsonable_encoder`` and the stdlib
+encoder. Arrays above ``json_stream_threshold`` items are streamed in
+chunks so the whole document is never held in memory at once.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.config import settings
+
+workflow_run_adapter = TypeAdapter(schemas.WorkflowRun)
+workflow_runs_adapter = TypeAdapter(List[schemas.WorkflowRun])
+product_adapter = TypeAdapter(schemas.MyProduct)
+products_adapter = TypeAdapter(List[schemas.MyProduct])
+product_batch_adapter = TypeAdapter(schemas.ProductBatch)
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dump(adapter: TypeAdapter, value: Any) -> bytes:
+    """Validate ORM objects against ``adapter`` and encode them to JSON bytes"""
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def json_response(
+    adapter: TypeAdapter, value: Any, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    return Response(
+        content=dump(adapter, value), media_type=JSON_MEDIA_TYPE, headers=headers
+    )
+
+
+def _iter_array(
+    list_adapter: TypeAdapter, items: Sequence[Any], chunk_size: int
+) -> Iterator[bytes]:
+    yield b"["
+    for start in range(0, len(items), chunk_size):
+        chunk = dump(list_adapter, items[start : start + chunk_size])
+        if start:
+            yield b","
+        # Drop the chunk's own brackets so chunks join into one array
+        yield chunk[1:-1]
+    yield b"]"
+
+
+def json_list_response(
+    list_adapter: TypeAdapter,
+    items: Sequence[Any],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Encode a list, streaming it in chunks when it is large"""
+    if len(items) <= settings.json_stream_threshold:
+        return json_response(list_adapter, items, headers=headers)
+    return StreamingResponse(
+        _iter_array(list_adapter, items, settings.json_stream_chunk_size),
+        media_type=JSON_MEDIA_TYPE,
+        headers=headers,
+    )
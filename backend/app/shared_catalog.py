@@ -0,0 +1,374 @@
+"""Catalog cache shared by every worker process through a memory-mapped file.
+
+One process builds an immutable catalog file: the gunicorn master before it
+forks workers, then whichever worker wins the refresh lock. Every worker maps
+the file read-only, so the catalog sits in the page cache once however many
+workers there are, and a restarted worker starts warm.
+
+The file holds each product's record, an open-addressing hash table from
+ASIN to records (one per seller listing it), and every owner's ASINs in
+sales order. A lookup hashes the ASIN, probes the table and decodes only the
+record of the owner's product, straight out of the mapping.
+
+A refresh writes a new generation to a temporary file and ``os.replace``s
+it over the old one. Readers notice the new inode on their next check and
+map it; lookups already running keep the old mapping, which stays valid
+until they drop it. Readers never take a lock.
+
+The file may lag the database by up to ``shared_catalog_refresh_seconds``.
+Only lifetime bestsellers and lookups by ASIN are served from it; anything
+missing from the file falls back to the database.
+"""
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+import orjson
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.values import ProductRecord
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PCAT"
+VERSION = 1
+# magic, version, generation, built_at, products, table slots, table offset,
+# owners offset, owner count
+HEADER = struct.Struct("<4sIQdIIQQI")
+# ASIN hash, record offset + 1 (0 marks an empty slot)
+SLOT = struct.Struct("<QQ")
+# ASIN length, body length, owner id, sales amount; then the ASIN and a JSON body
+RECORD = struct.Struct("<HI16sd")
+# owner id, offset of its record offsets, how many
+OWNER = struct.Struct("<16sQI")
+
+
+def _hash(asin: bytes) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(asin, digest_size=8).digest(), "little")
+
+
+def _slot_count(products: int) -> int:
+    slots = 16
+    while slots < products * 2:
+        slots *= 2
+    return slots
+
+
+def build(db: Session, path: str) -> int:
+    """Write a new catalog generation to ``path``. Returns its generation number"""
+    previous = _read_header(path)
+    generation = previous[2] + 1 if previous else 1
+    count = db.query(func.count(models.MyProduct.asin)).scalar() or 0
+    slots = _slot_count(count)
+    table_offset = HEADER.size
+    records_offset = table_offset + slots * SLOT.size
+
+    table = bytearray(slots * SLOT.size)
+    mask = slots - 1
+    owners: List[Tuple[bytes, int]] = []  # (owner id, first index into order)
+    order = array("Q")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as out:
+            out.seek(records_offset)
+            offset = records_offset
+            rows = db.query(
+                models.MyProduct.owner_id,
+                models.MyProduct.asin,
+                models.MyProduct.sales_amount,
+                models.MyProduct.title,
+                models.MyProduct.description,
+                models.MyProduct.bullet_points,
+            ).order_by(
+                models.MyProduct.owner_id,
+                models.MyProduct.sales_amount.desc(),
+                models.MyProduct.asin,
+            )
+            for (
+                owner_id,
+                asin,
+                sales_amount,
+                title,
+                description,
+                bullet_points,
+            ) in rows.yield_per(5000):
+                owner = owner_id.bytes
+                if not owners or owners[-1][0] != owner:
+                    owners.append((owner, len(order)))
+                key = asin.encode()
+                body = orjson.dumps([title, description, bullet_points])
+                out.write(RECORD.pack(len(key), len(body), owner, sales_amount or 0.0))
+                out.write(key)
+                out.write(body)
+
+                slot = _hash(key) & mask
+                while SLOT.unpack_from(table, slot * SLOT.size)[1]:
+                    slot = (slot + 1) & mask
+                SLOT.pack_into(table, slot * SLOT.size, _hash(key), offset + 1)
+                order.append(offset)
+                offset += RECORD.size + len(key) + len(body)
+
+            # Each owner's record offsets, already in sales order
+            owners_offset = offset
+            lists_offset = owners_offset + len(owners) * OWNER.size
+            bounds = [start for _, start in owners] + [len(order)]
+            for index, (owner, start) in enumerate(owners):
+                out.write(
+                    OWNER.pack(
+                        owner, lists_offset + start * 8, bounds[index + 1] - start
+                    )
+                )
+            out.write(order.tobytes())
+
+            out.seek(0)
+            out.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    generation,
+                    time.time(),
+                    len(order),
+                    slots,
+                    table_offset,
+                    owners_offset,
+                    len(owners),
+                )
+            )
+            out.write(table)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+    return generation
+
+
+def _read_header(path: str):
+    try:
+        with open(path, "rb") as existing:
+            header = HEADER.unpack(existing.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return header if header[0] == MAGIC and header[1] == VERSION else None
+
+
+class _Generation:
+    """One mapped catalog file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as source:
+            self.inode = os.fstat(source.fileno()).st_ino
+            self.map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.generation,
+            self.built_at,
+            self.products,
+            self.slots,
+            self.table_offset,
+            owners_offset,
+            owner_count,
+        ) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} catalog file")
+        self.owners = [
+            OWNER.unpack_from(self.map, owners_offset + i * OWNER.size)
+            for i in range(owner_count)
+        ]
+        self.owner_keys = [owner for owner, _, _ in self.owners]
+
+    def _record(self, offset: int) -> Tuple[bytes, ProductRecord]:
+        key_length, body_length, owner, sales_amount = RECORD.unpack_from(
+            self.map, offset
+        )
+        start = offset + RECORD.size
+        asin = self.map[start : start + key_length].decode()
+        title, description, bullet_points = orjson.loads(
+            self.map[start + key_length : start + key_length + body_length]
+        )
+        return owner, ProductRecord(
+            asin, title, description, bullet_points, sales_amount
+        )
+
+    def get(self, asin: str, owner_id: uuid.UUID) -> Optional[ProductRecord]:
+        key = asin.encode()
+        key_hash = _hash(key)
+        mask = self.slots - 1
+        slot = key_hash & mask
+        while True:
+            slot_hash, offset = SLOT.unpack_from(
+                self.map, self.table_offset + slot * SLOT.size
+            )
+            if not offset:
+                return None
+            if slot_hash == key_hash:
+                offset -= 1
+                key_length, _, owner, _ = RECORD.unpack_from(self.map, offset)
+                start = offset + RECORD.size
+                # Other sellers' listings of the ASIN are further along the probe
+                if (
+                    owner == owner_id.bytes
+                    and self.map[start : start + key_length] == key
+                ):
+                    return self._record(offset)[1]
+            slot = (slot + 1) & mask
+
+    def top_selling(
+        self, owner_id: uuid.UUID, count: int
+    ) -> Optional[List[ProductRecord]]:
+        index = bisect_left(self.owner_keys, owner_id.bytes)
+        if index == len(self.owners) or self.owner_keys[index] != owner_id.bytes:
+            return None
+        _, lists_offset, total = self.owners[index]
+        offsets = struct.unpack_from(f"<{min(count, total)}Q", self.map, lists_offset)
+        return [self._record(offset)[1] for offset in offsets]
+
+
+class SharedCatalog:
+    """A worker's read-only view of the ``settings.shared_catalog_path`` file"""
+
+    def __init__(self):
+        self._current: Optional[_Generation] = None
+        self._checked_at = 0.0
+        self._check_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.shared_catalog_path)
+
+    def current(self) -> Optional[_Generation]:
+        """The newest mapped generation, or None when there is no catalog file"""
+        now = time.monotonic()
+        if (
+            now - self._checked_at >= settings.shared_catalog_check_seconds
+            and self._check_lock.acquire(False)
+        ):
+            # One thread checks for a new generation; the others read the current one
+            try:
+                self._checked_at = now
+                self._current = self._reload(
+                    settings.shared_catalog_path, self._current
+                )
+            finally:
+                self._check_lock.release()
+        return self._current
+
+    @staticmethod
+    def _reload(path: str, current: Optional[_Generation]) -> Optional[_Generation]:
+        try:
+            inode = os.stat(path).st_ino
+        except OSError:
+            return None
+        if current is not None and current.inode == inode:
+            return current
+        try:
+            return _Generation(path)
+        except (OSError, ValueError, struct.error):
+            logger.exception("Could not map catalog file %s", path)
+            return current
+
+    def get(self, asin: str, owner_id: uuid.UUID) -> Optional[ProductRecord]:
+        generation = self.current() if self.enabled else None
+        return generation.get(asin, owner_id) if generation is not None else None
+
+    def top_selling(
+        self, owner_id: uuid.UUID, count: int
+    ) -> Optional[List[ProductRecord]]:
+        """The owner's ``count`` best sellers, or None when the file can't answer"""
+        generation = self.current() if self.enabled else None
+        return (
+            generation.top_selling(owner_id, count) if generation is not None else None
+        )
+
+
+def refresh(path: str, max_age: float) -> Optional[int]:
+    """Rebuild the catalog file if it is older than ``max_age`` seconds and no
+    other process is already rebuilding it. Returns the new generation"""
+    header = _read_header(path)
+    if header is not None and time.time() - header[3] < max_age:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        try:
+            # Someone may have finished a rebuild while we were checking
+            header = _read_header(path)
+            if header is not None and time.time() - header[3] < max_age:
+                return None
+            db = SessionLocal()
+            try:
+                return build(db, path)
+            finally:
+                db.close()
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SharedCatalogRefresher:
+    """Rebuilds the catalog file once stale, checking every ``interval`` seconds.
+
+    Every worker runs one; the file lock lets only one of them rebuild.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="shared-catalog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                refresh(
+                    settings.shared_catalog_path,
+                    settings.shared_catalog_refresh_seconds,
+                )
+            except Exception:
+                logger.exception("Shared catalog refresh failed")
+
+
+shared_catalog = SharedCatalog()
+
+
+if __name__ == "__main__":
+    # Build once, e.g. from a deploy step or cron: python -m app.shared_catalog
+    session = SessionLocal()
+    try:
+        print(
+            f"Built generation {build(session, settings.shared_catalog_path)} at "
+            f"{settings.shared_catalog_path}"
+        )
+    finally:
+        session.close()
@@ -0,0 +1,82 @@
+"""Single-flight execution: concurrent calls with the same key share one result.
+
+Used to coalesce identical workflow runs fired at the same moment (e.g. a
+dashboard with many viewers). Coalescing is per process; each gunicorn
+worker keeps its own table of in-flight calls.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+
+
+class SingleFlight:
+    def __init__(self, window_seconds: float = 0.0):
+        self.window_seconds = window_seconds
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        wait: Optional[Callable[[threading.Event], None]] = None,
+    ) -> Tuple[Any, bool]:
+        """Run ``fn`` unless a call with ``key`` is in flight or recently finished.
+
+        Returns ``(result, shared)`` where ``shared`` is True when the result
+        came from another caller's execution. A caller sharing an in-flight
+        call blocks in ``wait(done)``, which may raise to stop waiting; by
+        default it waits for as long as the call takes.
+        """
+        with self._lock:
+            self._prune()
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if wait is not None:
+                wait(call.done)
+            else:
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                # Failed calls are not reused by later arrivals
+                self._calls.pop(key, None)
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            call.done.set()
+        return call.result, False
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            key
+            for key, call in self._calls.items()
+            if call.finished_at is not None
+            and now - call.finished_at > self.window_seconds
+        ]
+        for key in expired:
+            del self._calls[key]
+
+
+workflow_runs = SingleFlight(settings.run_coalesce_window_seconds)
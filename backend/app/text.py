@@ -0,0 +1,17 @@
+"""Text tokenization shared by search and the text transform nodes.
+
+Dependency-free so process-pool workers can import it cheaply.
+"""
+import re
+from typing import List, Optional
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the to with".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
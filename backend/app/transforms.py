@@ -0,0 +1,107 @@
+"""CPU-bound node tasks, run in the process pool (see app/cpu_pool.py).
+
+Each task takes and returns plain picklable data. This module must stay
+cheap to import: pool workers import it, and nothing else from the app.
+"""
+from collections import Counter
+from typing import Any, Dict, List
+
+from app.text import tokenize
+
+
+def text_features(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-product features from title and bullet points.
+
+    ``payload["items"]`` is a list of ``(asin, title, bullet_points)``.
+    """
+    top_terms = payload.get("top_terms", 5)
+    rows = []
+    for asin, title, bullet_points in payload["items"]:
+        bullet_points = bullet_points or []
+        title_tokens = tokenize(title)
+        bullet_tokens = [
+            token for bullet in bullet_points for token in tokenize(bullet)
+        ]
+        all_tokens = title_tokens + bullet_tokens
+        rows.append(
+            {
+                "asin": asin,
+                "title_chars": len(title or ""),
+                "title_words": len(title_tokens),
+                "bullet_count": len(bullet_points),
+                "bullet_words": len(bullet_tokens),
+                "distinct_terms": len(set(all_tokens)),
+                "avg_word_length": round(sum(map(len, all_tokens)) / len(all_tokens), 2)
+                if all_tokens
+                else 0.0,
+                "top_terms": [
+                    term for term, _ in Counter(all_tokens).most_common(top_terms)
+                ],
+            }
+        )
+    return rows
+
+
+def score_order(pair: List[Any]):
+    """Sort key for ``score_products`` results: best score first, then ASIN"""
+    return -pair[1], pair[0]
+
+
+def score_products(payload: Dict[str, Any]) -> List[List[Any]]:
+    """Rank products with a weighted formula, best first.
+
+    ``payload["items"]`` is a list of ``(asin, sales_amount, title,
+    bullet_points)``. ``payload["weights"]`` may weight ``sales`` (scaled to
+    ``payload["max_sales"]``, by default the largest in the list),
+    ``title_words``, ``bullet_count`` and individual ``terms``. Returns
+    ``[asin, score]`` pairs.
+    """
+    weights = payload.get("weights") or {"sales": 1.0}
+    term_weights = {
+        term.lower(): weight for term, weight in (weights.get("terms") or {}).items()
+    }
+    products = payload["items"]
+    max_sales = payload.get("max_sales")
+    if max_sales is None:
+        max_sales = max((sales or 0.0 for _, sales, _, _ in products), default=0.0)
+    max_sales = max_sales or 1.0
+
+    scored = []
+    for asin, sales, title, bullet_points in products:
+        title_tokens = tokenize(title)
+        score = weights.get("sales", 0.0) * (sales or 0.0) / max_sales
+        score += weights.get("title_words", 0.0) * len(title_tokens)
+        score += weights.get("bullet_count", 0.0) * len(bullet_points or [])
+        if term_weights:
+            tokens = Counter(title_tokens)
+            for bullet in bullet_points or []:
+                tokens.update(tokenize(bullet))
+            score += sum(weight * tokens[term] for term, weight in term_weights.items())
+        scored.append([asin, round(score, 6)])
+
+    scored.sort(key=score_order)
+    limit = payload.get("limit")
+    return scored[:limit] if limit is not None else scored
+
+
+def _dig(record: Any, path: str) -> Any:
+    for key in path.split("."):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+def reshape_records(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Project records onto ``fields`` (dotted paths allowed), renamed by ``rename``"""
+    fields = payload.get("fields")
+    rename = payload.get("rename") or {}
+
+    reshaped = []
+    for record in payload["items"]:
+        if not isinstance(record, dict):
+            record = {"value": record}
+        if fields:
+            record = {field: _dig(record, field) for field in fields}
+        reshaped.append({rename.get(key, key): value for key, value in record.items()})
+    return reshaped
@@ -0,0 +1,193 @@
+"""Typed node results used inside the engine.
+
+Node handlers pass these between each other instead of ``{"type": ...,
+"value": ...}`` dicts. ASIN lists are tuples, a product is one
+``ProductRecord`` shared by the run's repository and every result that
+mentions it, and loop merges
+collect references to those records rather than copies. ``to_json`` builds
+the public result shape; the engine calls it once per reported result when
+a run finishes.
+"""
+import abc
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class ProductRecord:
+    """A product as a run reads it, loaded once per ASIN per run"""
+
+    __slots__ = ("asin", "title", "description", "bullet_points", "sales_amount")
+
+    def __init__(
+        self,
+        asin: str,
+        title: str,
+        description: Optional[str],
+        bullet_points: Optional[List[str]],
+        sales_amount: float = 0.0,
+    ):
+        self.asin = asin
+        self.title = title
+        self.description = description
+        self.bullet_points = bullet_points
+        self.sales_amount = sales_amount
+
+    def to_json(self) -> Dict[str, Any]:
+        """The ``product_details`` shape"""
+        return {
+            "asin": self.asin,
+            "title": self.title,
+            "description": self.description,
+            "bullet_points": self.bullet_points,
+        }
+
+
+def _record_json(value: Any) -> Any:
+    return value.to_json() if isinstance(value, ProductRecord) else value
+
+
+def plain(value: Any) -> Any:
+    """``value`` with its ``ProductRecord`` entries converted to dicts.
+
+    Records only ever sit at the top level of a result's value (a merge's
+    entries, a table's rows), so nothing deeper is copied.
+    """
+    if isinstance(value, dict):
+        return {key: _record_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_record_json(item) for item in value]
+    return _record_json(value)
+
+
+class Value(abc.ABC):
+    """Base class; ``value`` is the payload handlers read"""
+
+    __slots__ = ()
+    type: str = ""
+
+    @property
+    @abc.abstractmethod
+    def value(self) -> Any:
+        """The payload, held in the subclass's own slot"""
+
+    def mapping(self) -> Optional[Dict[str, Any]]:
+        """Entries a merge node folds in, or None when the value isn't a mapping"""
+        value = self.value
+        if isinstance(value, ProductRecord):
+            return value.to_json()
+        return value if isinstance(value, dict) else None
+
+    def merge_into(self, target: Dict[str, Any]):
+        entries = self.mapping()
+        if entries:
+            target.update(entries)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"type": self.type, "value": plain(self.value)}
+
+
+class AsinList(Value):
+    __slots__ = ("asins", "scores")
+    type = "asin_list"
+
+    def __init__(self, asins: Iterable[str], scores: Optional[Dict[str, float]] = None):
+        self.asins: Tuple[str, ...] = tuple(asins)
+        self.scores = scores
+
+    @property
+    def value(self) -> Tuple[str, ...]:
+        return self.asins
+
+    def to_json(self) -> Dict[str, Any]:
+        result = {
+            "type": self.type,
+            "value": list(self.asins),
+            "count": len(self.asins),
+        }
+        if self.scores is not None:
+            result["scores"] = self.scores
+        return result
+
+
+class SingleAsin(Value):
+    __slots__ = ("asin",)
+    type = "single_asin"
+
+    def __init__(self, asin: str):
+        self.asin = asin
+
+    @property
+    def value(self) -> str:
+        return self.asin
+
+
+class ProductDetails(Value):
+    __slots__ = ("record",)
+    type = "product_details"
+
+    def __init__(self, record: ProductRecord):
+        self.record = record
+
+    @property
+    def value(self) -> Dict[str, ProductRecord]:
+        # Keyed by ASIN for easier merging
+        return {self.record.asin: self.record}
+
+    def merge_into(self, target: Dict[str, Any]):
+        target[self.record.asin] = self.record
+
+
+class ProductTable(Value):
+    """A loop merge's result: one entry per distinct key the loop body produced"""
+
+    __slots__ = ("rows",)
+    type = "product_details_table"
+
+    def __init__(self, rows: Sequence[Any]):
+        self.rows = tuple(rows)
+
+    @property
+    def value(self) -> Tuple[Any, ...]:
+        return self.rows
+
+
+class MergedData(Value):
+    __slots__ = ("entries",)
+    type = "merged_data"
+
+    def __init__(self, entries: Dict[str, Any]):
+        self.entries = entries
+
+    @property
+    def value(self) -> Dict[str, Any]:
+        return self.entries
+
+
+class JsonValue(Value):
+    """Any other result; ``counted`` adds the ``count`` field lists carry"""
+
+    __slots__ = ("type", "payload", "counted")
+
+    def __init__(self, type: str, payload: Any, counted: bool = False):
+        self.type = type
+        self.payload = payload
+        self.counted = counted
+
+    @property
+    def value(self) -> Any:
+        return self.payload
+
+    def to_json(self) -> Dict[str, Any]:
+        # Payloads are plain JSON already, apart from a loop item that is a record
+        result = {"type": self.type, "value": _record_json(self.payload)}
+        if self.counted:
+            result["count"] = len(self.payload)
+        return result
+
+
+def item_value(element_type: str, item: Any) -> Value:
+    """The value a loop hands its body for one element of its input"""
+    if element_type == SingleAsin.type:
+        return SingleAsin(item)
+    if element_type == ProductDetails.type and isinstance(item, ProductRecord):
+        return ProductDetails(item)
+    return JsonValue(element_type, item)
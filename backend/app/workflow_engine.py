@@ -1,314 +1,428 @@
-from typing import Dict, Any, List
+import heapq
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
 from sqlalchemy.orm import Session
-from app import models
+
+from app import models, query_counter, transforms
+from app.catalog_snapshot import CatalogColumns, catalog
+from app.config import settings
+from app.cpu_pool import CpuTaskTimeout, cpu_pool
+from app.node_registry import (
+    ANY,
+    PROCESS,
+    CompiledGraph,
+    LoopStep,
+    NodeSpec,
+    compile_graph,
+    execution_order,
+    register,
+)
+from app.product_repository import ProductRepository, sales_window, top_count
+from app.run_control import RunControl, RunStopped
+from app.values import (
+    AsinList,
+    JsonValue,
+    MergedData,
+    ProductDetails,
+    ProductRecord,
+    ProductTable,
+    SingleAsin,
+    Value,
+    item_value,
+    plain,
+)
 
 
 class WorkflowEngine:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, control: Optional[RunControl] = None):
         self.db = db
-    
-    def execute_workflow(self, workflow: models.Workflow, user: models.User) -> Dict[str, Any]:
+        # Checked between steps and loop iterations; the default never stops a run
+        self.control = control or RunControl()
+        self.owner_id = None
+        self.products = ProductRepository(db, None)
+        self._catalog = None
+
+    def execute_workflow(
+        self, workflow: models.Workflow, user: models.User
+    ) -> Dict[str, Any]:
         """Execute a workflow and return results"""
         flow_data = workflow.flow_data
         nodes = flow_data.get("nodes", [])
         edges = flow_data.get("edges", [])
 
+        with query_counter.track(f"workflow run {workflow.id}") as stats:
+            try:
+                # Product reads are scoped to the user's catalog and served from a
+                # run-scoped identity map
+                self.owner_id = user.id
+                self.products = ProductRepository(self.db, user.id)
+                self._catalog = None
+
+                # Type-check the graph and bind node inputs before running anything
+                graph = compile_graph(nodes, edges)
+                self.products.prefetch_for(nodes)
+
+                results = self._execute_graph(graph)
+
+                # The public result shape is built once, as the results leave the engine
+                return {
+                    "status": "success",
+                    "results": {
+                        node_id: value.to_json() for node_id, value in results.items()
+                    },
+                    "query_count": stats.count,
+                }
+            except RunStopped as stopped:
+                return {
+                    "status": stopped.status,
+                    "error": str(stopped),
+                    "results": {
+                        node_id: value.to_json()
+                        for node_id, value in stopped.results.items()
+                    },
+                    "query_count": stats.count,
+                }
+            except Exception as e:
+                return {"status": "error", "error": str(e), "query_count": stats.count}
+
+    def _execute_graph(self, graph: CompiledGraph) -> Dict[str, Value]:
+        """Runs the compiled steps and collects node results."""
+        values: List[Optional[Value]] = [None] * len(graph.node_ids)
         try:
-            # Build execution graph
-            execution_order = self._get_execution_order(nodes, edges)
-            nodes_by_id = {node["id"]: node for node in nodes}
-            
-            # Create an adjacency list for quick lookups of outgoing edges
-            adj = {node_id: [] for node_id in nodes_by_id}
-            for edge in edges:
-                adj[edge["source"]].append(edge["target"])
-
-            results = self._execute_graph(execution_order, nodes_by_id, adj, edges, user)
-
-            return {"status": "success", "results": results}
-        except Exception as e:
-            return {"status": "error", "error": str(e)}
-
-    def _execute_graph(self, execution_order: List[str], nodes_by_id: Dict[str, Dict], adj: Dict[str, List[str]], edges: List[Dict], user: models.User) -> Dict[str, Any]:
-        """Executes the workflow graph, handling loops and branches."""
+            self._run_steps(graph.steps, values)
+        except RunStopped as stopped:
+            # Report the nodes that finished before the run stopped
+            stopped.results = self._collect_results(graph, values)
+            raise
+        return self._collect_results(graph, values)
+
+    @staticmethod
+    def _collect_results(
+        graph: CompiledGraph, values: List[Optional[Value]]
+    ) -> Dict[str, Value]:
         results = {}
-        execution_queue = [node_id for node_id in execution_order]
-        
-        # Stack to manage the state of active loops
-        loop_stack = []
-
-        # Set of visited nodes to handle graph traversal
-        visited = set()
-
-        while execution_queue:
-            node_id = execution_queue.pop(0)
-
-            if node_id in visited and not (loop_stack and node_id == loop_stack[-1]["loop_body_start_node"]):
-                continue # Skip if already visited and not part of a loop iteration
-            
-            node = nodes_by_id[node_id]
-            node_type = node.get("type")
-
-            # Check if this node is the merge point of an active loop
-            if loop_stack and node_id == loop_stack[-1]["merge_node_id"]:
-                self._handle_loop_iteration(node, results, edges, loop_stack, execution_queue, adj)
-                continue
-            
-            # If in a loop, provide the current item as context for nodes in the loop body
-            if loop_stack:
-                current_loop = loop_stack[-1]
-                if current_loop["iteration_index"] < len(current_loop["iterable_data"]):
-                    current_item = current_loop["iterable_data"][current_loop["iteration_index"]]
-                    # The context provides the item as a "single_asin" type for the next node
-                    results["loop_context"] = {"type": "single_asin", "value": current_item}
-
-            # Execute the node
-            if node_type == "loop":
-                self._execute_loop_node(node, results, edges, loop_stack, adj)
-            else:
-                try:
-                    result = self._execute_node(node, results, edges, user)
-                    if result is not None:
-                        results[node_id] = result
-                except Exception as e:
-                    if loop_stack:
-                        # Add context to errors that happen inside a loop
-                        current_item = results.get("loop_context", {}).get("value", "unknown")
-                        raise ValueError(f"Failed processing item '{current_item}' in loop: {e}") from e
-                    raise e
-
-            visited.add(node_id)
-
-            # Add next nodes to the queue
-            for neighbor in adj.get(node_id, []):
-                if neighbor not in execution_queue:
-                    execution_queue.append(neighbor)
-
+        for node_id in graph.result_ids:
+            value = values[graph.slots[node_id]]
+            if value is not None:
+                results[node_id] = value
         return results
 
-    def _execute_node(self, node: Dict, results: Dict, edges: List[Dict], user: models.User) -> Any:
-        """Executes a single node based on its type."""
-        node_id = node["id"]
-        node_type = node.get("type")
-
-        if node_type == "get_bestselling_asins":
-            return self._execute_get_bestselling_asins(node, user)
-        elif node_type == "get_asin_by_index":
-            # This node is now handled inside the loop logic
-            # We pass the iteration context to it
-            return self._execute_get_asin_by_index(node, results, edges)
-        elif node_type == "get_asin_details":
-            return self._execute_get_asin_details(node, results, edges)
-        elif node_type == "merge":
-            # This is for non-loop merges
-            return self._execute_merge(node, results, edges)
-        
-        # Return None for nodes that don't produce a direct result (like 'loop')
-        return None
+    def _run_steps(self, steps: List, values: List[Optional[Value]]):
+        for step in steps:
+            self.control.check()
+            if isinstance(step, LoopStep):
+                self._run_loop(step, values)
+            else:
+                values[step.slot] = step.handler(
+                    self, step.node, [values[slot] for slot in step.input_slots]
+                )
+
+    def _run_loop(self, loop: LoopStep, values: List[Optional[Value]]):
+        """Runs the loop body once per input item and sets the merge node's result."""
+        iterable_data = values[loop.input_slot].value
+        if not isinstance(iterable_data, (list, tuple)):
+            raise ValueError(
+                f"Loop input must be a list, but got {type(iterable_data)}."
+            )
+
+        final_merged_data = {}
+        for current_item in iterable_data:
+            # The loop's slot provides the current item to the nodes in its body
+            values[loop.slot] = item_value(loop.element_type, current_item)
+            try:
+                self.control.check()
+                self._run_steps(loop.body, values)
+            except RunStopped:
+                # The merge reports the items that finished
+                values[loop.slot] = None
+                values[loop.merge_slot] = ProductTable(final_merged_data.values())
+                raise
+            except Exception as e:
+                # Add context to errors that happen inside a loop
+                raise ValueError(
+                    f"Failed processing item '{current_item}' in loop: {e}"
+                ) from e
+
+            for slot in loop.merge_input_slots:
+                item = values[slot]
+                if item is not None:
+                    item.merge_into(final_merged_data)
+
+        values[loop.slot] = None
+        values[loop.merge_slot] = ProductTable(final_merged_data.values())
 
     def _get_execution_order(self, nodes: List[Dict], edges: List[Dict]) -> List[str]:
         """Determine execution order based on node dependencies"""
-        # Validate loop-merge pairings before sorting
-        loop_nodes = {node["id"]: node for node in nodes if node.get("type") == "loop"}
-        merge_nodes = {node["id"]: node for node in nodes if node.get("type") == "merge"}
-
-        for loop_id, loop_node in loop_nodes.items():
-            merge_id = loop_node.get("data", {}).get("mergeId")
-            if not merge_id:
-                raise ValueError(f"Loop node {loop_id} is missing a mergeId.")
-            if merge_id not in merge_nodes:
-                raise ValueError(f"Loop node {loop_id} points to a non-existent or non-merge node {merge_id}.")
-            
-            merge_node = merge_nodes[merge_id]
-            if merge_node.get("data", {}).get("loopId") != loop_id:
-                raise ValueError(f"Merge node {merge_id} does not point back to loop node {loop_id}.")
-
-        for merge_id, merge_node in merge_nodes.items():
-            loop_id = merge_node.get("data", {}).get("loopId")
-            if not loop_id:
-                raise ValueError(f"Merge node {merge_id} is missing a loopId.")
-            if loop_id not in loop_nodes:
-                raise ValueError(f"Merge node {merge_id} points to a non-existent or non-loop node {loop_id}.")
-
-        # Perform topological sort
-        in_degree = {node["id"]: 0 for node in nodes}
-        
-        for edge in edges:
-            in_degree[edge["target"]] += 1
-        
-        queue = [node_id for node_id, degree in in_degree.items() if degree == 0]
-        result = []
-        
-        while queue:
-            node_id = queue.pop(0)
-            result.append(node_id)
-            
-            for edge in edges:
-                if edge["source"] == node_id:
-                    in_degree[edge["target"]] -= 1
-                    if in_degree[edge["target"]] == 0:
-                        queue.append(edge["target"])
-        
-        return result
-    
-    def _execute_get_bestselling_asins(self, node: Dict, user: models.User) -> Dict[str, Any]:
+        return execution_order(nodes, edges)
+
+    def _execute_get_bestselling_asins(self, node: Dict, inputs: List[Value]) -> Value:
         """Execute get_bestselling_asins node"""
         node_data = node.get("data", {})
-        top_count = node_data.get("topCount", 10)
-        
-        products = (
-            self.db.query(models.MyProduct)
-            .order_by(models.MyProduct.sales_amount.desc())
-            .limit(top_count)
-            .all()
+        count = top_count(node_data.get("topCount"))
+        window = sales_window(node_data.get("window"))
+
+        products = self.products.top_selling(count, window)
+        return AsinList(product.asin for product in products)
+
+    def _execute_search_asins(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute search_asins node"""
+        node_data = node.get("data", {})
+        query = node_data.get("query", "")
+        limit = node_data.get("limit", 20)
+
+        products = self.products.search(query, limit)
+        return AsinList(product.asin for product in products)
+
+    def _catalog_columns(self) -> CatalogColumns:
+        """The columnar catalog snapshot, refreshed at most once per run"""
+        if self._catalog is None:
+            self._catalog = catalog.refresh(self.db, self.owner_id)
+        return self._catalog
+
+    @staticmethod
+    def _optional_asin_list(inputs: List[Value]):
+        """The input asin_list, or None (the whole catalog) when there is no input"""
+        return inputs[0].value if inputs else None
+
+    def _execute_filter_asins(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute filter_asins node"""
+        node_data = node.get("data", {})
+        asins = self._catalog_columns().filter(
+            self._optional_asin_list(inputs),
+            min_sales=node_data.get("minSales"),
+            max_sales=node_data.get("maxSales"),
         )
-        
-        asins = [product.asin for product in products]
-        return {"type": "asin_list", "value": asins, "count": len(asins)}
-    
-    def _execute_get_asin_by_index(self, node: Dict, results: Dict, edges: List[Dict]) -> Dict[str, Any]:
+        return AsinList(asins)
+
+    def _execute_sort_asins(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute sort_asins node"""
+        node_data = node.get("data", {})
+        asins = self._catalog_columns().sort(
+            self._optional_asin_list(inputs),
+            descending=node_data.get("order", "desc") == "desc",
+            limit=node_data.get("limit"),
+        )
+        return AsinList(asins)
+
+    def _execute_aggregate_sales(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute aggregate_sales node"""
+        summary = self._catalog_columns().aggregate(self._optional_asin_list(inputs))
+        return JsonValue("sales_summary", summary)
+
+    def _execute_get_asin_by_index(self, node: Dict, inputs: List[Value]) -> Value:
         """Execute get_asin_by_index node"""
         node_data = node.get("data", {})
         index = node_data.get("index", 0)
 
-        # Check for loop context first
-        loop_context = results.get("loop_context")
-        if loop_context:
-            input_data = loop_context
-        else:
-            # Fallback to standard edge input
-            inputs = self._get_input_from_edges(node["id"], edges, results)
-            if not inputs:
-                raise ValueError(f"No input found for node {node['id']}")
-            input_data = list(inputs.values())[0]
-
-
-        if input_data["type"] != "asin_list":
-            raise ValueError(f"Expected asin_list input, got {input_data['type']}")
-        
-        asin_list = input_data["value"]
+        asin_list = inputs[0].value
         if index >= len(asin_list):
-            raise ValueError(f"Index {index} out of range for list of length {len(asin_list)}")
-        
-        selected_asin = asin_list[index]
-        return {"type": "single_asin", "value": selected_asin}
-    
-    def _execute_get_asin_details(self, node: Dict, results: Dict, edges: List[Dict]) -> Dict[str, Any]:
+            raise ValueError(
+                f"Index {index} out of range for list of length {len(asin_list)}"
+            )
+
+        return SingleAsin(asin_list[index])
+
+    def _execute_get_asin_details(self, node: Dict, inputs: List[Value]) -> Value:
         """Execute get_asin_details node"""
-        # The loop context is the primary source of input when inside a loop
-        loop_context = results.get("loop_context")
-        if loop_context:
-            input_data = loop_context
-        else:
-            # Fallback for non-loop execution
-            inputs = self._get_input_from_edges(node["id"], edges, results)
-            if not inputs:
-                raise ValueError(f"No input found for get_asin_details node {node['id']}")
-            input_data = list(inputs.values())[0]
-
-        if input_data["type"] != "single_asin":
-            raise ValueError(f"Expected single_asin input, got {input_data['type']}")
-        
-        asin = input_data["value"]
-        product = self.db.query(models.MyProduct).filter(models.MyProduct.asin == asin).first()
-        
+        asin = inputs[0].value
+        product = self.products.get(asin)
+
         if not product:
             raise ValueError(f"Product not found for ASIN: {asin}")
-        
-        return {
-            "type": "product_details",
-            "value": {
-                # Use ASIN as key for easier merging
-                product.asin: {
-                    "asin": product.asin,
-                    "title": product.title,
-                    "description": product.description,
-                    "bullet_points": product.bullet_points
-                }
-            } # The value is now a dictionary keyed by the ASIN
-        }
 
-    def _execute_merge(self, node: Dict, results: Dict, edges: List[Dict]) -> Dict[str, Any]:
-        """Merges multiple inputs into a single dictionary."""
-        # This method now only handles non-loop merges. Loop merges are handled by _handle_loop_iteration
-        inputs = self._get_input_from_edges(node["id"], edges, results, exclude_loop_context=True)
-        if not inputs:
-            # Merge node with no inputs returns an empty object
-            return {"type": "merged_data", "value": {}}
+        return ProductDetails(product)
 
+    def _execute_merge(self, node: Dict, inputs: List[Value]) -> Value:
+        """Merges multiple inputs into a single dictionary."""
+        # Only non-loop merges run here; _run_loop fills in a loop's merge
         merged_data = {}
-        for source_id, input_data in inputs.items():
-            if isinstance(input_data.get("value"), dict):
-                merged_data.update(input_data["value"])
-
-        return {"type": "merged_data", "value": merged_data}
-
-    def _get_input_from_edges(self, node_id: str, edges: List[Dict], results: Dict[str, Any], exclude_loop_context: bool = False) -> Dict[str, Any]:
-        """Gathers all inputs for a given node from the executed results."""
-        inputs = {}
-        for edge in edges:
-            if edge["target"] == node_id and edge["source"] in results:
-                if exclude_loop_context and edge["source"] == "loop_context":
-                    continue
-                inputs[edge["source"]] = results[edge["source"]]
-        return inputs
-
-    def _execute_loop_node(self, node: Dict, results: Dict, edges: List[Dict], loop_stack: List[Dict], adj: Dict[str, List[str]]):
-        """Initializes a loop's state and pushes it to the loop stack."""
-        inputs = self._get_input_from_edges(node["id"], edges, results)
-        if not inputs:
-            raise ValueError(f"Loop node {node['id']} requires an input.")
-        
-        input_data = list(inputs.values())[0]
-        iterable_data = input_data.get("value", [])
-
-        if not isinstance(iterable_data, list):
-            raise ValueError(f"Loop input must be a list, but got {type(iterable_data)}.")
-
-        # Find the start of the loop body (the node connected from the loop node)
-        loop_body_start_nodes = adj.get(node["id"], [])
-        if not loop_body_start_nodes:
-            # A loop with no body, just finish it.
-            return
-
-        loop_state = {
-            "loop_node_id": node["id"],
-            "merge_node_id": node["data"]["mergeId"],
-            "iterable_data": iterable_data,
-            "iteration_index": 0,
-            "iteration_results": [],
-            "loop_body_start_node": loop_body_start_nodes[0],
-        }
-        loop_stack.append(loop_state)
-
-    def _handle_loop_iteration(self, merge_node: Dict, results: Dict, edges: List[Dict], loop_stack: List[Dict], execution_queue: List[str], adj: Dict[str, List[str]]):
-        """Manages the state of a loop at its merge point."""
-        loop_state = loop_stack[-1]
-
-        # Gather results from the last iteration
-        iteration_inputs = self._get_input_from_edges(merge_node["id"], edges, results)
-        loop_state["iteration_results"].append(iteration_inputs)
-
-        loop_state["iteration_index"] += 1
-
-        if loop_state["iteration_index"] < len(loop_state["iterable_data"]):
-            # More items to process, queue up the start of the loop body again
-            # Clean up the context from the previous iteration before starting the next one
-            if "loop_context" in results:
-                del results["loop_context"]
-
-            execution_queue.insert(0, loop_state["loop_body_start_node"])
-        else:
-            # Loop finished, pop from stack and set the final result for the merge node
-            finished_loop = loop_stack.pop()
-            final_merged_data = {}
-            for res in finished_loop["iteration_results"]:
-                for item in res.values():
-                    if isinstance(item.get("value"), dict):
-                        final_merged_data.update(item["value"])
-            
-            results[merge_node["id"]] = {"type": "product_details_table", "value": list(final_merged_data.values())}
-            
-            # Final cleanup of loop context
-            if "loop_context" in results:
-                del results["loop_context"]
\ No newline at end of file
+        for input_data in inputs:
+            input_data.merge_into(merged_data)
+
+        return MergedData(merged_data)
+
+    def _run_in_process(
+        self, node: Dict, task, items: List, payload: Dict[str, Any]
+    ) -> List[List]:
+        """Runs ``task`` over ``items`` in the CPU pool under the node's timeout,
+        or the time left before the run's deadline if that is shorter.
+
+        ``items`` go out in chunks, each as ``payload["items"]``; returns each
+        chunk's result in order.
+        """
+        timeout = settings.cpu_node_timeout_seconds
+        requested = node.get("data", {}).get("timeoutSeconds")
+        if requested:
+            timeout = min(float(requested), timeout)
+        remaining = self.control.remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        size = max(1, settings.cpu_task_chunk_size)
+        chunks = [
+            items[start : start + size] for start in range(0, len(items), size)
+        ] or [[]]
+        try:
+            return cpu_pool.run_many(
+                task, [{**payload, "items": chunk} for chunk in chunks], timeout
+            )
+        except CpuTaskTimeout:
+            # Past the run's deadline, the run timed out rather than the node
+            self.control.check()
+            raise
+
+    def _input_products(self, inputs: List[Value]) -> List[ProductRecord]:
+        found = self.products.get_many(inputs[0].value)
+        return [product for product in found.values() if product is not None]
+
+    def _execute_text_features(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute text_features node"""
+        node_data = node.get("data", {})
+        products = [
+            (p.asin, p.title, p.bullet_points) for p in self._input_products(inputs)
+        ]
+        chunks = self._run_in_process(
+            node,
+            transforms.text_features,
+            products,
+            {"top_terms": node_data.get("topTerms", 5)},
+        )
+        return JsonValue(
+            "feature_table", [row for chunk in chunks for row in chunk], counted=True
+        )
+
+    def _execute_score_asins(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute score_asins node"""
+        node_data = node.get("data", {})
+        products = [
+            (p.asin, p.sales_amount, p.title, p.bullet_points)
+            for p in self._input_products(inputs)
+        ]
+        limit = node_data.get("limit")
+        chunks = self._run_in_process(
+            node,
+            transforms.score_products,
+            products,
+            {
+                "weights": node_data.get("weights"),
+                "limit": limit,
+                # Scale sales across the whole input, not per chunk
+                "max_sales": max(
+                    (sales or 0.0 for _, sales, _, _ in products), default=0.0
+                ),
+            },
+        )
+        scored = list(islice(heapq.merge(*chunks, key=transforms.score_order), limit))
+        return AsinList((asin for asin, _ in scored), scores=dict(scored))
+
+    def _execute_reshape_json(self, node: Dict, inputs: List[Value]) -> Value:
+        """Execute reshape_json node"""
+        node_data = node.get("data", {})
+        # Pool workers get plain JSON, not shared records
+        records = plain(inputs[0].value)
+        if isinstance(records, dict):
+            # merged_data: records keyed by ASIN
+            records = list(records.values())
+        chunks = self._run_in_process(
+            node,
+            transforms.reshape_records,
+            records,
+            {
+                "fields": node_data.get("fields"),
+                "rename": node_data.get("rename"),
+            },
+        )
+        return JsonValue(
+            "records", [record for chunk in chunks for record in chunk], counted=True
+        )
+
+
+# Built-in node types. Loops run as compiled LoopSteps, so they have no handler
+for _spec in (
+    NodeSpec(
+        "get_bestselling_asins",
+        WorkflowEngine._execute_get_bestselling_asins,
+        output="asin_list",
+    ),
+    NodeSpec("search_asins", WorkflowEngine._execute_search_asins, output="asin_list"),
+    NodeSpec(
+        "filter_asins",
+        WorkflowEngine._execute_filter_asins,
+        output="asin_list",
+        accepts=["asin_list"],
+        max_inputs=1,
+    ),
+    NodeSpec(
+        "sort_asins",
+        WorkflowEngine._execute_sort_asins,
+        output="asin_list",
+        accepts=["asin_list"],
+        max_inputs=1,
+    ),
+    NodeSpec(
+        "aggregate_sales",
+        WorkflowEngine._execute_aggregate_sales,
+        output="sales_summary",
+        accepts=["asin_list"],
+        max_inputs=1,
+    ),
+    NodeSpec(
+        "get_asin_by_index",
+        WorkflowEngine._execute_get_asin_by_index,
+        output="single_asin",
+        accepts=["asin_list"],
+        min_inputs=1,
+        max_inputs=1,
+    ),
+    NodeSpec(
+        "get_asin_details",
+        WorkflowEngine._execute_get_asin_details,
+        output="product_details",
+        accepts=["single_asin"],
+        min_inputs=1,
+        max_inputs=1,
+    ),
+    NodeSpec(
+        "text_features",
+        WorkflowEngine._execute_text_features,
+        output="feature_table",
+        accepts=["asin_list"],
+        min_inputs=1,
+        max_inputs=1,
+        execution=PROCESS,
+    ),
+    NodeSpec(
+        "score_asins",
+        WorkflowEngine._execute_score_asins,
+        output="asin_list",
+        accepts=["asin_list"],
+        min_inputs=1,
+        max_inputs=1,
+        execution=PROCESS,
+    ),
+    NodeSpec(
+        "reshape_json",
+        WorkflowEngine._execute_reshape_json,
+        output="records",
+        accepts=[ANY],
+        min_inputs=1,
+        max_inputs=1,
+        execution=PROCESS,
+    ),
+    NodeSpec(
+        "loop",
+        None,
+        output=ANY,
+        accepts=["asin_list", "product_details_table"],
+        min_inputs=1,
+        max_inputs=1,
+    ),
+    NodeSpec(
+        "merge",
+        WorkflowEngine._execute_merge,
+        output="merged_data",
+        accepts=[ANY],
+        max_inputs=None,
+    ),
+):
+    register(_spec)
@@ -0,0 +1,84 @@
+"""How much a CPU-bound transform stalls other threads in the same worker.
+
+Usage: python -m benchmarks.bench_cpu_pool [products]
+
+Runs ``text_features`` over a synthetic catalog, first on a thread (as an
+inline node would) and then through the process pool in chunks, while another thread
+that stands in for concurrent requests wakes every millisecond. Reports the
+transform's wall time and the other thread's worst wake-up delay. The pool
+only helps with a spare core per worker; on a single core the workers and
+the parent compete for the same CPU.
+"""
+import os
+import sys
+import threading
+import time
+
+from app import transforms
+from app.config import settings
+from app.cpu_pool import CpuPool
+
+
+def make_products(count):
+    return [
+        (
+            f"B{i:09d}",
+            f"Smart speaker {i} with Alexa and premium sound",
+            [
+                "Crisp vocals and balanced bass",
+                "Voice control your music",
+                f"Model {i} ready to help",
+            ],
+        )
+        for i in range(count)
+    ]
+
+
+def measure(label, work):
+    stop = threading.Event()
+    worst = [0.0]
+
+    def ticker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            time.sleep(0.001)
+            worst[0] = max(worst[0], time.perf_counter() - start - 0.001)
+
+    thread = threading.Thread(target=ticker)
+    thread.start()
+    start = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    print(
+        f"  {label:<14} transform {elapsed * 1000:8.1f} ms   worst stall of other "
+        f"thread {worst[0] * 1000:7.1f} ms"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    products = make_products(count)
+    chunk_size = settings.cpu_task_chunk_size
+    chunks = [
+        {"items": products[i : i + chunk_size], "top_terms": 5}
+        for i in range(0, count, chunk_size)
+    ]
+    pool = CpuPool(workers=2, max_pending=2)
+    # Start the worker processes outside the measurement
+    pool.run(abs, -1, timeout=30)
+
+    print(f"text_features over {count:,} products on {os.cpu_count()} CPU(s)")
+    measure(
+        "inline", lambda: transforms.text_features({"items": products, "top_terms": 5})
+    )
+    measure(
+        "process pool",
+        lambda: pool.run_many(transforms.text_features, chunks, timeout=120),
+    )
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Engine memory on a large loop workflow.
+
+Usage: python -m benchmarks.bench_engine_values [products]
+
+Runs bestsellers -> loop -> get_asin_details -> merge over a synthetic
+seller catalog, 50,000 products by default, and reports the run time and
+growth of peak RSS over setup. A second, traced run (tracemalloc) reports
+the heap and live memory blocks when the graph finishes executing, before
+results are converted to their public JSON shape, the heap peak, and the
+blocks the returned results keep alive. Runs in a scratch database from
+``benchmarks.fixtures``.
+"""
+import gc
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+
+from app import models
+from app.workflow_engine import WorkflowEngine
+from benchmarks.fixtures import create_seller, load_products, scratch_session
+
+
+def flow_data(count):
+    return {
+        "nodes": [
+            {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": count}},
+            {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+            {"id": "details", "type": "get_asin_details", "data": {}},
+            {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "top", "target": "loop"},
+            {"id": "e2", "source": "loop", "target": "details"},
+            {"id": "e3", "source": "details", "target": "merge"},
+        ],
+    }
+
+
+def blocks():
+    gc.collect()
+    return sum(
+        stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    with scratch_session() as db:
+        seller = create_seller(db)
+        load_products(db, seller.id, count)
+        db.commit()
+        workflow = models.Workflow(
+            id=uuid.uuid4(), name="bench", flow_data=flow_data(count), user_id=seller.id
+        )
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        result = WorkflowEngine(db).execute_workflow(workflow, seller)
+        elapsed = time.perf_counter() - start
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        assert result["status"] == "success", result.get("error")
+        del result
+        db.expunge_all()
+
+        tracemalloc.start()
+        baseline = blocks()
+        runner = WorkflowEngine(db)
+        graph_end = {}
+
+        # The original is bound as a default rather than captured, so deleting
+        # the wrapper and the runner below releases everything but the results
+        def measured_execute_graph(graph, execute_graph=runner._execute_graph):
+            values = execute_graph(graph)
+            # Everything the run holds before results are converted for persistence
+            graph_end["heap"] = tracemalloc.get_traced_memory()[0]
+            graph_end["blocks"] = blocks() - baseline
+            return values
+
+        runner._execute_graph = measured_execute_graph
+        result = runner.execute_workflow(workflow, seller)
+        _, peak = tracemalloc.get_traced_memory()
+        assert result["status"] == "success", result.get("error")
+        del runner, measured_execute_graph
+        # ``result`` is still referenced: its blocks are what is measured
+        held = blocks() - baseline
+        tracemalloc.stop()
+
+        print(
+            f"loop over {count:,} products: {elapsed:.2f} s, peak RSS growth "
+            f"{rss_growth / 1024:.1f} MiB"
+        )
+        print(
+            f"  when the graph finishes   heap {graph_end['heap'] / 2**20:8.1f} MiB   "
+            f"live blocks {graph_end['blocks']:>10,}"
+        )
+        print(f"  heap peak during run      {peak / 2**20:8.1f} MiB")
+        print(f"  blocks held by results    {held:>10,}")
+
+
+if __name__ == "__main__":
+    main()
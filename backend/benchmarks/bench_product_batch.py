@@ -0,0 +1,71 @@
+"""Per-ASIN product lookups against one batch lookup.
+
+Usage: python -m benchmarks.bench_product_batch [products] [asins]
+
+Loads a synthetic catalog, 100,000 products by default, then fetches 1,000
+random ASINs three ways: one at a time with the two queries
+``GET /products/{asin}`` runs (its ETag version, then the row), with
+``product_repository.get_fields`` for all columns, and with ``get_fields``
+projected to asin, title and sales_amount. Reports database time and the
+encoded response size; HTTP and auth overhead per request come on top of
+the one-at-a-time figure.
+"""
+import random
+import sys
+import time
+
+from app import models, serialization
+from app.product_repository import get_fields
+from benchmarks.fixtures import create_seller, load_products, scratch_session
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    wanted = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with scratch_session([models.User.__table__, models.MyProduct.__table__]) as db:
+        owner_id = create_seller(db).id
+        load_products(db, owner_id, count)
+        db.commit()
+        asins = [f"B{i:09d}" for i in random.Random(7).sample(range(count), wanted)]
+        print(f"{wanted:,} of {count:,} products")
+
+        start = time.perf_counter()
+        size = 0
+        for asin in asins:
+            owned = models.MyProduct.owner_id == owner_id
+            db.query(models.MyProduct.updated_at).filter(
+                models.MyProduct.asin == asin, owned
+            ).first()
+            product = (
+                db.query(models.MyProduct)
+                .filter(models.MyProduct.asin == asin, owned)
+                .first()
+            )
+            size += len(serialization.dump(serialization.product_adapter, product))
+            db.expunge(product)
+        print(
+            f"  one at a time      {(time.perf_counter() - start) * 1e3:8.1f} ms   "
+            f"{size / 1024:8.1f} KiB"
+        )
+
+        for label, fields in (
+            ("batch, all fields", None),
+            ("batch, 3 fields", ("asin", "title", "sales_amount")),
+        ):
+            start = time.perf_counter()
+            products, missing = get_fields(
+                db, owner_id, asins, *([fields] if fields else [])
+            )
+            body = serialization.dump(
+                serialization.product_batch_adapter,
+                {"products": products, "missing": missing},
+            )
+            print(
+                f"  {label:<18} {(time.perf_counter() - start) * 1e3:8.1f} ms   "
+                f"{len(body) / 1024:8.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
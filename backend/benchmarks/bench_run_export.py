@@ -0,0 +1,96 @@
+"""Peak memory and time of exporting one large table result.
+
+Usage: python -m benchmarks.bench_run_export [rows]
+
+Stores a run whose loop merge produced a ``product_details_table`` of
+200,000 rows by default, then writes it as CSV, NDJSON and Parquet the way
+``GET /runs/{id}/export`` does, decoding rows from the stored JSON text a
+chunk at a time. For comparison, the same CSV is written from the run's
+parsed results, as a client re-parsing the JSON blob would. Peak memory is
+what ``tracemalloc`` sees allocated, including the stored text read from
+the database.
+"""
+import csv
+import io
+import sys
+import time
+import tracemalloc
+
+from app import models, result_store, run_export
+from benchmarks.fixtures import create_seller, product_row, scratch_session
+
+
+def measure(label, write):
+    # Timed without tracemalloc, which slows small allocations down a lot
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in write())
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    for _ in write():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {label:<22} {size / 2**20:7.1f} MiB out in {elapsed:6.2f} s, peak "
+        f"{peak / 2**20:7.1f} MiB"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with scratch_session() as db:
+        seller = create_seller(db)
+        workflow = models.Workflow(
+            name="Bench", flow_data={"nodes": [], "edges": []}, user_id=seller.id
+        )
+        db.add(workflow)
+        db.flush()
+        rows = []
+        for i in range(count):
+            product = product_row(seller.id, i)
+            rows.append(
+                {
+                    key: product[key]
+                    for key in ("asin", "title", "description", "bullet_points")
+                }
+            )
+        run = models.WorkflowRun(
+            workflow_id=workflow.id, user_id=seller.id, status="completed"
+        )
+        db.add(run)
+        result_store.store_results(
+            db, run, {"merge": {"type": "product_details_table", "value": rows}}
+        )
+        db.commit()
+        del rows
+        run_id = run.id
+        db.expunge_all()
+        print(f"{count:,}-row table result")
+
+        run = db.get(models.WorkflowRun, run_id)
+        node_id, _ = run_export.find_table(db, run)
+        for export_format in ("csv", "ndjson", "parquet"):
+            if export_format == "parquet" and not run_export.parquet_available():
+                continue
+
+            def stream(export_format=export_format):
+                _, rows = run_export.find_table(db, run, node_id)
+                return run_export._WRITERS[export_format](rows)
+
+            measure(f"stream {export_format}", stream)
+
+        def parsed_csv():
+            loaded = db.get(models.WorkflowRun, run_id, populate_existing=True)
+            result_store.hydrate_results(db, [loaded])
+            table = loaded.results["merge"]["value"]
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=list(table[0]))
+            writer.writeheader()
+            writer.writerows(table)
+            yield buffer.getvalue().encode("utf-8")
+
+        measure("parse then write csv", parsed_csv)
+
+
+if __name__ == "__main__":
+    main()
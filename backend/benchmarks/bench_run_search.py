@@ -0,0 +1,137 @@
+"""Run search by ASIN and result contents over a large run history.
+
+Usage: python -m benchmarks.bench_run_search [runs] [queries]
+
+Stores a synthetic history, 1M runs by default, each with a top-sellers
+list and a product-details result drawn from a 100k-product catalog, then
+times ``json_search.search_runs`` for an ASIN, an ASIN plus result type, and
+an ASIN no run mentions (which must look at every candidate). On
+PostgreSQL (``BENCH_DATABASE_URL``, with the GIN indexes of migration 0008)
+each query is answered from the index; on SQLite it is a ``LIKE`` scan of
+the payload text, so fewer queries are timed there by default.
+"""
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app import models
+from app.json_search import asin_patterns, search_runs
+from app.result_store import canonical_json, payload_hash
+from benchmarks.fixtures import BATCH_SIZE, create_seller, scratch_session
+
+CATALOG = 100_000
+LIST_LENGTH = 5
+
+
+def load_runs(db, user_id, workflow_id, count, rng):
+    """``count`` completed runs with two results each, added in batches; the
+    caller commits"""
+    started = datetime.utcnow() - timedelta(seconds=count)
+    stored = set()
+    for first in range(0, count, BATCH_SIZE):
+        runs, payloads, links = [], {}, []
+        for i in range(first, min(first + BATCH_SIZE, count)):
+            run_id = uuid.uuid4()
+            at = started + timedelta(seconds=i)
+            runs.append(
+                {
+                    "id": run_id,
+                    "workflow_id": workflow_id,
+                    "user_id": user_id,
+                    "status": "completed",
+                    "started_at": at,
+                    "completed_at": at,
+                }
+            )
+            top = [f"B{rng.randrange(CATALOG):09d}" for _ in range(LIST_LENGTH)]
+            results = {
+                "top": {"type": "asin_list", "value": top},
+                "details": {
+                    "type": "product_details",
+                    "value": {top[0]: {"title": f"Product {top[0]}"}},
+                },
+            }
+            for position, (node_id, value) in enumerate(results.items()):
+                digest = payload_hash(value)
+                if digest not in stored:
+                    stored.add(digest)
+                    payloads[digest] = {
+                        "hash": digest,
+                        "payload": value,
+                        "size_bytes": len(canonical_json(value)),
+                    }
+                links.append(
+                    {
+                        "run_id": run_id,
+                        "node_id": node_id,
+                        "position": position,
+                        "payload_hash": digest,
+                    }
+                )
+        db.execute(models.WorkflowRun.__table__.insert(), runs)
+        if payloads:
+            db.execute(models.ResultPayload.__table__.insert(), list(payloads.values()))
+        db.execute(models.WorkflowRunPayload.__table__.insert(), links)
+
+
+def timed(query, arguments):
+    samples = []
+    for argument in arguments:
+        start = time.perf_counter()
+        query(argument)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3, max(samples) * 1e3
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tables = [
+        models.User.__table__,
+        models.Workflow.__table__,
+        models.WorkflowRun.__table__,
+        models.ResultPayload.__table__,
+        models.WorkflowRunPayload.__table__,
+    ]
+    rng = random.Random(7)
+    with scratch_session(tables) as db:
+        dialect = db.get_bind().dialect.name
+        queries = (
+            int(sys.argv[2])
+            if len(sys.argv) > 2
+            else (50 if dialect == "postgresql" else 5)
+        )
+        user_id = create_seller(db).id
+        workflow = models.Workflow(
+            name="Bench", flow_data={"nodes": [], "edges": []}, user_id=user_id
+        )
+        db.add(workflow)
+        db.flush()
+        start = time.perf_counter()
+        load_runs(db, user_id, workflow.id, count, rng)
+        db.commit()
+        print(
+            f"{count:,} runs on {dialect}: loaded in {time.perf_counter() - start:.1f} "
+            "s" + ("" if dialect == "postgresql" else " (no GIN index, searches scan)")
+        )
+
+        asins = [f"B{rng.randrange(CATALOG):09d}" for _ in range(queries)]
+        cases = [
+            ("ASIN", lambda asin: [asin_patterns(asin)]),
+            (
+                "ASIN + type",
+                lambda asin: [asin_patterns(asin), [{"type": "product_details"}]],
+            ),
+            ("no match", lambda asin: [asin_patterns(asin.replace("B", "X"))]),
+        ]
+        for label, groups in cases:
+            p50, worst = timed(
+                lambda asin: search_runs(db, user_id, groups(asin), 50), asins
+            )
+            print(f"  {label:<12} p50 {p50:9.1f} ms   max {worst:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
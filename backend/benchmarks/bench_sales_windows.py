@@ -0,0 +1,98 @@
+"""Windowed bestseller latency over a year of daily sales history.
+
+Usage: python -m benchmarks.bench_sales_windows [products] [days]
+
+Loads one sale per product per day, 2,000 products over 365 days by default,
+through ``sales_history.record_sales`` one day at a time, then times "top 10
+over the last N days" answered from the rollups against the same ranking
+computed by scanning ``sales_events``. Runs in a scratch database from
+``benchmarks.fixtures``; point ``BENCH_DATABASE_URL`` at an empty PostgreSQL
+database to measure there instead.
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app import models, sales_history
+from benchmarks.fixtures import create_seller, load_products, scratch_session
+
+WINDOWS = [7, 30, 90, 365]
+RUNS = 20
+
+
+def load(db, products, days, seed=11):
+    rng = random.Random(seed)
+    seller = create_seller(db)
+    load_products(db, seller.id, products)
+    asins = [f"B{i:09d}" for i in range(products)]
+    first_day = datetime.utcnow().replace(
+        hour=12, minute=0, second=0, microsecond=0
+    ) - timedelta(days=days - 1)
+    start = time.perf_counter()
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        sales_history.record_sales(
+            db, seller.id, ((asin, rng.uniform(1, 500), 1, day) for asin in asins)
+        )
+        db.commit()
+    return seller.id, time.perf_counter() - start
+
+
+def scan_events(db, days, count):
+    since = datetime.combine(
+        datetime.utcnow().date() - timedelta(days=days - 1), datetime.min.time()
+    )
+    total = func.sum(models.SalesEvent.amount).label("total")
+    return (
+        db.query(models.SalesEvent.asin, total)
+        .filter(models.SalesEvent.occurred_at >= since)
+        .group_by(models.SalesEvent.asin)
+        .order_by(total.desc(), models.SalesEvent.asin)
+        .limit(count)
+        .all()
+    )
+
+
+def timed(fn):
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+
+    tables = [
+        models.User.__table__,
+        models.MyProduct.__table__,
+        models.SalesEvent.__table__,
+        models.SalesRollup.__table__,
+    ]
+    with scratch_session(tables) as db:
+        owner_id, elapsed = load(db, products, days)
+        events = products * days
+        print(
+            f"{events:,} events ({products:,} products x {days} days) on "
+            f"{db.get_bind().dialect.name}, "
+            f"loaded in {elapsed:.1f} s ({events / elapsed:,.0f} events/s)"
+        )
+        print(f"  rollup rows: {db.query(models.SalesRollup).count():,}")
+        for window in WINDOWS:
+            rollups = timed(lambda: sales_history.top_selling(db, owner_id, window, 10))
+            raw = timed(lambda: scan_events(db, window, 10))
+            print(
+                f"  top 10 over {window:>3} days   rollups p50 {rollups:8.2f} ms   raw "
+                f"events p50 {raw:8.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Full-text search latency on a large synthetic catalog.
+
+Usage: python -m benchmarks.bench_search [products] [queries]
+
+Builds the in-process inverted index (the SQLite/test fallback) over a
+synthetic catalog, 1M products by default, and reports build time and
+query latency percentiles. When ``DATABASE_URL`` points at PostgreSQL and
+``my_products`` is populated, the same queries are also timed against the
+``tsvector`` GIN index, within the largest seller's catalog.
+"""
+import random
+import statistics
+import sys
+import time
+
+from app.search import InvertedIndex, add_product, search_asins
+
+FAMILIES = [
+    "smart speaker",
+    "streaming stick",
+    "kindle ereader",
+    "video doorbell",
+    "hdmi cable",
+    "usb charger",
+    "wireless headphones",
+    "security camera",
+    "fitness tracker",
+    "robot vacuum",
+    "air fryer",
+    "coffee maker",
+    "gaming mouse",
+    "mechanical keyboard",
+    "laptop stand",
+]
+WORDS = (
+    "alexa voice remote waterproof motion detection noise cancelling battery outdoor "
+    "indoor "
+    "fabric compact portable premium ultra hd black white charcoal stainless steel rgb "
+    "ergonomic adjustable quiet fast rechargeable foldable lightweight durable travel "
+    "home "
+    "office kitchen bedroom pet hair hepa filter app control timer display touch screen"
+).split()
+
+QUERIES = [
+    "smart speaker",
+    "waterproof kindle",
+    "voice remote",
+    "hdmi cable",
+    "wireless headphones noise",
+    "outdoor security camera",
+    "portable rechargeable speaker",
+    "robot vacuum pet hair",
+]
+
+
+def make_catalog(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        family = rng.choice(FAMILIES)
+        yield (
+            f"B{i:09d}",
+            rng.uniform(0, 20000),
+            f"{family} {' '.join(rng.choices(WORDS, k=3))} model {i}",
+            f"{family} with {' '.join(rng.choices(WORDS, k=12))}",
+            [" ".join(rng.choices(WORDS, k=4)) for _ in range(3)],
+        )
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples) * 1000,
+        "p95": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "max": samples[-1] * 1000,
+    }
+
+
+def report(name, fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    stats = percentiles(samples)
+    print(
+        f"  {name:<12} p50 {stats['p50']:8.2f} ms   p95 {stats['p95']:8.2f} ms   max "
+        f"{stats['max']:8.2f} ms"
+    )
+
+
+def bench_postgres(queries):
+    from sqlalchemy import func
+    from sqlalchemy.exc import OperationalError
+
+    from app import models
+    from app.database import SessionLocal, engine
+
+    if engine.dialect.name != "postgresql":
+        return
+    db = SessionLocal()
+    try:
+        # Searches are per seller; time the largest catalog
+        owner_id = (
+            db.query(models.MyProduct.owner_id)
+            .group_by(models.MyProduct.owner_id)
+            .order_by(func.count().desc())
+            .limit(1)
+            .scalar()
+        )
+        report("postgres", lambda query: search_asins(db, owner_id, query, 20), queries)
+    except OperationalError:
+        print("  postgres     skipped, database unavailable")
+    finally:
+        db.close()
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    queries = [QUERIES[i % len(QUERIES)] for i in range(runs)]
+
+    start = time.perf_counter()
+    index = InvertedIndex()
+    for row in make_catalog(products):
+        add_product(index, *row)
+    print(f"{products:,} products, index built in {time.perf_counter() - start:.1f} s")
+
+    report("in-process", lambda query: index.search(query, 20), queries)
+    bench_postgres(queries)
+
+
+if __name__ == "__main__":
+    main()
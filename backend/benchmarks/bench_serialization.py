@@ -0,0 +1,120 @@
+"""Compare the default FastAPI response path with the TypeAdapter/orjson path.
+
+Usage: python -m benchmarks.bench_serialization [runs] [products_per_run]
+
+Reports CPU time per encode and bytes on the wire (raw, gzip, brotli) for a
+run history whose results hold a large ``product_details_table``, and for a
+product listing.
+"""
+import gzip
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas, serialization
+from app.compression import brotli
+
+
+def make_products(count):
+    return [
+        SimpleNamespace(
+            asin=f"B{i:09d}",
+            title=f"Product {i} | Smart speaker with Alexa",
+            description="Our most popular smart speaker with a fabric design. " * 3,
+            bullet_points=[
+                "Crisp vocals and balanced bass",
+                "Voice control your music",
+                "Ready to help",
+            ],
+            sales_amount=1000.0 + i,
+            created_at=datetime.utcnow(),
+        )
+        for i in range(count)
+    ]
+
+
+def make_runs(runs, products_per_run):
+    table = [
+        {
+            "asin": p.asin,
+            "title": p.title,
+            "description": p.description,
+            "bullet_points": p.bullet_points,
+        }
+        for p in make_products(products_per_run)
+    ]
+    workflow_id = uuid.uuid4()
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            workflow_id=workflow_id,
+            user_id=uuid.uuid4(),
+            status="completed",
+            results={"merge": {"type": "product_details_table", "value": table}},
+            error_message=None,
+            started_at=datetime.utcnow(),
+            completed_at=datetime.utcnow(),
+        )
+        for _ in range(runs)
+    ]
+
+
+def default_path(model, items):
+    """What FastAPI does for ``response_model=List[model]`` plus JSONResponse.render"""
+    validated = [model.model_validate(item, from_attributes=True) for item in items]
+    content = jsonable_encoder(validated)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - start)
+    return best, result
+
+
+def report(name, model, adapter, items):
+    before_cpu, before = timed(lambda: default_path(model, items))
+    after_cpu, after = timed(lambda: serialization.dump(adapter, items))
+    assert json.loads(before) == json.loads(after)
+
+    print(f"\n{name}")
+    print(
+        f"  cpu  default: {before_cpu * 1000:8.1f} ms   type adapter: "
+        f"{after_cpu * 1000:8.1f} ms   ({before_cpu / after_cpu:.1f}x)"
+    )
+    print(f"  raw           {len(after):>10,} bytes")
+    print(f"  gzip          {len(gzip.compress(after, 6)):>10,} bytes")
+    if brotli is not None:
+        print(f"  brotli        {len(brotli.compress(after, quality=4)):>10,} bytes")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    products_per_run = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    report(
+        f"{runs} runs x {products_per_run} product details",
+        schemas.WorkflowRun,
+        serialization.workflow_runs_adapter,
+        make_runs(runs, products_per_run),
+    )
+    report(
+        f"{runs * products_per_run} products",
+        schemas.MyProduct,
+        serialization.products_adapter,
+        make_products(runs * products_per_run),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Product lookups from the shared catalog file against the database.
+
+Usage: python -m benchmarks.bench_shared_catalog [products]
+
+Builds the catalog file for a synthetic seller catalog, 100,000 products by
+default, then times single-ASIN lookups and "top 100" reads from the mapped
+file against the same reads through a ``ProductRepository`` with the file
+disabled. Also reports the file size and build time. Runs in a scratch
+database from ``benchmarks.fixtures``.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from app import models, shared_catalog
+from app.product_repository import ProductRepository
+from benchmarks.fixtures import create_seller, load_products, scratch_session
+
+RUNS = 2000
+
+
+def timed(fn, arguments):
+    samples = []
+    for argument in arguments:
+        start = time.perf_counter()
+        fn(argument)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "catalog.bin")
+    with scratch_session([models.User.__table__, models.MyProduct.__table__]) as db:
+        owner_id = create_seller(db).id
+        load_products(db, owner_id, count)
+        db.commit()
+        start = time.perf_counter()
+        shared_catalog.build(db, path)
+        built = time.perf_counter() - start
+        generation = shared_catalog._Generation(path)
+        print(
+            f"{count:,} products: catalog file {os.path.getsize(path) / 2**20:.1f} "
+            f"MiB, built in {built:.2f} s"
+        )
+
+        asins = [f"B{random.randrange(count):09d}" for _ in range(RUNS)]
+        mapped = timed(lambda asin: generation.get(asin, owner_id), asins)
+        # A fresh repository per lookup, as each run starts with an empty identity map
+        queried = timed(lambda asin: ProductRepository(db, owner_id).get(asin), asins)
+        print(
+            f"  get by ASIN   mapped file p50 {mapped:8.1f} us   database p50 "
+            f"{queried:8.1f} us"
+        )
+
+        mapped = timed(
+            lambda _: generation.top_selling(owner_id, 100), range(RUNS // 10)
+        )
+        queried = timed(
+            lambda _: ProductRepository(db, owner_id).top_selling(100),
+            range(RUNS // 10),
+        )
+        print(
+            f"  top 100       mapped file p50 {mapped:8.1f} us   database p50 "
+            f"{queried:8.1f} us"
+        )
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Cold-boot-to-first-request latency.
+
+Usage: python -m benchmarks.bench_startup [repeats]
+
+Starts ``uvicorn app.main:app`` in a fresh process, polls ``/health`` until
+it answers and reports how long that took. Also reports the bare import
+time of ``app.main`` so regressions from module-level work show up.
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_time():
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import app.main"], check=True, env=os.environ.copy()
+    )
+    return time.perf_counter() - start
+
+
+def boot_to_first_request(timeout=30.0):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=os.environ.copy(),
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if (
+                    httpx.get(
+                        f"http://127.0.0.1:{port}/health", timeout=0.5
+                    ).status_code
+                    == 200
+                ):
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.005)
+        raise TimeoutError("server did not answer /health")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(name, samples):
+    print(
+        f"{name:<28} median {statistics.median(samples) * 1000:7.1f} ms   "
+        f"min {min(samples) * 1000:7.1f} ms   max {max(samples) * 1000:7.1f} ms"
+    )
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    summarize("import app.main", [import_time() for _ in range(repeats)])
+    summarize(
+        "boot to first /health", [boot_to_first_request() for _ in range(repeats)]
+    )
+
+
+if __name__ == "__main__":
+    main()
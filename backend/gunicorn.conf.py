@@ -0,0 +1,29 @@
+# Gunicorn settings for the production image (see Dockerfile).
+#
+# The app is imported once in the master and forked into workers, so module
+# import cost is paid a single time. Workers must not share the master's
+# pooled DB connections, hence the dispose in post_fork.
+bind = "0.0.0.0:8080"
+workers = 4
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server):
+    from app import shared_catalog
+    from app.config import settings
+
+    # Build the shared catalog file once so every worker starts with it mapped
+    if settings.shared_catalog_path:
+        shared_catalog.refresh(
+            settings.shared_catalog_path, settings.shared_catalog_refresh_seconds
+        )
+
+
+def post_fork(server, worker):
+    from app.database import engine, replica_engine
+
+    # Drop inherited connections without closing them under the master
+    engine.dispose(close=False)
+    if replica_engine is not None:
+        replica_engine.dispose(close=False)
@@ -0,0 +1,65 @@
+import os
+
+# Tests run against an in-memory SQLite database unless DATABASE_URL names
+# another one. app.database builds its engine on import, so this has to run
+# before the imports below (hence noqa: E402).
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import seed_data  # noqa: E402
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.query_counter import capture_queries  # noqa: E402
+
+
+def _prepare_sqlite():
+    """Create the schema and seed data when the tests own a SQLite database"""
+    if engine.dialect.name != "sqlite":
+        return
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seeded = (
+            db.query(models.User)
+            .filter(models.User.email == "demo@example.com")
+            .first()
+            is not None
+        )
+    finally:
+        db.close()
+    if not seeded:
+        seed_data.create_seed_data()
+
+
+_prepare_sqlite()
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Logs in and returns the Authorization header: ``auth_headers()`` for
+    the demo user, ``auth_headers(email, password)`` for another one (logging
+    in creates unknown users)"""
+
+    def login(email="demo@example.com", password="demo123"):
+        response = client.post(
+            "/auth/login", json={"email": email, "password": password}
+        )
+        assert response.status_code == 200
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return login
+
+
+@pytest.fixture
+def query_stats():
+    """Counts every SQL statement issued while the test runs"""
+    with capture_queries() as stats:
+        yield stats
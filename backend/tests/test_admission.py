@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from app import admission
+from app.admission import AdmissionController, AdmissionRejected
+from app.config import settings
+
+
+def _controller(**overrides):
+    options = dict(
+        global_limit=1,
+        per_user_limit=1,
+        per_user_queue=5,
+        total_queue=10,
+        queue_timeout=2.0,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_rejects_when_user_queue_is_full():
+    controller = _controller(per_user_queue=0)
+    with controller.admit("alice"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.admit("alice"):
+                pass
+    assert rejected.value.retry_after >= 1
+    assert controller.stats() == {"running": 0, "queued": 0, "users_waiting": 0}
+
+
+def test_queued_caller_times_out():
+    controller = _controller(queue_timeout=0.05)
+    with controller.admit("alice"):
+        with pytest.raises(AdmissionRejected):
+            with controller.admit("bob"):
+                pass
+    assert controller.stats()["queued"] == 0
+
+
+def test_free_slots_rotate_between_users():
+    controller = _controller()
+    order = []
+    holder = controller.admit("alice")
+    holder.__enter__()
+
+    def run(user):
+        with controller.admit(user):
+            order.append(user)
+            time.sleep(0.01)
+
+    threads = []
+    # alice queues three runs before bob and carol queue one each
+    for user in ["alice", "alice", "alice", "bob", "carol"]:
+        thread = threading.Thread(target=run, args=(user,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+
+    holder.__exit__(None, None, None)
+    for thread in threads:
+        thread.join()
+
+    assert order == ["alice", "bob", "carol", "alice", "alice"]
+
+
+def test_queue_leaves_half_the_threadpool_free(monkeypatch):
+    monkeypatch.setattr(settings, "threadpool_threads", 40)
+    monkeypatch.setattr(settings, "run_total_queue", 50)
+    assert admission._total_queue(global_limit=4) == 16
+    monkeypatch.setattr(settings, "run_total_queue", 8)
+    assert admission._total_queue(global_limit=4) == 8
+    monkeypatch.setattr(settings, "threadpool_threads", 4)
+    assert admission._total_queue(global_limit=4) == 0
+
+
+def test_run_endpoint_returns_429_with_retry_after(client, auth_headers, monkeypatch):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Admission Workflow",
+            "flow_data": {"nodes": [], "edges": []},
+        },
+    ).json()
+
+    controller = _controller(global_limit=0, total_queue=0)
+    monkeypatch.setattr(admission, "run_admission", controller)
+
+    response = client.post(f"/workflows/{workflow['id']}/run", headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
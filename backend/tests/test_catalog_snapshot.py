@@ -0,0 +1,101 @@
+import pytest
+
+from app import catalog_snapshot, models
+from app.catalog_snapshot import CatalogColumns, CatalogSnapshot, _to_array
+from app.database import SessionLocal
+
+
+@pytest.fixture(params=["numpy", "python"])
+def columns(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(catalog_snapshot, "np", None)
+    elif catalog_snapshot.np is None:
+        pytest.skip("numpy is not installed")
+    asins = ["A", "B", "C", "D"]
+    return CatalogColumns(
+        asins,
+        _to_array([30.0, 10.0, 20.0, 10.0]),
+        {asin: row for row, asin in enumerate(asins)},
+    )
+
+
+def test_filter_keeps_input_order_and_drops_unknown_asins(columns):
+    assert columns.filter(["D", "A", "X", "C"], min_sales=15) == ["A", "C"]
+    assert columns.filter(None, max_sales=10) == ["B", "D"]
+
+
+def test_sort_is_stable_and_limited(columns):
+    assert columns.sort(None) == ["A", "C", "B", "D"]
+    assert columns.sort(["D", "B", "A"], descending=False) == ["D", "B", "A"]
+    assert columns.sort(None, limit=2) == ["A", "C"]
+
+
+def test_aggregate(columns):
+    assert columns.aggregate(["A", "B", "X"]) == {
+        "count": 2,
+        "total": 40.0,
+        "mean": 20.0,
+        "min": 10.0,
+        "max": 30.0,
+    }
+    assert columns.aggregate([])["count"] == 0
+
+
+def test_refresh_applies_changes_incrementally():
+    db = SessionLocal()
+    try:
+        owner_id = (
+            db.query(models.User.id)
+            .filter(models.User.email == "demo@example.com")
+            .scalar()
+        )
+        snapshot = CatalogSnapshot(owner_id)
+        columns = snapshot.refresh(db)
+        assert snapshot.full_loads == 1
+        assert snapshot.refresh(db) is columns
+
+        product = db.get(models.MyProduct, (owner_id, "B08N5WRWNW"))
+        original = product.sales_amount
+        product.sales_amount = original + 1
+        db.commit()
+        try:
+            columns = snapshot.refresh(db)
+            assert (snapshot.full_loads, snapshot.incremental_loads) == (1, 1)
+            assert columns.aggregate(["B08N5WRWNW"])["total"] == original + 1
+        finally:
+            product.sales_amount = original
+            db.commit()
+    finally:
+        db.close()
+
+
+def test_analytical_nodes_in_a_workflow(client, auth_headers):
+    headers = auth_headers()
+    flow_data = {
+        "nodes": [
+            {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 5}},
+            {"id": "filter", "type": "filter_asins", "data": {"minSales": 10000}},
+            {"id": "sort", "type": "sort_asins", "data": {"order": "asc", "limit": 2}},
+            {"id": "total", "type": "aggregate_sales", "data": {}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "top", "target": "filter"},
+            {"id": "e2", "source": "filter", "target": "sort"},
+            {"id": "e3", "source": "filter", "target": "total"},
+        ],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Analytics Workflow", "flow_data": flow_data},
+    )
+    response = client.post(f"/workflows/{workflow.json()['id']}/run", headers=headers)
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    filtered = results["filter"]["value"]
+    assert filtered == results["top"]["value"][: len(filtered)]
+    assert results["sort"]["value"] == list(reversed(filtered))[:2]
+    assert results["total"]["type"] == "sales_summary"
+    assert results["total"]["value"]["count"] == len(filtered)
+    assert results["total"]["value"]["min"] >= 10000
@@ -0,0 +1,91 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression, serialization
+from app.compression import CompressionMiddleware, negotiate_encoding
+
+payload = "x" * 5000
+
+test_app = FastAPI()
+test_app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@test_app.get("/large")
+def large():
+    return PlainTextResponse(payload)
+
+
+@test_app.get("/small")
+def small():
+    return PlainTextResponse("tiny")
+
+
+@test_app.get("/stream")
+def stream():
+    return StreamingResponse(
+        iter([b"[", b"1,", b"2", b"]"]), media_type="application/json"
+    )
+
+
+client = TestClient(test_app)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("") is None
+    if compression.brotli is not None:
+        assert negotiate_encoding("gzip, br") == "br"
+        assert negotiate_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_large_response_is_gzipped():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.text == payload
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_large_response_is_brotli_compressed():
+    response = client.get("/large", headers={"Accept-Encoding": "br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.text == payload
+
+
+def test_small_response_is_not_compressed():
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "tiny"
+
+
+def test_streaming_response_is_compressed_per_chunk():
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == [1, 2]
+
+
+def test_large_lists_stream_as_one_array(monkeypatch):
+    monkeypatch.setattr(serialization.settings, "json_stream_threshold", 2)
+    monkeypatch.setattr(serialization.settings, "json_stream_chunk_size", 2)
+    items = [
+        {
+            "asin": f"A{i}",
+            "title": f"Product {i}",
+            "sales_amount": i,
+            "created_at": "2024-01-01T00:00:00",
+        }
+        for i in range(5)
+    ]
+    response = serialization.json_list_response(serialization.products_adapter, items)
+    assert isinstance(response, StreamingResponse)
+
+    list_app = FastAPI()
+    list_app.get("/items")(
+        lambda: serialization.json_list_response(serialization.products_adapter, items)
+    )
+    body = TestClient(list_app).get("/items").json()
+    assert [item["asin"] for item in body] == [f"A{i}" for i in range(5)]
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from app import transforms
+from app.config import settings
+from app.cpu_pool import CpuPool, CpuTaskTimeout
+
+
+def test_text_features():
+    [row] = transforms.text_features(
+        {
+            "items": [
+                (
+                    "A1",
+                    "Smart speaker with Alexa",
+                    ["Alexa voice control", "Great speaker sound"],
+                )
+            ],
+            "top_terms": 2,
+        }
+    )
+    assert row["title_words"] == 3
+    assert row["bullet_count"] == 2
+    assert row["top_terms"] == ["speaker", "alexa"]
+
+
+def test_score_products_ranks_by_weighted_formula():
+    products = [
+        ("A1", 100.0, "Plain cable", []),
+        ("A2", 50.0, "Alexa speaker", ["Alexa built in"]),
+    ]
+    assert transforms.score_products({"items": products}) == [["A1", 1.0], ["A2", 0.5]]
+    scored = transforms.score_products(
+        {"items": products, "weights": {"sales": 1.0, "terms": {"Alexa": 0.5}}}
+    )
+    assert scored == [["A2", 1.5], ["A1", 1.0]]
+
+
+def test_reshape_records():
+    records = [{"asin": "A1", "title": "Speaker", "meta": {"color": "black"}}]
+    reshaped = transforms.reshape_records(
+        {
+            "items": records,
+            "fields": ["asin", "meta.color"],
+            "rename": {"meta.color": "color"},
+        }
+    )
+    assert reshaped == [{"asin": "A1", "color": "black"}]
+
+
+def test_run_many_keeps_payload_order():
+    pool = CpuPool(workers=2, max_pending=1)
+    try:
+        assert pool.run_many(abs, [-3, 2, -1], timeout=30) == [3, 2, 1]
+    finally:
+        pool.shutdown()
+
+
+def test_timed_out_task_is_killed_and_pool_recovers():
+    pool = CpuPool(workers=1, max_pending=1)
+    try:
+        start = time.monotonic()
+        with pytest.raises(CpuTaskTimeout):
+            pool.run(time.sleep, 30, timeout=1.0)
+        assert time.monotonic() - start < 10
+        assert pool.run(abs, -3, timeout=30) == 3
+    finally:
+        pool.shutdown()
+
+
+def test_transform_nodes_in_a_workflow(client, auth_headers, monkeypatch):
+    # Several chunks per node, so results are merged across chunks
+    monkeypatch.setattr(settings, "cpu_task_chunk_size", 2)
+    headers = auth_headers()
+    flow_data = {
+        "nodes": [
+            {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 3}},
+            {"id": "features", "type": "text_features", "data": {"topTerms": 3}},
+            {
+                "id": "score",
+                "type": "score_asins",
+                "data": {"weights": {"bullet_count": 1.0}, "limit": 2},
+            },
+            {
+                "id": "reshape",
+                "type": "reshape_json",
+                "data": {"fields": ["asin", "bullet_count"]},
+            },
+        ],
+        "edges": [
+            {"id": "e1", "source": "top", "target": "features"},
+            {"id": "e2", "source": "top", "target": "score"},
+            {"id": "e3", "source": "features", "target": "reshape"},
+        ],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Transform Workflow", "flow_data": flow_data},
+    )
+    response = client.post(f"/workflows/{workflow.json()['id']}/run", headers=headers)
+    assert response.status_code == 200
+    run = response.json()
+    assert run["status"] == "completed", run["error_message"]
+
+    results = run["results"]
+    assert results["features"]["count"] == 3
+    assert results["score"]["count"] == 2
+    assert set(results["score"]["value"]) <= set(results["top"]["value"])
+    assert results["reshape"]["value"] == [
+        {"asin": row["asin"], "bullet_count": row["bullet_count"]}
+        for row in results["features"]["value"]
+    ]
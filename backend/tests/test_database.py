@@ -0,0 +1,54 @@
+import uuid
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import create_database_engine
+from app.product_repository import ProductRepository
+from benchmarks.fixtures import create_seller, load_products, scratch_session
+
+
+def test_in_memory_sqlite_is_one_database_for_every_session():
+    engine = create_database_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    try:
+        writer = Session()
+        writer.add(models.User(email="memory@example.com", name="Memory"))
+        writer.commit()
+        writer.close()
+
+        reader = Session()
+        user = (
+            reader.query(models.User)
+            .filter(models.User.email == "memory@example.com")
+            .one()
+        )
+        assert isinstance(user.id, uuid.UUID)
+
+        # Foreign keys are enforced as they are on PostgreSQL
+        reader.add(
+            models.MyProduct(asin="ORPHAN", title="No owner", owner_id=uuid.uuid4())
+        )
+        with pytest.raises(IntegrityError):
+            reader.commit()
+        reader.close()
+    finally:
+        engine.dispose()
+
+
+def test_fixture_loader_builds_a_catalog_the_engine_can_read():
+    with scratch_session(memory=True) as db:
+        seller = create_seller(db)
+        load_products(db, seller.id, 12_000)
+        db.commit()
+
+        assert db.query(models.MyProduct).count() == 12_000
+        top = ProductRepository(db, seller.id).top_selling(3)
+        assert [product.asin for product in top] == [
+            "B000011999",
+            "B000011998",
+            "B000011997",
+        ]
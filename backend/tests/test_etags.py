@@ -0,0 +1,111 @@
+from app.query_counter import query_budget
+
+
+def test_unchanged_workflow_list_returns_304_without_loading_rows(client, auth_headers):
+    headers = auth_headers()
+    first = client.get("/workflows/", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    # user lookup and the version probe only
+    with query_budget(2):
+        second = client.get("/workflows/", headers={**headers, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+
+def test_workflow_etag_changes_after_update(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "ETag Workflow",
+            "flow_data": {"nodes": [], "edges": []},
+        },
+    ).json()
+
+    first = client.get(f"/workflows/{workflow['id']}", headers=headers)
+    etag = first.headers["ETag"]
+    assert (
+        client.get(
+            f"/workflows/{workflow['id']}",
+            headers={**headers, "If-None-Match": etag.removeprefix("W/")},
+        ).status_code
+        == 304
+    )
+
+    client.put(
+        f"/workflows/{workflow['id']}", headers=headers, json={"name": "Renamed"}
+    )
+    changed = client.get(
+        f"/workflows/{workflow['id']}", headers={**headers, "If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "Renamed"
+    assert changed.headers["ETag"] != etag
+
+
+def test_runs_etag_changes_after_new_run(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "ETag Runs Workflow",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 2},
+                    }
+                ],
+                "edges": [],
+            },
+        },
+    ).json()
+
+    etag = client.get(f"/workflows/{workflow['id']}/runs", headers=headers).headers[
+        "ETag"
+    ]
+    client.post(f"/workflows/{workflow['id']}/run", headers=headers)
+    response = client.get(
+        f"/workflows/{workflow['id']}/runs", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_product_conditional_get(client, auth_headers):
+    headers = auth_headers()
+    asin = client.get("/products/", headers=headers).json()[0]["asin"]
+    first = client.get(f"/products/{asin}", headers=headers)
+    assert (
+        client.get(
+            f"/products/{asin}",
+            headers={**headers, "If-None-Match": first.headers["ETag"]},
+        ).status_code
+        == 304
+    )
+    assert client.get("/products/MISSING", headers=headers).status_code == 404
+
+
+def test_etags_are_weak_and_vary_with_the_encoding(client, auth_headers):
+    headers = auth_headers()
+    plain = client.get("/products/", headers={**headers, "Accept-Encoding": "identity"})
+    compressed = client.get(
+        "/products/", headers={**headers, "Accept-Encoding": "gzip"}
+    )
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert plain.headers["ETag"].startswith('W/"')
+    assert plain.headers["ETag"] == compressed.headers["ETag"]
+    for response in (plain, compressed):
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+    not_modified = client.get(
+        "/products/", headers={**headers, "If-None-Match": plain.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["Vary"] == "Accept-Encoding"
@@ -0,0 +1,119 @@
+import json
+
+from app.json_search import asin_patterns, contains
+
+DETAILS_FLOW = {
+    "nodes": [
+        {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 2}},
+        {"id": "pick", "type": "get_asin_by_index", "data": {"index": 1}},
+        {"id": "details", "type": "get_asin_details", "data": {}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "top", "target": "pick"},
+        {"id": "e2", "source": "pick", "target": "details"},
+    ],
+}
+
+
+def test_contains_matches_like_jsonb():
+    document = {
+        "nodes": [
+            {"id": "a", "type": "loop", "data": {"mergeId": "m"}},
+            {"id": "m", "type": "merge"},
+        ]
+    }
+    assert contains(document, {})
+    assert contains(document, {"nodes": [{"type": "merge"}, {"type": "loop"}]})
+    assert contains(document, {"nodes": [{"data": {"mergeId": "m"}}]})
+    assert not contains(document, {"nodes": [{"type": "merge", "data": {}}]})
+    assert not contains(document, {"nodes": {"type": "loop"}})
+    assert contains([1, 2, 3], [3, 1])
+    assert not contains({"value": 1}, {"value": True})
+    assert not contains({"value": [1]}, {"value": 1})
+
+
+def test_asin_patterns_cover_the_result_shapes():
+    def matched(result):
+        return any(contains(result, pattern) for pattern in asin_patterns("B1"))
+
+    assert matched({"type": "single_asin", "value": "B1"})
+    assert matched({"type": "asin_list", "value": ["B0", "B1"]})
+    assert matched({"type": "product_details", "value": {"B1": {"title": "x"}}})
+    assert matched({"type": "product_table", "value": [{"asin": "B1", "rank": 1}]})
+    assert not matched({"type": "asin_list", "value": ["B10"]})
+    assert not matched({"type": "product_details", "value": {"title": "B1"}})
+
+
+def test_search_workflows_by_node_type_and_contents(client, auth_headers):
+    headers = auth_headers()
+    marker = {"nodes": [{"type": "get_asin_by_index", "data": {"index": 1}}]}
+    created = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Searchable", "flow_data": DETAILS_FLOW},
+    ).json()
+
+    found = client.get(
+        "/workflows/search",
+        headers=headers,
+        params={
+            "node_type": "get_asin_details",
+            "contains": json.dumps(marker),
+            "limit": 200,
+        },
+    )
+    assert found.status_code == 200
+    assert created["id"] in [workflow["id"] for workflow in found.json()]
+    assert "flow_data" not in found.json()[0]
+
+    missing = client.get(
+        "/workflows/search", headers=headers, params={"node_type": "no_such_node"}
+    )
+    assert missing.json() == []
+
+
+def test_search_runs_by_asin_and_result_type(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Run search", "flow_data": DETAILS_FLOW},
+    ).json()
+    run = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+    assert run["status"] == "completed", run["error_message"]
+    first, second = run["results"]["top"]["value"]
+
+    def search(**params):
+        response = client.get(
+            "/runs/search",
+            headers=headers,
+            params={"workflow_id": workflow["id"], **params},
+        )
+        assert response.status_code == 200
+        return [found["id"] for found in response.json()]
+
+    assert search(asin=second) == [run["id"]]
+    # The first ASIN only appears in the top-sellers list
+    assert search(asin=first, result_type="asin_list") == [run["id"]]
+    assert search(asin=first, result_type="product_details") == [run["id"]]
+    assert search(contains=json.dumps({"type": "single_asin", "value": first})) == []
+    assert search(
+        contains=json.dumps({"type": "single_asin", "value": second}),
+        status="completed",
+    ) == [run["id"]]
+    assert search(asin=second, status="failed") == []
+
+
+def test_search_needs_valid_criteria(client, auth_headers):
+    headers = auth_headers()
+    assert client.get("/runs/search", headers=headers).status_code == 400
+    assert client.get("/workflows/search", headers=headers).status_code == 400
+    response = client.get("/runs/search", headers=headers, params={"contains": "[1]"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "contains must be a JSON object"
+    assert (
+        client.get(
+            "/workflows/search", headers=headers, params={"contains": "{"}
+        ).status_code
+        == 400
+    )
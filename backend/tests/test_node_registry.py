@@ -0,0 +1,90 @@
+import pytest
+
+from app import workflow_engine  # noqa: F401 - registers the built-in node types
+from app.node_registry import LoopStep, compile_graph
+
+
+def _node(node_id, node_type, **data):
+    return {"id": node_id, "type": node_type, "data": data}
+
+
+def _edge(source, target):
+    return {"id": f"{source}-{target}", "source": source, "target": target}
+
+
+def test_compile_binds_inputs_to_upstream_slots():
+    nodes = [
+        _node("top", "get_bestselling_asins"),
+        _node("pick", "get_asin_by_index", index=1),
+        _node("details", "get_asin_details"),
+    ]
+    graph = compile_graph(nodes, [_edge("top", "pick"), _edge("pick", "details")])
+
+    assert [step.node_id for step in graph.steps] == ["top", "pick", "details"]
+    assert graph.steps[2].input_slots == [graph.slots["pick"]]
+
+
+def test_loop_body_compiles_into_a_loop_step():
+    nodes = [
+        _node("top", "get_bestselling_asins"),
+        _node("loop", "loop", mergeId="merge"),
+        _node("details", "get_asin_details"),
+        _node("merge", "merge", loopId="loop"),
+        _node("after", "aggregate_sales"),
+    ]
+    edges = [_edge("top", "loop"), _edge("loop", "details"), _edge("details", "merge")]
+    graph = compile_graph(nodes, edges)
+
+    loop = next(step for step in graph.steps if isinstance(step, LoopStep))
+    assert loop.element_type == "single_asin"
+    assert [step.node_id for step in loop.body] == ["details"]
+    assert loop.merge_input_slots == [graph.slots["details"]]
+    assert "loop" not in graph.result_ids
+
+
+@pytest.mark.parametrize(
+    "nodes, edges, message",
+    [
+        (
+            [_node("a", "get_bestselling_asins"), _node("b", "get_asin_details")],
+            [_edge("a", "b")],
+            "expects single_asin input, but a produces asin_list",
+        ),
+        ([_node("a", "get_asin_details")], [], "requires an input"),
+        (
+            [_node("a", "get_bestselling_asins"), _node("b", "search_asins")],
+            [_edge("a", "b")],
+            "does not take inputs",
+        ),
+        ([_node("a", "make_coffee")], [], "Unknown node type: make_coffee"),
+        (
+            [
+                _node("t", "get_bestselling_asins"),
+                _node("l", "loop", mergeId="m"),
+                _node("d", "get_asin_details"),
+                _node("m", "merge", loopId="l"),
+                _node("l2", "loop", mergeId="m2"),
+                _node("d2", "get_asin_details"),
+                _node("m2", "merge", loopId="l2"),
+            ],
+            [
+                _edge("t", "l"),
+                _edge("l", "d"),
+                _edge("d", "m"),
+                _edge("m", "l2"),
+                _edge("l2", "d2"),
+                _edge("d2", "m2"),
+            ],
+            "d2 \\(get_asin_details\\) expects single_asin input, but l2 produces "
+            "product_details",
+        ),
+        (
+            [_node("a", "filter_asins"), _node("b", "sort_asins")],
+            [_edge("a", "b"), _edge("b", "a")],
+            "cycle",
+        ),
+    ],
+)
+def test_compile_rejects_invalid_graphs(nodes, edges, message):
+    with pytest.raises(ValueError, match=message):
+        compile_graph(nodes, edges)
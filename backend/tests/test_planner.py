@@ -0,0 +1,150 @@
+from app.config import settings
+
+LOOP_FLOW = {
+    "nodes": [
+        {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 3}},
+        {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+        {"id": "details", "type": "get_asin_details", "data": {}},
+        {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "top", "target": "loop"},
+        {"id": "e2", "source": "loop", "target": "details"},
+        {"id": "e3", "source": "details", "target": "merge"},
+    ],
+}
+
+
+def _create_workflow(client, headers, flow_data):
+    response = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Planner Workflow", "flow_data": flow_data},
+    )
+    return response.json()["id"]
+
+
+def test_plan_estimates_loop_fan_out(client, auth_headers):
+    headers = auth_headers()
+    workflow_id = _create_workflow(client, headers, LOOP_FLOW)
+
+    response = client.post(f"/workflows/{workflow_id}/plan", headers=headers)
+    assert response.status_code == 200
+    plan = response.json()
+
+    nodes = {node["node_id"]: node for node in plan["nodes"]}
+    assert nodes["top"]["queries"] == 1
+    assert nodes["details"]["executions"] == 3
+    # details are served from the prefetched bestseller rows
+    assert nodes["details"]["queries"] == 0
+    assert nodes["merge"]["output_items"] == 3
+    assert plan["total_queries"] == 1
+    assert plan["catalog_size"] >= 3
+
+
+def test_plan_rejects_invalid_graph(client, auth_headers):
+    headers = auth_headers()
+    workflow_id = _create_workflow(
+        client,
+        headers,
+        {
+            "nodes": [{"id": "loop", "type": "loop", "data": {}}],
+            "edges": [],
+        },
+    )
+    assert (
+        client.post(f"/workflows/{workflow_id}/plan", headers=headers).status_code
+        == 400
+    )
+
+
+def test_run_over_budget_is_rejected(client, auth_headers, monkeypatch):
+    headers = auth_headers()
+    workflow_id = _create_workflow(client, headers, LOOP_FLOW)
+
+    monkeypatch.setattr(settings, "run_max_estimated_output_bytes", 100)
+    response = client.post(f"/workflows/{workflow_id}/run", headers=headers)
+    assert response.status_code == 422
+    assert "budget" in response.json()["detail"]
+
+
+def test_top_count_is_read_the_same_way_everywhere(client, auth_headers):
+    headers = auth_headers()
+    as_text = {
+        **LOOP_FLOW,
+        "nodes": [
+            {**LOOP_FLOW["nodes"][0], "data": {"topCount": "3"}},
+            *LOOP_FLOW["nodes"][1:],
+        ],
+    }
+    workflow_id = _create_workflow(client, headers, as_text)
+    nodes = {
+        node["node_id"]: node
+        for node in client.post(
+            f"/workflows/{workflow_id}/plan", headers=headers
+        ).json()["nodes"]
+    }
+    assert nodes["top"]["output_items"] == 3
+    run = client.post(f"/workflows/{workflow_id}/run", headers=headers).json()
+    assert run["status"] == "completed", run["error_message"]
+    assert len(run["results"]["top"]["value"]) == 3
+
+    for invalid in ("many", 0):
+        flow = {
+            **LOOP_FLOW,
+            "nodes": [
+                {**LOOP_FLOW["nodes"][0], "data": {"topCount": invalid}},
+                *LOOP_FLOW["nodes"][1:],
+            ],
+        }
+        workflow_id = _create_workflow(client, headers, flow)
+        response = client.post(f"/workflows/{workflow_id}/plan", headers=headers)
+        assert response.status_code == 400
+        assert "topCount" in response.json()["detail"]
+        run = client.post(f"/workflows/{workflow_id}/run", headers=headers).json()
+        assert run["status"] == "failed" and "topCount" in run["error_message"]
+
+
+def test_plan_rejects_unknown_node_types(client, auth_headers):
+    headers = auth_headers()
+    workflow_id = _create_workflow(
+        client,
+        headers,
+        {
+            "nodes": [*LOOP_FLOW["nodes"], {"id": "note", "type": "note", "data": {}}],
+            "edges": LOOP_FLOW["edges"],
+        },
+    )
+    response = client.post(f"/workflows/{workflow_id}/plan", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown node type: note"
+
+
+def test_details_queries_depend_on_where_the_asins_come_from(client, auth_headers):
+    headers = auth_headers()
+
+    def details_queries(source):
+        nodes = [source if node["id"] == "top" else node for node in LOOP_FLOW["nodes"]]
+        # A bestseller node elsewhere in the graph doesn't load the loop's rows
+        nodes.append(
+            {"id": "other", "type": "get_bestselling_asins", "data": {"topCount": 1}}
+        )
+        workflow_id = _create_workflow(
+            client, headers, {"nodes": nodes, "edges": LOOP_FLOW["edges"]}
+        )
+        plan = client.post(f"/workflows/{workflow_id}/plan", headers=headers).json()
+        details = next(node for node in plan["nodes"] if node["node_id"] == "details")
+        return details["queries"], details["executions"]
+
+    # Catalog snapshot nodes hand over ASINs without loading their rows
+    queries, executions = details_queries(
+        {"id": "top", "type": "sort_asins", "data": {"limit": 3}}
+    )
+    assert executions == 3 and queries == 3
+    # Search results join the identity map
+    assert (
+        details_queries(
+            {"id": "top", "type": "search_asins", "data": {"query": "speaker"}}
+        )[0]
+        == 0
+    )
@@ -0,0 +1,69 @@
+SEEDED = ["B08N5WRWNW", "B085HV4BZ6", "B07H8XQZPX", "B07XJ8C8F7", "B01E6AO69U"]
+
+
+def test_batch_returns_products_in_request_order_and_lists_missing(
+    client, auth_headers
+):
+    headers = auth_headers()
+    asins = [SEEDED[2], "NOPE000001", SEEDED[0], SEEDED[2]]
+    response = client.post("/products/batch", headers=headers, json={"asins": asins})
+    assert response.status_code == 200
+    body = response.json()
+    assert [p["asin"] for p in body["products"]] == [SEEDED[2], SEEDED[0]]
+    assert body["missing"] == ["NOPE000001"]
+
+    single = client.get(f"/products/{SEEDED[0]}", headers=headers).json()
+    assert body["products"][1] == single
+
+
+def test_batch_projects_the_requested_fields(client, auth_headers):
+    headers = auth_headers()
+    response = client.post(
+        "/products/batch",
+        params={"fields": "title, sales_amount"},
+        headers=headers,
+        json={"asins": SEEDED[:2]},
+    )
+    products = response.json()["products"]
+    assert [list(product) for product in products] == [
+        ["asin", "title", "sales_amount"]
+    ] * 2
+
+    response = client.post(
+        "/products/batch",
+        params={"fields": "title,secret"},
+        headers=headers,
+        json={"asins": SEEDED},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: secret"
+
+
+def test_batch_is_one_query_however_many_asins(client, auth_headers):
+    headers = auth_headers()
+
+    def query_count(asins):
+        response = client.post(
+            "/products/batch", headers=headers, json={"asins": asins}
+        )
+        assert response.status_code == 200
+        return int(response.headers["X-Query-Count"])
+
+    assert query_count(SEEDED[:1]) == query_count(
+        SEEDED + [f"MISSING{i:03d}" for i in range(500)]
+    )
+
+
+def test_batch_size_is_bounded(client, auth_headers):
+    headers = auth_headers()
+    assert (
+        client.post("/products/batch", headers=headers, json={"asins": []}).status_code
+        == 422
+    )
+    too_many = [f"B{i:09d}" for i in range(5001)]
+    assert (
+        client.post(
+            "/products/batch", headers=headers, json={"asins": too_many}
+        ).status_code
+        == 422
+    )
@@ -0,0 +1,123 @@
+import pytest
+
+from app.query_counter import QueryBudgetExceeded, QueryStats, query_budget
+
+
+def test_repeated_statement_shapes_are_flagged():
+    stats = QueryStats("test")
+    for _ in range(3):
+        stats.record("SELECT * FROM my_products WHERE asin = %(asin_1)s")
+    stats.record("SELECT * FROM users WHERE email = %(email_1)s")
+
+    assert stats.count == 4
+    assert stats.repeated(3) == [
+        ("SELECT * FROM my_products WHERE asin = %(asin_1)s", 3)
+    ]
+
+
+def test_in_lists_share_a_shape():
+    stats = QueryStats("test")
+    stats.record("SELECT * FROM my_products WHERE asin IN (?, ?)")
+    stats.record("SELECT * FROM my_products WHERE asin IN (?, ?, ?, ?)")
+    assert stats.repeated(2) == [("SELECT * FROM my_products WHERE asin IN (?)", 2)]
+
+
+def test_budget_exceeded_raises(client):
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget(0):
+            client.post(
+                "/auth/login", json={"email": "demo@example.com", "password": "demo123"}
+            )
+
+
+def test_request_query_count_header(client, auth_headers, query_stats):
+    headers = auth_headers()
+    before = query_stats.count
+    response = client.get("/workflows/", headers=headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) == query_stats.count - before
+
+
+def test_list_workflows_query_budget(client, auth_headers):
+    headers = auth_headers()
+    # user lookup, ETag version probe, workflow rows
+    with query_budget(3):
+        assert client.get("/workflows/", headers=headers).status_code == 200
+
+
+def test_list_products_query_budget(client, auth_headers):
+    headers = auth_headers()
+    with query_budget(3):
+        assert client.get("/products/", headers=headers).status_code == 200
+
+
+def test_run_workflow_query_budget(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Query Budget Workflow",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 3},
+                    },
+                    {"id": "pick", "type": "get_asin_by_index", "data": {"index": 0}},
+                    {"id": "details", "type": "get_asin_details", "data": {}},
+                ],
+                "edges": [
+                    {"id": "e1", "source": "top", "target": "pick"},
+                    {"id": "e2", "source": "pick", "target": "details"},
+                ],
+            },
+        },
+    ).json()
+
+    with query_budget(16, max_repeats=2):
+        response = client.post(f"/workflows/{workflow['id']}/run", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+def test_loop_details_do_not_query_per_item(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Loop Query Budget Workflow",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 4},
+                    },
+                    {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+                    {"id": "details", "type": "get_asin_details", "data": {}},
+                    {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+                ],
+                "edges": [
+                    {"id": "e1", "source": "top", "target": "loop"},
+                    {"id": "e2", "source": "loop", "target": "details"},
+                    {"id": "e3", "source": "details", "target": "merge"},
+                ],
+            },
+        },
+    ).json()
+
+    with query_budget(16, max_repeats=2) as stats:
+        response = client.post(f"/workflows/{workflow['id']}/run", headers=headers)
+    assert response.json()["status"] == "completed"
+    assert len(response.json()["results"]["merge"]["value"]) == 4
+    assert (
+        sum(
+            count
+            for shape, count in stats.statements.items()
+            if "FROM my_products" in shape
+        )
+        == 1
+    )
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models
+from app.database import SessionLocal, create_database_engine
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """A second in-memory database standing in for the replica.
+
+    It has the demo user and one product the primary doesn't, so a response
+    shows which database served it.
+    """
+    engine = create_database_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    ReplicaSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    primary = SessionLocal()
+    db = ReplicaSession()
+    try:
+        user = (
+            primary.query(models.User)
+            .filter(models.User.email == "demo@example.com")
+            .one()
+        )
+        db.add(models.User(id=user.id, email=user.email, name=user.name))
+        db.flush()
+        db.add(
+            models.MyProduct(
+                asin="REPLICA001",
+                title="Only on the replica",
+                bullet_points=[],
+                sales_amount=10**9,
+                owner_id=user.id,
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+        primary.close()
+    monkeypatch.setattr(database, "ReadSessionLocal", ReplicaSession)
+    yield ReplicaSession
+    engine.dispose()
+
+
+def test_read_routes_use_the_replica(client, auth_headers, replica):
+    headers = auth_headers()
+    assert client.get("/products/REPLICA001", headers=headers).status_code == 200
+    assert (
+        client.get("/products/bestselling/1", headers=headers).json()[0]["asin"]
+        == "REPLICA001"
+    )
+
+    # Writes go to the primary; the write route reads its own write back from there
+    created = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Replica routing",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 1},
+                    }
+                ],
+                "edges": [],
+            },
+        },
+    )
+    assert created.status_code == 200
+    workflow_id = created.json()["id"]
+    # The stand-in replica never catches up, so the new workflow isn't readable there
+    assert client.get(f"/workflows/{workflow_id}", headers=headers).status_code == 404
+
+    # The run is stored on the primary, but the engine reads products from the replica
+    run = client.post(f"/workflows/{workflow_id}/run", headers=headers).json()
+    assert run["status"] == "completed", run["error_message"]
+    assert run["results"]["top"]["value"] == ["REPLICA001"]
+
+
+def test_without_a_replica_reads_use_the_primary(client, auth_headers):
+    headers = auth_headers()
+    assert database.ReadSessionLocal is None
+    assert client.get("/products/REPLICA001", headers=headers).status_code == 404
+    created = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Primary only",
+            "flow_data": {"nodes": [], "edges": []},
+        },
+    )
+    assert (
+        client.get(f"/workflows/{created.json()['id']}", headers=headers).status_code
+        == 200
+    )
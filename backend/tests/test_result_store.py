@@ -0,0 +1,75 @@
+from app.result_store import canonical_json, payload_hash
+
+
+def test_payload_hash_ignores_key_order():
+    assert canonical_json({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+    assert payload_hash({"b": 1, "a": 2}) == payload_hash({"a": 2, "b": 1})
+
+
+def test_repeated_runs_share_payloads(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Dedup Workflow",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 3},
+                    },
+                    {"id": "pick", "type": "get_asin_by_index", "data": {"index": 1}},
+                ],
+                "edges": [{"id": "e1", "source": "top", "target": "pick"}],
+            },
+        },
+    ).json()
+
+    before = client.get("/workflows/runs/storage", headers=headers).json()
+    first = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+    second = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+    after = client.get("/workflows/runs/storage", headers=headers).json()
+
+    assert first["results"] == second["results"]
+    assert list(first["results"]) == ["top", "pick"]
+    assert first["results"]["top"]["type"] == "asin_list"
+
+    assert after["references"] - before["references"] == 4
+    assert after["unique_payloads"] - before["unique_payloads"] <= 2
+    assert after["saved_bytes"] > before["saved_bytes"]
+
+    runs = client.get(f"/workflows/{workflow['id']}/runs", headers=headers).json()
+    assert [run["results"] for run in runs] == [first["results"], first["results"]]
+
+
+def test_storage_stats_only_count_the_users_runs(client, auth_headers):
+    headers = auth_headers()
+    other = auth_headers("storage-other@example.com", "anything")
+    workflow = client.post(
+        "/workflows/",
+        headers=other,
+        json={
+            "name": "Other tenant",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 2},
+                    }
+                ],
+                "edges": [],
+            },
+        },
+    ).json()
+
+    before = client.get("/workflows/runs/storage", headers=headers).json()
+    client.post(f"/workflows/{workflow['id']}/run", headers=other)
+    assert client.get("/workflows/runs/storage", headers=headers).json() == before
+
+    stats = client.get("/workflows/runs/storage", headers=other).json()
+    assert stats["references"] == 1
+    assert stats["unique_payloads"] == 1
+    assert stats["stored_bytes"] == stats["logical_bytes"] > 0
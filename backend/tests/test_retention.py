@@ -0,0 +1,99 @@
+import gzip
+import os
+
+import pytest
+
+from app import retention
+from app.config import settings
+from app.database import SessionLocal
+
+FLOW_DATA = {
+    "nodes": [{"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 2}}],
+    "edges": [],
+}
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "run_archive_dir", str(tmp_path))
+    return tmp_path
+
+
+def _compact():
+    db = SessionLocal()
+    try:
+        return retention.compact(db)
+    finally:
+        db.close()
+
+
+def test_compaction_archives_runs_beyond_the_policy(client, auth_headers, archive_dir):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Retention Workflow",
+            "flow_data": FLOW_DATA,
+            "retention_keep_runs": 2,
+        },
+    ).json()
+    assert workflow["retention_keep_runs"] == 2
+    run_ids = [
+        client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()["id"]
+        for _ in range(4)
+    ]
+
+    assert _compact()["archived"] == 2
+    assert _compact()["archived"] == 0
+
+    kept = client.get(f"/workflows/{workflow['id']}/runs", headers=headers).json()
+    assert [run["id"] for run in kept] == run_ids[:1:-1]
+
+    archived = client.get(
+        f"/workflows/{workflow['id']}/runs/archived", headers=headers
+    ).json()
+    assert [run["id"] for run in archived] == run_ids[1::-1]
+    assert archived[0]["results"]["top"]["type"] == "asin_list"
+
+    files = [name for name in os.listdir(archive_dir) if name.endswith(".jsonl.gz")]
+    assert len(files) == 1
+    with gzip.open(archive_dir / files[0], "rt") as archive:
+        assert len(archive.readlines()) == 2
+
+
+def test_restored_run_is_exempt_from_retention(client, auth_headers, archive_dir):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Restore Workflow",
+            "flow_data": FLOW_DATA,
+            "retention_keep_runs": 1,
+        },
+    ).json()
+    run_ids = [
+        client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()["id"]
+        for _ in range(2)
+    ]
+    assert _compact()["archived"] == 1
+
+    response = client.post(f"/workflows/runs/{run_ids[0]}/restore", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["results"]["top"]["type"] == "asin_list"
+
+    assert _compact()["archived"] == 0
+    runs = client.get(f"/workflows/{workflow['id']}/runs", headers=headers).json()
+    assert {run["id"] for run in runs} == set(run_ids)
+    assert (
+        client.get(f"/workflows/{workflow['id']}/runs/archived", headers=headers).json()
+        == []
+    )
+
+    assert (
+        client.post(
+            f"/workflows/runs/{run_ids[0]}/restore", headers=headers
+        ).status_code
+        == 404
+    )
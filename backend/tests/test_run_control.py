@@ -0,0 +1,226 @@
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app import models, run_control
+from app.config import settings
+from app.database import SessionLocal
+from app.routers.workflows import _execute_coalesced
+from app.run_control import RunCancelled, RunControl
+from app.workflow_engine import WorkflowEngine
+
+LOOP_FLOW = {
+    "nodes": [
+        {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 4}},
+        {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+        {"id": "details", "type": "get_asin_details", "data": {}},
+        {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "top", "target": "loop"},
+        {"id": "e2", "source": "loop", "target": "details"},
+        {"id": "e3", "source": "details", "target": "merge"},
+    ],
+}
+
+
+class CancelAfter(RunControl):
+    """Cancels the run once it has passed ``checks`` checks"""
+
+    def __init__(self, checks):
+        super().__init__()
+        self.checks = checks
+
+    def check(self):
+        self.checks -= 1
+        if self.checks < 0:
+            self.cancel()
+        super().check()
+
+
+class HeldEngine:
+    """Stands in for WorkflowEngine: each run finishes once ``release`` is set"""
+
+    def __init__(self, status="success"):
+        self.status = status
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def execute_workflow(self, workflow, user):
+        self.runs += 1
+        self.started.set()
+        self.release.wait()
+        return {"status": self.status, "results": {}}
+
+
+def _coalescing_leader(engine):
+    """A workflow with a coalesced run in flight, and that run's thread"""
+    workflow = SimpleNamespace(id=uuid.uuid4(), flow_data={"nodes": [], "edges": []})
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(
+            _execute_coalesced(engine, workflow, None, RunControl())
+        )
+    )
+    leader.start()
+    engine.started.wait()
+    return workflow, leader, results
+
+
+@pytest.mark.parametrize(
+    "make_control, status",
+    [
+        (lambda: CancelAfter(0), "cancelled"),
+        (lambda: RunControl(timeout=0.05), "timed_out"),
+    ],
+)
+def test_coalesced_runs_stop_waiting_on_their_own_cancel_or_deadline(
+    make_control, status
+):
+    leading = HeldEngine()
+    workflow, leader, _ = _coalescing_leader(leading)
+    following = HeldEngine()
+
+    assert (
+        _execute_coalesced(following, workflow, None, make_control())["status"]
+        == status
+    )
+    assert following.runs == 0
+    leading.release.set()
+    leader.join()
+
+
+def test_coalesced_runs_dont_take_over_a_stop_that_was_not_theirs():
+    leading = HeldEngine(status="cancelled")
+    workflow, leader, leader_results = _coalescing_leader(leading)
+    following = HeldEngine()
+    following.release.set()
+    follower_results = []
+    follower = threading.Thread(
+        target=lambda: follower_results.append(
+            _execute_coalesced(following, workflow, None, RunControl())
+        )
+    )
+    follower.start()
+
+    leading.release.set()
+    leader.join()
+    follower.join()
+    assert leader_results[0]["status"] == "cancelled"
+    assert follower_results[0]["status"] == "success"
+    assert following.runs == 1
+
+
+def test_cancelled_loop_keeps_the_items_that_finished():
+    db = SessionLocal()
+    try:
+        user = (
+            db.query(models.User).filter(models.User.email == "demo@example.com").one()
+        )
+        workflow = models.Workflow(
+            id=uuid.uuid4(), name="cancel", flow_data=LOOP_FLOW, user_id=user.id
+        )
+        # top, the loop, then one check per iteration and one for the details step in it
+        result = WorkflowEngine(db, CancelAfter(2 + 2 * 2)).execute_workflow(
+            workflow, user
+        )
+    finally:
+        db.close()
+
+    assert result["status"] == "cancelled"
+    assert len(result["results"]["top"]["value"]) == 4
+    merged = result["results"]["merge"]["value"]
+    assert [row["asin"] for row in merged] == result["results"]["top"]["value"][:2]
+
+
+def test_runs_past_their_deadline_are_timed_out(client, auth_headers):
+    headers = auth_headers()
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "Deadline",
+            "flow_data": LOOP_FLOW,
+            "run_timeout_seconds": 1e-9,
+        },
+    ).json()
+    assert workflow["run_timeout_seconds"] == 1e-9
+
+    run = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+    assert run["status"] == "timed_out"
+    assert "deadline" in run["error_message"]
+    assert run["completed_at"] is not None
+
+    # A per-request deadline overrides the workflow's
+    run = client.post(
+        f"/workflows/{workflow['id']}/run",
+        params={"timeout_seconds": 60},
+        headers=headers,
+    ).json()
+    assert run["status"] == "completed", run["error_message"]
+    assert len(run["results"]["merge"]["value"]) == 4
+
+
+def _running_run():
+    db = SessionLocal()
+    try:
+        user = (
+            db.query(models.User).filter(models.User.email == "demo@example.com").one()
+        )
+        workflow = models.Workflow(
+            name="Cancel target", flow_data=LOOP_FLOW, user_id=user.id
+        )
+        db.add(workflow)
+        db.flush()
+        run = models.WorkflowRun(
+            workflow_id=workflow.id, user_id=user.id, status="running"
+        )
+        db.add(run)
+        db.commit()
+        return run.id
+    finally:
+        db.close()
+
+
+def test_cancel_reaches_a_run_in_this_process(client, auth_headers):
+    headers = auth_headers()
+    run_id = _running_run()
+    with run_control.active_runs.register(run_id, None) as control:
+        response = client.post(f"/runs/{run_id}/cancel", headers=headers)
+        assert response.status_code == 202
+        assert response.json()["status"] == "running"
+        assert response.json()["cancel_requested_at"] is not None
+        with pytest.raises(RunCancelled):
+            control.check()
+
+
+def test_cancel_reaches_a_run_in_another_process(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "run_cancel_poll_seconds", 0.0)
+    run_id = _running_run()
+    # Not registered here, as if another worker executed it
+    control = RunControl(poll=lambda: run_control.cancel_requested(run_id))
+    control.check()
+
+    assert (
+        client.post(f"/runs/{run_id}/cancel", headers=auth_headers()).status_code == 202
+    )
+    with pytest.raises(RunCancelled):
+        control.check()
+
+
+def test_only_running_runs_of_the_user_can_be_cancelled(client, auth_headers):
+    headers = auth_headers()
+    assert (
+        client.post(f"/runs/{uuid.uuid4()}/cancel", headers=headers).status_code == 404
+    )
+
+    workflow = client.post(
+        "/workflows/", headers=headers, json={"name": "Done", "flow_data": LOOP_FLOW}
+    ).json()
+    run = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+    response = client.post(f"/runs/{run['id']}/cancel", headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Run already completed"
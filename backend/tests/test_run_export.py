@@ -0,0 +1,311 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app import models, run_export
+from app.config import settings
+from app.database import SessionLocal
+from app.query_counter import query_budget
+from app.run_export import csv_chunks, parquet_chunks, table_rows
+
+LOOP_FLOW = {
+    "nodes": [
+        {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 3}},
+        {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+        {"id": "details", "type": "get_asin_details", "data": {}},
+        {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "top", "target": "loop"},
+        {"id": "e2", "source": "loop", "target": "details"},
+        {"id": "e3", "source": "details", "target": "merge"},
+    ],
+}
+
+
+def _run_loop_workflow(client, headers, runs=1):
+    workflow = client.post(
+        "/workflows/", headers=headers, json={"name": "Export", "flow_data": LOOP_FLOW}
+    ).json()
+    results = []
+    for _ in range(runs):
+        run = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+        assert run["status"] == "completed", run["error_message"]
+        results.append(run)
+    return workflow, results
+
+
+def test_rows_are_read_from_json_text_in_either_key_order():
+    # As stored by json.dumps, and as PostgreSQL prints jsonb
+    stored = '{"type": "records", "value": [{"a": 1}, {"a": "x, ]"}], "count": 2}'
+    printed = '{ "type":"records" ,"count":2,"value" : [ {"a": 1} , {"a": "x, ]"} ] }'
+    for text in (stored, printed):
+        assert list(table_rows(text)) == [{"a": 1}, {"a": "x, ]"}]
+    assert list(table_rows('{"type": "records", "value": []}')) == []
+
+
+def test_columns_and_types_hold_for_the_whole_export(monkeypatch):
+    monkeypatch.setattr(settings, "export_chunk_rows", 1)
+    rows = [
+        {"asin": "B1", "score": 1, "ok": True},
+        {"asin": "B2", "score": 2.5, "title_chars": 12},
+        {"asin": "B3", "score": "n/a", "ok": False, "tags": ["a"]},
+    ]
+
+    text = b"".join(csv_chunks(lambda: rows)).decode()
+    assert list(csv.DictReader(io.StringIO(text))) == [
+        {"asin": "B1", "score": "1", "ok": "True", "title_chars": "", "tags": ""},
+        {"asin": "B2", "score": "2.5", "ok": "", "title_chars": "12", "tags": ""},
+        {
+            "asin": "B3",
+            "score": "n/a",
+            "ok": "False",
+            "title_chars": "",
+            "tags": '["a"]',
+        },
+    ]
+
+    parquet = pytest.importorskip("pyarrow.parquet")
+    table = parquet.read_table(io.BytesIO(b"".join(parquet_chunks(lambda: rows))))
+    assert table.to_pydict() == {
+        "asin": ["B1", "B2", "B3"],
+        "score": ["1", "2.5", "n/a"],
+        "ok": [True, None, False],
+        "title_chars": [None, 12.0, None],
+        "tags": [None, None, '["a"]'],
+    }
+
+
+def test_export_a_run_table_as_csv_and_ndjson(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "export_chunk_rows", 2)
+    headers = auth_headers()
+    _, (run,) = _run_loop_workflow(client, headers)
+    expected = run["results"]["merge"]["value"]
+
+    response = client.get(f"/runs/{run['id']}/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert f"run-{run['id']}-merge.csv" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["asin"] for row in rows] == [row["asin"] for row in expected]
+    assert json.loads(rows[0]["bullet_points"]) == expected[0]["bullet_points"]
+
+    response = client.get(
+        f"/runs/{run['id']}/export",
+        params={"format": "ndjson", "node": "merge"},
+        headers=headers,
+    )
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+
+def test_export_a_run_table_as_parquet(client, auth_headers):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    headers = auth_headers()
+    _, (run,) = _run_loop_workflow(client, headers)
+
+    response = client.get(
+        f"/runs/{run['id']}/export", params={"format": "parquet"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    table = parquet.read_table(io.BytesIO(response.content))
+    assert table.column("asin").to_pylist() == [
+        row["asin"] for row in run["results"]["merge"]["value"]
+    ]
+
+
+def test_export_needs_a_table_result(client, auth_headers):
+    headers = auth_headers()
+    _, (run,) = _run_loop_workflow(client, headers)
+    response = client.get(
+        f"/runs/{run['id']}/export", params={"node": "top"}, headers=headers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Node 'top' produced asin_list, not a table"
+    assert (
+        client.get(
+            f"/runs/{run['id']}/export", params={"node": "nope"}, headers=headers
+        ).status_code
+        == 404
+    )
+    assert (
+        client.get(
+            f"/runs/{run['id']}/export", params={"format": "xlsx"}, headers=headers
+        ).status_code
+        == 422
+    )
+
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={
+            "name": "No table",
+            "flow_data": {
+                "nodes": [
+                    {
+                        "id": "top",
+                        "type": "get_bestselling_asins",
+                        "data": {"topCount": 1},
+                    }
+                ],
+                "edges": [],
+            },
+        },
+    ).json()
+    run = client.post(f"/workflows/{workflow['id']}/run", headers=headers).json()
+    response = client.get(f"/runs/{run['id']}/export", headers=headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Run has no table result"
+
+
+def test_export_runs_with_inline_results(client, auth_headers):
+    db = SessionLocal()
+    try:
+        user = (
+            db.query(models.User).filter(models.User.email == "demo@example.com").one()
+        )
+        workflow = models.Workflow(name="Inline", flow_data=LOOP_FLOW, user_id=user.id)
+        db.add(workflow)
+        db.flush()
+        rows = [{"asin": "B1", "score": 1}, {"asin": "B2", "score": 2.5}]
+        run = models.WorkflowRun(
+            workflow_id=workflow.id,
+            user_id=user.id,
+            status="completed",
+            results={
+                "table": {"type": "feature_table", "value": rows, "count": 2},
+                "top": {"type": "asin_list"},
+            },
+        )
+        db.add(run)
+        db.commit()
+        run_id = run.id
+    finally:
+        db.close()
+
+    response = client.get(
+        f"/runs/{run_id}/export", params={"format": "ndjson"}, headers=auth_headers()
+    )
+    assert [json.loads(line) for line in response.text.splitlines()] == rows
+
+
+def test_bulk_export_of_a_workflows_runs(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "export_chunk_rows", 2)
+    headers = auth_headers()
+    workflow, runs = _run_loop_workflow(client, headers, runs=2)
+
+    response = client.get(f"/workflows/{workflow['id']}/runs/export", headers=headers)
+    assert response.status_code == 200
+    assert (
+        f"workflow-{workflow['id']}-runs.csv" in response.headers["content-disposition"]
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["run_id"] for row in rows] == [
+        run["id"] for run in runs for _ in range(3)
+    ]
+    assert list(rows[0])[:3] == ["run_id", "run_started_at", "asin"]
+
+    response = client.get(
+        f"/workflows/{workflow['id']}/runs/export",
+        params={"format": "ndjson", "status": "failed"},
+        headers=headers,
+    )
+    assert response.text == ""
+    empty = client.get(
+        f"/workflows/{workflow['id']}/runs/export",
+        params={"status": "failed"},
+        headers=headers,
+    )
+    assert empty.text.splitlines() == ["run_id,run_started_at"]
+    missing = client.get(
+        "/workflows/00000000-0000-0000-0000-000000000000/runs/export", headers=headers
+    )
+    assert missing.status_code == 404
+
+
+def test_bulk_export_of_runs_with_different_tables(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "export_chunk_rows", 1)
+    db = SessionLocal()
+    try:
+        user = (
+            db.query(models.User).filter(models.User.email == "demo@example.com").one()
+        )
+        workflow = models.Workflow(
+            name="Changing tables", flow_data=LOOP_FLOW, user_id=user.id
+        )
+        db.add(workflow)
+        db.flush()
+        for started_at, result in [
+            (
+                datetime(2021, 1, 1),
+                {"type": "feature_table", "value": [{"asin": "B1", "score": 0.5}]},
+            ),
+            (
+                datetime(2021, 1, 2),
+                {
+                    "type": "product_details_table",
+                    "value": [{"asin": "B2", "title": "Speaker"}],
+                },
+            ),
+        ]:
+            db.add(
+                models.WorkflowRun(
+                    workflow_id=workflow.id,
+                    user_id=user.id,
+                    status="completed",
+                    started_at=started_at,
+                    results={"table": result},
+                )
+            )
+        db.commit()
+        workflow_id = workflow.id
+    finally:
+        db.close()
+
+    response = client.get(
+        f"/workflows/{workflow_id}/runs/export", headers=auth_headers()
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["asin"], row["score"], row["title"]) for row in rows] == [
+        ("B1", "0.5", ""),
+        ("B2", "", "Speaker"),
+    ]
+
+
+def test_bulk_export_reads_every_run_in_one_query(client, auth_headers):
+    workflow, runs = _run_loop_workflow(client, auth_headers(), runs=3)
+    workflow_id = uuid.UUID(workflow["id"])
+    db = SessionLocal()
+    try:
+        user_id = db.get(models.Workflow, workflow_id).user_id
+    finally:
+        db.close()
+
+    with query_budget(1):
+        rows = list(run_export.workflow_table_rows(workflow_id, user_id))
+    assert [row["run_id"] for row in rows] == [
+        run["id"] for run in runs for _ in range(3)
+    ]
+    with query_budget(1):
+        assert (
+            len(list(run_export.workflow_table_rows(workflow_id, user_id, "merge")))
+            == 9
+        )
+    # The node's result is not a table
+    assert list(run_export.workflow_table_rows(workflow_id, user_id, "top")) == []
+
+
+def test_empty_tables_keep_their_header_and_schema():
+    assert (
+        b"".join(csv_chunks(lambda: [], ("run_id", "run_started_at")))
+        == b"run_id,run_started_at\r\n"
+    )
+    parquet = pytest.importorskip("pyarrow.parquet")
+    table = parquet.read_table(
+        io.BytesIO(b"".join(parquet_chunks(lambda: [], ("run_id",))))
+    )
+    assert table.num_rows == 0 and table.column_names == ["run_id"]
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta
+
+from app import models, sales_history
+from app.database import SessionLocal
+
+
+def test_window_totals_match_raw_events():
+    # Small daily amounts in 2020, well away from the other tests' sales
+    asins = ["B08N5WRWNW", "B085HV4BZ6", "B07H8XQZPX"]
+    events = []
+    for offset in range(90):
+        day = datetime(2020, 1, 1, 12) + timedelta(days=offset)
+        for position, asin in enumerate(asins):
+            events.append((asin, 0.01 * ((offset * (position + 3)) % 7 + 1), 1, day))
+
+    db = SessionLocal()
+    try:
+        owner_id = (
+            db.query(models.User.id)
+            .filter(models.User.email == "demo@example.com")
+            .scalar()
+        )
+        sales_history.record_sales(db, owner_id, events)
+        db.commit()
+        for today in (date(2020, 2, 14), date(2020, 3, 1), date(2020, 3, 22)):
+            for days in (1, 6, 7, 8, 13, 30, 60):
+                start = datetime.combine(
+                    today - timedelta(days=days - 1), datetime.min.time()
+                )
+                expected = {}
+                for asin, amount, _, occurred_at in events:
+                    if start <= occurred_at < start + timedelta(days=days):
+                        expected[asin] = expected.get(asin, 0.0) + amount
+                ranked = sales_history.top_selling(db, owner_id, days, 10, today=today)
+                assert {asin: round(amount, 6) for asin, amount in ranked} == {
+                    asin: round(amount, 6) for asin, amount in expected.items()
+                }, (today, days)
+                assert [amount for _, amount in ranked] == sorted(
+                    (amount for _, amount in ranked), reverse=True
+                )
+
+        # One weekly bucket per week and one daily bucket per day and product
+        rollups = db.query(models.SalesRollup).filter(
+            models.SalesRollup.asin == "B08N5WRWNW",
+            models.SalesRollup.bucket_start < date(2020, 6, 1),
+        )
+        assert rollups.filter(models.SalesRollup.granularity == "day").count() == 90
+        assert rollups.filter(models.SalesRollup.granularity == "week").count() == 14
+    finally:
+        db.close()
+
+
+def test_windowed_bestsellers_via_api_and_node(client, auth_headers):
+    headers = auth_headers()
+    lifetime = client.get("/products/bestselling/5", headers=headers).json()
+
+    response = client.post(
+        "/products/sales",
+        headers=headers,
+        json=[
+            {"asin": "B01E6AO69U", "amount": 30.0, "units": 3},
+            {"asin": "B07XJ8C8F7", "amount": 20.0},
+        ],
+    )
+    assert response.status_code == 201
+    assert response.json() == {"recorded": 2}
+
+    recent = client.get("/products/bestselling/1?window=7", headers=headers).json()
+    assert recent == [
+        {
+            "asin": "B01E6AO69U",
+            "title": lifetime[-1]["title"],
+            "sales_amount": 30.0,
+            "window_days": 7,
+        }
+    ]
+    updated = client.get("/products/bestselling/5", headers=headers).json()
+    assert updated[-1]["sales_amount"] == lifetime[-1]["sales_amount"] + 30.0
+
+    flow_data = {
+        "nodes": [
+            {
+                "id": "week",
+                "type": "get_bestselling_asins",
+                "data": {"topCount": 5, "window": "7d"},
+            },
+            {"id": "ever", "type": "get_bestselling_asins", "data": {"topCount": 1}},
+        ],
+        "edges": [],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Windowed", "flow_data": flow_data},
+    )
+    run = client.post(f"/workflows/{workflow.json()['id']}/run", headers=headers).json()
+    assert run["status"] == "completed", run["error_message"]
+    assert run["results"]["week"]["value"] == ["B01E6AO69U", "B07XJ8C8F7"]
+    assert run["results"]["ever"]["value"] == [lifetime[0]["asin"]]
+
+
+def test_sales_for_unknown_product_are_rejected(client, auth_headers):
+    response = client.post(
+        "/products/sales",
+        headers=auth_headers(),
+        json=[{"asin": "NOPE", "amount": 1.0}],
+    )
+    assert response.status_code == 404
@@ -0,0 +1,88 @@
+import uuid
+
+from app.database import SessionLocal
+from app.search import InvertedIndex, _FallbackIndex, add_product
+
+
+def test_inverted_index_requires_every_term():
+    index = InvertedIndex()
+    add_product(
+        index, "A1", 10.0, "Smart speaker", "Compact speaker", ["Voice control"]
+    )
+    add_product(index, "A2", 50.0, "Bluetooth speaker", None, None)
+    add_product(index, "A3", 99.0, "Streaming stick", "Voice remote", [])
+
+    # Term frequency first, then sales
+    assert index.search("speaker", 10) == ["A1", "A2"]
+    assert index.search("voice speaker", 10) == ["A1"]
+    assert index.search("VOICE", 10) == ["A3", "A1"]
+    assert index.search("the", 10) == []
+    assert index.search("speaker", 1) == ["A1"]
+
+
+def test_fallback_keeps_the_most_recently_searched_owners():
+    fallback = _FallbackIndex(max_tenants=2)
+    first, second, third = (uuid.uuid4() for _ in range(3))
+    db = SessionLocal()
+    try:
+        index = fallback.get(db, first)
+        fallback.get(db, second)
+        assert fallback.get(db, first) is index
+        fallback.get(db, third)
+    finally:
+        db.close()
+    assert list(fallback._indexes) == [first, third]
+
+
+def test_search_endpoint_matches_title_description_and_bullets(client, auth_headers):
+    headers = auth_headers()
+
+    response = client.get(
+        "/products/search", params={"q": "waterproof kindle"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert [product["asin"] for product in response.json()] == ["B07H8XQZPX"]
+
+    # Only in a bullet point
+    response = client.get(
+        "/products/search", params={"q": "balanced bass"}, headers=headers
+    )
+    assert [product["asin"] for product in response.json()] == ["B08N5WRWNW"]
+
+    response = client.get(
+        "/products/search", params={"q": "nothing matches this"}, headers=headers
+    )
+    assert response.json() == []
+
+
+def test_search_asins_node_feeds_a_loop(client, auth_headers):
+    headers = auth_headers()
+    flow_data = {
+        "nodes": [
+            {
+                "id": "search",
+                "type": "search_asins",
+                "data": {"query": "alexa", "limit": 5},
+            },
+            {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+            {"id": "details", "type": "get_asin_details", "data": {}},
+            {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "search", "target": "loop"},
+            {"id": "e2", "source": "loop", "target": "details"},
+            {"id": "e3", "source": "details", "target": "merge"},
+        ],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Search Workflow", "flow_data": flow_data},
+    )
+    response = client.post(f"/workflows/{workflow.json()['id']}/run", headers=headers)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    asins = results["search"]["value"]
+    assert asins and set(asins) <= {"B08N5WRWNW", "B085HV4BZ6"}
+    assert [row["asin"] for row in results["merge"]["value"]] == asins
@@ -0,0 +1,137 @@
+from app import models, shared_catalog
+from app.config import settings
+from app.database import SessionLocal
+from app.product_repository import ProductRepository
+from app.query_counter import capture_queries
+
+
+def _demo_owner(db):
+    return (
+        db.query(models.User.id)
+        .filter(models.User.email == "demo@example.com")
+        .scalar()
+    )
+
+
+def test_lookups_match_the_database(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    db = SessionLocal()
+    try:
+        owner_id = _demo_owner(db)
+        assert shared_catalog.build(db, path) == 1
+        generation = shared_catalog._Generation(path)
+
+        products = (
+            db.query(models.MyProduct)
+            .filter(models.MyProduct.owner_id == owner_id)
+            .order_by(models.MyProduct.sales_amount.desc(), models.MyProduct.asin)
+            .all()
+        )
+        for product in products:
+            record = generation.get(product.asin, owner_id)
+            assert (
+                record.asin,
+                record.title,
+                record.description,
+                record.bullet_points,
+                record.sales_amount,
+            ) == (
+                product.asin,
+                product.title,
+                product.description,
+                product.bullet_points,
+                product.sales_amount,
+            )
+        assert [record.asin for record in generation.top_selling(owner_id, 3)] == [
+            p.asin for p in products[:3]
+        ]
+        assert len(generation.top_selling(owner_id, 10_000)) == len(products)
+
+        assert generation.get("NOT-AN-ASIN", owner_id) is None
+        other_owner = (
+            db.query(models.User.id).filter(models.User.id != owner_id).first()
+        )
+        if other_owner is not None:
+            # Another seller's products read as missing
+            assert generation.get(products[0].asin, other_owner[0]) is None
+    finally:
+        db.close()
+
+
+def test_readers_pick_up_a_new_generation(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.bin")
+    monkeypatch.setattr(settings, "shared_catalog_path", path)
+    monkeypatch.setattr(settings, "shared_catalog_check_seconds", 0.0)
+    reader = shared_catalog.SharedCatalog()
+    db = SessionLocal()
+    try:
+        owner_id = _demo_owner(db)
+        assert reader.current() is None
+        assert reader.top_selling(owner_id, 1) is None
+
+        shared_catalog.build(db, path)
+        first = reader.current()
+        asin = first.top_selling(owner_id, 1)[0].asin
+        old_title = first.get(asin, owner_id).title
+
+        product = db.get(models.MyProduct, (owner_id, asin))
+        product.title = "Renamed for the next generation"
+        db.commit()
+        try:
+            assert shared_catalog.build(db, path) == 2
+            assert reader.get(asin, owner_id).title == "Renamed for the next generation"
+            assert reader.current().generation == 2
+            # A lookup still holding the old generation keeps reading it
+            assert first.get(asin, owner_id).title == old_title
+        finally:
+            product.title = old_title
+            db.commit()
+    finally:
+        db.close()
+
+
+def test_refresh_skips_a_fresh_file(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    assert shared_catalog.refresh(path, max_age=60) == 1
+    assert shared_catalog.refresh(path, max_age=60) is None
+    assert shared_catalog.refresh(path, max_age=0) == 2
+
+
+def test_runs_read_products_from_the_shared_file(
+    client, auth_headers, tmp_path, monkeypatch
+):
+    path = str(tmp_path / "catalog.bin")
+    monkeypatch.setattr(settings, "shared_catalog_path", path)
+    db = SessionLocal()
+    try:
+        owner_id = _demo_owner(db)
+        shared_catalog.build(db, path)
+        with capture_queries() as stats:
+            repository = ProductRepository(db, owner_id)
+            expected = repository.top_selling(3)
+            repository.get_many([product.asin for product in expected])
+        assert not any("my_products" in statement for statement in stats.statements)
+    finally:
+        db.close()
+
+    headers = auth_headers()
+    flow_data = {
+        "nodes": [
+            {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 3}},
+            {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+            {"id": "details", "type": "get_asin_details", "data": {}},
+            {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "top", "target": "loop"},
+            {"id": "e2", "source": "loop", "target": "details"},
+            {"id": "e3", "source": "details", "target": "merge"},
+        ],
+    }
+    workflow = client.post(
+        "/workflows/", headers=headers, json={"name": "Shared", "flow_data": flow_data}
+    )
+    run = client.post(f"/workflows/{workflow.json()['id']}/run", headers=headers).json()
+    assert run["status"] == "completed", run["error_message"]
+    assert run["results"]["top"]["value"] == [product.asin for product in expected]
+    assert run["results"]["merge"]["value"][0]["title"] == expected[0].title
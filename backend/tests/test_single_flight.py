@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(window_seconds=0)
+    calls = []
+    started = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"status": "success"}
+
+    results = []
+
+    def caller():
+        results.append(flight.do("workflow-1", work))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result is results[0][0] for result, _ in results)
+
+
+def test_window_reuses_recent_result_then_expires():
+    flight = SingleFlight(window_seconds=0.1)
+    calls = []
+
+    def work():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("k", work) == (1, False)
+    assert flight.do("k", work) == (1, True)
+    assert flight.do("other", work) == (2, False)
+    time.sleep(0.15)
+    assert flight.do("k", work) == (3, False)
+
+
+def test_failures_are_not_cached():
+    flight = SingleFlight(window_seconds=10)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_a_waiting_caller_can_stop_waiting():
+    flight = SingleFlight(window_seconds=0)
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait()
+        return "done"
+
+    leader = threading.Thread(target=flight.do, args=("k", work))
+    leader.start()
+    started.wait()
+
+    def give_up(done):
+        raise TimeoutError
+
+    with pytest.raises(TimeoutError):
+        flight.do("k", work, wait=give_up)
+    release.set()
+    leader.join()
+    assert flight.do("k", lambda: "again") == ("again", False)
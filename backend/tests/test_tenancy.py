@@ -0,0 +1,219 @@
+import pytest
+
+from app import models, shared_catalog
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def other_seller(auth_headers):
+    """Headers of a second seller whose catalog is one product"""
+    headers = auth_headers("seller-two@example.com", "anything")
+    db = SessionLocal()
+    try:
+        seller = (
+            db.query(models.User)
+            .filter(models.User.email == "seller-two@example.com")
+            .one()
+        )
+        if db.get(models.MyProduct, (seller.id, "S2PRODUCT1")) is None:
+            db.add(
+                models.MyProduct(
+                    asin="S2PRODUCT1",
+                    title="Seller two waterproof speaker",
+                    bullet_points=["Loud"],
+                    sales_amount=999999.0,
+                    owner_id=seller.id,
+                )
+            )
+            db.commit()
+    finally:
+        db.close()
+    return headers
+
+
+@pytest.fixture
+def third_seller(auth_headers):
+    """Headers and id of a seller listing one of the demo seller's ASINs"""
+    headers = auth_headers("seller-three@example.com", "anything")
+    db = SessionLocal()
+    try:
+        seller = (
+            db.query(models.User)
+            .filter(models.User.email == "seller-three@example.com")
+            .one()
+        )
+        db.add(
+            models.MyProduct(
+                asin="B08N5WRWNW",
+                title="Seller three refurbished speaker",
+                bullet_points=[],
+                sales_amount=5.0,
+                owner_id=seller.id,
+            )
+        )
+        db.commit()
+        yield headers, seller.id
+        db.query(models.MyProduct).filter(
+            models.MyProduct.owner_id == seller.id
+        ).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_product_endpoints_only_see_the_users_catalog(
+    client, auth_headers, other_seller
+):
+    demo = auth_headers()
+
+    assert [
+        p["asin"] for p in client.get("/products/", headers=other_seller).json()
+    ] == ["S2PRODUCT1"]
+    assert "S2PRODUCT1" not in [
+        p["asin"] for p in client.get("/products/", headers=demo).json()
+    ]
+
+    assert client.get("/products/S2PRODUCT1", headers=demo).status_code == 404
+    assert client.get("/products/B08N5WRWNW", headers=other_seller).status_code == 404
+
+    assert [
+        p["asin"]
+        for p in client.get("/products/bestselling/3", headers=other_seller).json()
+    ] == ["S2PRODUCT1"]
+    assert "S2PRODUCT1" not in [
+        p["asin"] for p in client.get("/products/bestselling/10", headers=demo).json()
+    ]
+
+    search = client.get(
+        "/products/search", params={"q": "waterproof"}, headers=demo
+    ).json()
+    assert [p["asin"] for p in search] == ["B07H8XQZPX"]
+
+    batch = client.post(
+        "/products/batch", headers=demo, json={"asins": ["S2PRODUCT1", "B08N5WRWNW"]}
+    ).json()
+    assert [p["asin"] for p in batch["products"]] == ["B08N5WRWNW"]
+    assert batch["missing"] == ["S2PRODUCT1"]
+
+    response = client.post(
+        "/products/sales", headers=demo, json=[{"asin": "S2PRODUCT1", "amount": 1.0}]
+    )
+    assert response.status_code == 404
+
+
+def test_workflow_runs_are_scoped_to_the_owners_catalog(client, other_seller):
+    flow_data = {
+        "nodes": [
+            {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 10}},
+            {"id": "total", "type": "aggregate_sales", "data": {}},
+        ],
+        "edges": [],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=other_seller,
+        json={"name": "Seller two", "flow_data": flow_data},
+    )
+    run = client.post(
+        f"/workflows/{workflow.json()['id']}/run", headers=other_seller
+    ).json()
+    assert run["status"] == "completed", run["error_message"]
+    assert run["results"]["top"]["value"] == ["S2PRODUCT1"]
+    assert run["results"]["total"]["value"]["count"] == 1
+
+    # Another seller's ASIN reads as missing
+    flow_data = {
+        "nodes": [
+            {"id": "search", "type": "search_asins", "data": {"query": "kindle"}},
+            {"id": "filter", "type": "filter_asins", "data": {}},
+        ],
+        "edges": [{"id": "e1", "source": "search", "target": "filter"}],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=other_seller,
+        json={"name": "Seller two search", "flow_data": flow_data},
+    )
+    run = client.post(
+        f"/workflows/{workflow.json()['id']}/run", headers=other_seller
+    ).json()
+    assert run["results"]["search"]["value"] == []
+    assert run["results"]["filter"]["value"] == []
+
+    # Estimates use the owner's catalog size
+    plan = client.post(f"/workflows/{workflow.json()['id']}/plan", headers=other_seller)
+    assert plan.status_code == 200
+    assert {node["node_id"]: node["output_items"] for node in plan.json()["nodes"]}[
+        "search"
+    ] == 1
+
+
+def test_sellers_can_list_the_same_asin(client, auth_headers, third_seller, tmp_path):
+    demo = auth_headers()
+    third, third_id = third_seller
+    demo_product = client.get("/products/B08N5WRWNW", headers=demo).json()
+    assert demo_product["title"] != "Seller three refurbished speaker"
+    assert (
+        client.get("/products/B08N5WRWNW", headers=third).json()["title"]
+        == "Seller three refurbished speaker"
+    )
+
+    batch = client.post(
+        "/products/batch",
+        params={"fields": "title"},
+        headers=third,
+        json={"asins": ["B08N5WRWNW"]},
+    )
+    assert batch.json()["products"] == [
+        {"asin": "B08N5WRWNW", "title": "Seller three refurbished speaker"}
+    ]
+    search = client.get(
+        "/products/search", params={"q": "refurbished"}, headers=third
+    ).json()
+    assert [(p["asin"], p["title"]) for p in search] == [
+        ("B08N5WRWNW", "Seller three refurbished speaker")
+    ]
+    assert (
+        client.get("/products/search", params={"q": "refurbished"}, headers=demo).json()
+        == []
+    )
+
+    # Sales go to the seller's own listing
+    response = client.post(
+        "/products/sales", headers=third, json=[{"asin": "B08N5WRWNW", "amount": 7.0}]
+    )
+    assert response.status_code == 201
+    assert (
+        client.get("/products/bestselling/1", headers=third).json()[0]["sales_amount"]
+        == 12.0
+    )
+    assert (
+        client.get("/products/B08N5WRWNW", headers=demo).json()["sales_amount"]
+        == demo_product["sales_amount"]
+    )
+    assert client.get("/products/bestselling/1?window=1", headers=third).json() == [
+        {
+            "asin": "B08N5WRWNW",
+            "title": "Seller three refurbished speaker",
+            "sales_amount": 7.0,
+            "window_days": 1,
+        }
+    ]
+
+    db = SessionLocal()
+    try:
+        path = str(tmp_path / "catalog.bin")
+        shared_catalog.build(db, path)
+        generation = shared_catalog._Generation(path)
+        demo_id = (
+            db.query(models.User.id)
+            .filter(models.User.email == "demo@example.com")
+            .scalar()
+        )
+        assert generation.get("B08N5WRWNW", demo_id).title == demo_product["title"]
+        assert (
+            generation.get("B08N5WRWNW", third_id).title
+            == "Seller three refurbished speaker"
+        )
+    finally:
+        db.close()
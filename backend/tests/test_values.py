@@ -0,0 +1,103 @@
+import pytest
+
+from app.values import (
+    AsinList,
+    JsonValue,
+    MergedData,
+    ProductDetails,
+    ProductRecord,
+    ProductTable,
+    SingleAsin,
+    Value,
+    item_value,
+)
+
+
+def test_values_convert_to_the_public_result_shape():
+    record = ProductRecord("A1", "Speaker", None, ["Loud"], 10.0)
+    details = {
+        "asin": "A1",
+        "title": "Speaker",
+        "description": None,
+        "bullet_points": ["Loud"],
+    }
+
+    assert AsinList(["A1", "A2"]).to_json() == {
+        "type": "asin_list",
+        "value": ["A1", "A2"],
+        "count": 2,
+    }
+    assert AsinList(["A1"], scores={"A1": 1.0}).to_json()["scores"] == {"A1": 1.0}
+    assert SingleAsin("A1").to_json() == {"type": "single_asin", "value": "A1"}
+    assert ProductDetails(record).to_json() == {
+        "type": "product_details",
+        "value": {"A1": details},
+    }
+    assert ProductTable([record]).to_json() == {
+        "type": "product_details_table",
+        "value": [details],
+    }
+    assert MergedData({"A1": record, "total": 3}).to_json() == {
+        "type": "merged_data",
+        "value": {"A1": details, "total": 3},
+    }
+    assert JsonValue("records", [{"a": 1}], counted=True).to_json() == {
+        "type": "records",
+        "value": [{"a": 1}],
+        "count": 1,
+    }
+
+
+def test_loop_merge_shares_product_records():
+    merged = {}
+    record = ProductRecord("A1", "Speaker", None, None)
+    ProductDetails(record).merge_into(merged)
+    JsonValue("sales_summary", {"count": 1}).merge_into(merged)
+    assert merged == {"A1": record, "count": 1}
+    assert merged["A1"] is record
+
+
+def test_value_subclasses_must_provide_a_value():
+    class Untyped(Value):
+        __slots__ = ()
+
+    with pytest.raises(TypeError):
+        Untyped()
+    assert not hasattr(SingleAsin("A1"), "__dict__")
+
+
+def test_loops_hand_their_body_typed_items():
+    record = ProductRecord("A1", "Speaker", None, None)
+    assert isinstance(item_value("single_asin", "A1"), SingleAsin)
+    assert item_value("product_details", record).value == {"A1": record}
+
+
+def test_loop_results_keep_their_json_shape(client, auth_headers):
+    headers = auth_headers()
+    flow_data = {
+        "nodes": [
+            {"id": "top", "type": "get_bestselling_asins", "data": {"topCount": 2}},
+            {"id": "loop", "type": "loop", "data": {"mergeId": "merge"}},
+            {"id": "details", "type": "get_asin_details", "data": {}},
+            {"id": "merge", "type": "merge", "data": {"loopId": "loop"}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "top", "target": "loop"},
+            {"id": "e2", "source": "loop", "target": "details"},
+            {"id": "e3", "source": "details", "target": "merge"},
+        ],
+    }
+    workflow = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": "Loop values", "flow_data": flow_data},
+    )
+    run = client.post(f"/workflows/{workflow.json()['id']}/run", headers=headers).json()
+    assert run["status"] == "completed", run["error_message"]
+
+    results = run["results"]
+    table = results["merge"]["value"]
+    assert [row["asin"] for row in table] == results["top"]["value"]
+    assert set(table[0]) == {"asin", "title", "description", "bullet_points"}
+    last = results["details"]["value"]
+    assert list(last) == [table[-1]["asin"]] and last[table[-1]["asin"]] == table[-1]
@@ -0,0 +1,72 @@
+import uuid
+
+from app.query_counter import capture_queries
+
+
+def test_summary_pages_with_counts_and_without_flow_data(client, auth_headers):
+    headers = auth_headers()
+    prefix = f"Summary {uuid.uuid4().hex[:8]}"
+    flow_data = {
+        "nodes": [{"id": "a", "type": "merge"}, {"id": "b", "type": "merge"}],
+        "edges": [{"id": "e1", "source": "a", "target": "b"}],
+    }
+    created = [
+        client.post(
+            "/workflows/",
+            headers=headers,
+            json={"name": f"{prefix} {i}", "flow_data": flow_data},
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    with capture_queries() as stats:
+        first = client.get(
+            "/workflows/summary",
+            params={"name": prefix.lower(), "limit": 2},
+            headers=headers,
+        )
+    assert first.status_code == 200
+    assert not any("flow_data" in statement for statement in stats.statements)
+
+    page = first.json()
+    assert [item["id"] for item in page["items"]] == created[:0:-1]
+    assert page["items"][0]["node_count"] == 2
+    assert page["items"][0]["edge_count"] == 1
+    assert "flow_data" not in page["items"][0]
+
+    second = client.get(
+        "/workflows/summary",
+        params={"name": prefix, "limit": 2, "cursor": page["next_cursor"]},
+        headers=headers,
+    ).json()
+    assert [item["id"] for item in second["items"]] == created[:1]
+    assert second["next_cursor"] is None
+
+
+def test_counts_follow_flow_data_updates(client, auth_headers):
+    headers = auth_headers()
+    name = f"Counts {uuid.uuid4().hex[:8]}"
+    workflow_id = client.post(
+        "/workflows/",
+        headers=headers,
+        json={"name": name, "flow_data": {"nodes": [], "edges": []}},
+    ).json()["id"]
+    client.put(
+        f"/workflows/{workflow_id}",
+        headers=headers,
+        json={
+            "flow_data": {"nodes": [{"id": "a"}, {"id": "b"}, {"id": "c"}], "edges": []}
+        },
+    )
+
+    items = client.get(
+        "/workflows/summary", params={"name": name}, headers=headers
+    ).json()["items"]
+    assert [(item["node_count"], item["edge_count"]) for item in items] == [(3, 0)]
+
+
+def test_summary_rejects_bad_cursor(client, auth_headers):
+    response = client.get(
+        "/workflows/summary", params={"cursor": "not-a-cursor"}, headers=auth_headers()
+    )
+    assert response.status_code == 400
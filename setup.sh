@@ -20,19 +20,9 @@ docker-compose up -d postgres
 echo "⏳ Waiting for PostgreSQL to be ready..."
 sleep 10
 
-# Run database migrations
+# Run database migrations (databases created before migrations are adopted)
 echo "📊 Running database migrations..."
-docker-compose exec -T backend alembic revision --autogenerate -m "Initial migration" || echo "Migration generation failed, continuing..."
-docker-compose exec -T backend alembic upgrade head || echo "Migration upgrade failed, continuing..."
-
-# Create tables directly if migrations failed
-echo "📊 Creating database tables..."
-docker-compose exec -T backend python -c "
-from app.database import engine
-from app.models import Base
-Base.metadata.create_all(bind=engine)
-print('Tables created successfully!')
-"
+docker-compose exec -T backend alembic upgrade head || exit 1
 
 # Seed the database
 echo "🌱 Seeding database with sample data..."